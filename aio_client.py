@@ -0,0 +1,250 @@
+import asyncio
+import threading
+import time
+import http_client
+import http_cache
+import scheduler
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+class AsyncHttpClient():
+    """
+
+    AzureDevOps向けの非同期HTTPクライアント(aiohttp)。
+    同時接続数の上限を共有し、認証情報・api-version・タイムアウトを一括で設定する。
+    aiohttpのセッションはイベントループ毎に初回利用時に生成し、イベントループの終了時(asyncio.run等のshutdown_asyncgens)に閉じる。
+    リクエストは同期版と共有するスケジューラを経由して送信し、スロットリング時のGETは再試行する。
+    キャッシュを指定した場合、GETはETag/Last-Modifiedによる条件付きGETとする。
+    フックの仕様は同期版(http_client.HttpClient)と同じ。
+    トランスポートを指定した場合は、セッションの代わりにトランスポートのrequestで送信する(記録・再生等)。
+    サーバーの1ページの最大件数の仕様は同期版と同じ。
+
+    """
+
+    def __init__(self, user :str, password :str, api_version :str, pool_size :int=10, timeout :float=30, request_scheduler :scheduler.RequestScheduler=None, max_retries :int=5, cache :http_cache.HttpCache=None, hooks :list=None, transport=None, max_page_size :int=None):
+        self.user = user
+        self.password = password
+        self.api_version = api_version
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = cache
+        self.hooks = list(hooks) if hooks != None else []
+        self.transport = transport
+        self.max_page_size = max_page_size
+
+        if request_scheduler == None:
+            request_scheduler = scheduler.RequestScheduler(max_window=pool_size)
+        self.scheduler = request_scheduler
+
+        self._lock = threading.Lock()
+        # key:イベントループ, value:(セッション, セッションを閉じる非同期ジェネレータ)
+        self._session_dict = {}
+
+    async def _get_session(self):
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session_closer = self._session_dict.get(loop)
+            if session_closer != None and not session_closer[0].closed:
+                return session_closer[0]
+
+            # 終了したイベントループのセッション(終了時に閉じたもの)を破棄する
+            for closed_loop in [other_loop for other_loop in self._session_dict if other_loop.is_closed()]:
+                del self._session_dict[closed_loop]
+
+            session = aiohttp.ClientSession(
+                auth=aiohttp.BasicAuth(self.user, self.password),
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+                )
+            closer = self._close_on_shutdown(session)
+            self._session_dict[loop] = (session, closer)
+
+        # 非同期ジェネレータを開始してイベントループに登録し、終了時(shutdown_asyncgens)にセッションを閉じる。
+        # イベントループは非同期ジェネレータを弱参照で保持するため、辞書で参照を保持する
+        await closer.asend(None)
+        return session
+
+    async def _close_on_shutdown(self, session):
+        try:
+            yield
+        finally:
+            if not session.closed:
+                await session.close()
+
+    async def request_json(self, method :str, url :str, params :dict=None, **kwargs):
+        """
+
+        HttpRequestを送信し、レスポンスのJSONを取得する。
+        api-versionが未指定の場合は付与する。
+
+        Args:
+            method (str): HTTPメソッド
+            url (str): URL
+            params (dict): クエリパラメータ
+
+        Raises:
+            aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+        Returns:
+            レスポンスのJSON
+
+        """
+        res_data, headers = await self.request_json_with_headers(method, url, params=params, **kwargs)
+        return res_data
+
+    async def request_json_with_headers(self, method :str, url :str, params :dict=None, use_cache :bool=True, **kwargs) -> tuple:
+        """
+
+        HttpRequestを送信し、レスポンスのJSONとレスポンスヘッダーを取得する。
+        キャッシュを利用するGETの場合、304(Not Modified)であれば保持したJSONを返却する。
+        保持したレスポンスがない(検証子を送信していない)にもかかわらず304の場合は、再検証を要求して再取得する。
+
+        Args:
+            method (str): HTTPメソッド
+            url (str): URL
+            params (dict): クエリパラメータ
+            use_cache (bool): 条件付きGETキャッシュを利用するか
+
+        Raises:
+            aiohttp.ClientResponseError: HttpRequestに失敗した場合。再取得も304の場合を含む。
+
+        Returns:
+            tuple: (レスポンスのJSON, レスポンスヘッダー)
+
+        """
+        _params = {'api-version': self.api_version}
+        if params != None:
+            # aiohttpはbool型のクエリパラメータを受け付けないため文字列に変換する
+            for key, value in params.items():
+                _params[key] = str(value).lower() if isinstance(value, bool) else str(value)
+
+        import aiohttp
+
+        session = await self._get_session()
+        is_idempotent = method.upper() == 'GET'
+
+        key = None
+        entry = None
+        if is_idempotent and self.cache != None and use_cache:
+            key = self.cache.make_key(url, params)
+            entry = self.cache.get(key)
+            headers = dict(kwargs.pop('headers', None) or {})
+            headers.update(self.cache.get_conditional_headers(entry))
+            kwargs['headers'] = headers
+
+        is_refetched = False
+        attempt = 0
+        while True:
+            await self.scheduler.acquire_async()
+            released = False
+            started_at = time.time()
+            started = time.perf_counter()
+            try:
+                async with self._request(session, method, url, _params, **kwargs) as res:
+                    self.scheduler.release(res.status, res.headers)
+                    released = True
+                    body = await res.read()
+                    http_client.call_hooks(self.hooks, method, url, res.status, len(body), started_at, time.perf_counter() - started)
+                    if not is_idempotent or res.status not in scheduler.retry_status_list or attempt >= self.max_retries:
+                        if key != None and res.status == 304:
+                            if entry != None:
+                                self.cache.record(True)
+                                return entry.data, entry.headers
+                            if not is_refetched:
+                                # 検証子を送信していない304は中継サーバー等のキャッシュによるため、再検証を要求して再取得する
+                                logger.warning("not modified without cached entry, refetching. url=(%s)", url)
+                                is_refetched = True
+                                kwargs['headers'] = dict(kwargs['headers'], **{'Cache-Control': 'no-cache'})
+                                continue
+                            raise aiohttp.ClientResponseError(
+                                res.request_info,
+                                res.history,
+                                status=res.status,
+                                message='Not Modified without cached entry',
+                                headers=res.headers
+                                )
+                        res.raise_for_status()
+                        res_data = await res.json(content_type=None)
+                        if key != None:
+                            self.cache.record(False)
+                            self.cache.put(key, res_data, res.headers)
+                        return res_data, res.headers
+                    delay = self.scheduler.get_retry_delay(attempt, res.headers)
+                    logger.warning("request failed, retrying. url=(%s), status=(%s), attempt=(%s), delay=(%s)", url, res.status, attempt + 1, delay)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if not released:
+                    self.scheduler.release(is_connection_error=True)
+                    released = True
+                    http_client.call_hooks(self.hooks, method, url, None, 0, started_at, time.perf_counter() - started)
+                if not is_idempotent or attempt >= self.max_retries:
+                    raise e
+                delay = self.scheduler.get_retry_delay(attempt)
+                logger.warning("request failed, retrying. url=(%s), attempt=(%s), delay=(%s), error=(%s)", url, attempt + 1, delay, e)
+            finally:
+                # その他の例外(不正なURL・再生時の記録なし・キャンセル等)の場合も送信枠を返却する
+                if not released:
+                    self.scheduler.release()
+                    http_client.call_hooks(self.hooks, method, url, None, 0, started_at, time.perf_counter() - started)
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _request(self, session, method :str, url :str, params :dict, **kwargs):
+        if self.transport != None:
+            return self.transport.request(session, method, url, params=params, **kwargs)
+        return session.request(method, url, params=params, **kwargs)
+
+    async def get_json(self, url :str, params :dict=None, use_cache :bool=True, **kwargs):
+        return await self.request_json('GET', url, params=params, use_cache=use_cache, **kwargs)
+
+    async def iter_pages(self, url :str, params :dict=None, value_key :str='value', page_size :int=100, top_param :str='$top', skip_param :str='$skip', use_cache :bool=True):
+        """
+
+        ページングされた一覧APIを最終ページまで順に非同期に取得し、要素を1件ずつ返却する。
+        ページングの仕様は同期版(http_client.HttpClient.iter_pages)と同じ。
+
+        Args:
+            url (str): URL
+            params (dict): クエリパラメータ
+            value_key (str): レスポンスの要素リストのキー
+            page_size (int): ページサイズ
+            top_param (str): 取得件数のパラメータ名
+            skip_param (str): スキップ件数のパラメータ名
+            use_cache (bool): 条件付きGETキャッシュを利用するか
+
+        Raises:
+            aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+        Yields:
+            一覧の要素(dict)
+
+        """
+        if self.max_page_size != None:
+            page_size = min(page_size, self.max_page_size)
+
+        page_params = dict(params) if params != None else {}
+        page_params[top_param] = page_size
+
+        while page_params != None:
+            res_data, headers = await self.request_json_with_headers('GET', url, params=page_params, use_cache=use_cache)
+
+            items = res_data[value_key]
+            for item in items:
+                yield item
+
+            page_params = http_client.next_page_params(page_params, items, headers, page_size, top_param, skip_param)
+
+    async def close(self):
+        """
+
+        現在のイベントループのセッションを閉じる。
+
+        """
+        with self._lock:
+            session_closer = self._session_dict.pop(asyncio.get_running_loop(), None)
+        if session_closer != None:
+            await session_closer[1].aclose()
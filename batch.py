@@ -0,0 +1,185 @@
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import context
+import func
+import merge_check
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# レポートの種類(key:レポート名, value:実行する関数)
+# マージ状況のチェックは、全WorkItemで共有するMergeCheckerにより完了済みPRの一覧の取得を(リポジトリ, ブランチ)毎に1回とする
+report_dict = {
+    'check_merged': lambda work_item_id, args, merge_checker: merge_checker.check(work_item_id, args.branch).to_dict(),
+    'changed_by_pr': lambda work_item_id, args, merge_checker: func.print_changed_filepath_dict_by_pr(work_item_id, args.branch, args.strategy),
+    'changed_by_repo_pr': lambda work_item_id, args, merge_checker: func.print_changed_filepath_dict_by_repo_pr(work_item_id, args.branch, args.strategy),
+    'changed_by_diff_branch': lambda work_item_id, args, merge_checker: func.print_changed_filepath_dict_by_repo_diff_branch(work_item_id, args.source_branch, args.branch)
+}
+
+
+def read_work_item_id_list(input_file) -> list:
+    """
+
+    WorkItemのIDの一覧を読み込む。
+    IDは空白・カンマ・改行で区切る。#以降はコメントとする。重複するIDは先に出現したもののみとする。
+
+    Args:
+        input_file: 入力ファイル(テキスト)
+
+    Raises:
+        ValueError: IDが数値でない場合
+
+    Returns:
+        list: WorkItemのIDのリスト
+
+    """
+    work_item_id_list = []
+    work_item_id_set = set()
+    for line in input_file:
+        line = line.split('#', 1)[0]
+        for token in line.replace(',', ' ').split():
+            if not token.isdigit():
+                raise ValueError('invalid work item id. id=(' + token + ')')
+            work_item_id = int(token)
+            if work_item_id in work_item_id_set:
+                continue
+            work_item_id_set.add(work_item_id)
+            work_item_id_list.append(work_item_id)
+    return work_item_id_list
+
+
+def run_work_item(work_item_id :int, report_list :list, args, merge_checker :merge_check.MergeChecker) -> dict:
+    """
+
+    WorkItem1件について、指定したレポートを順に実行する。
+    レポートが失敗した場合は、エラーを結果に記録して次のレポートを実行する。
+
+    Returns:
+        dict: 実行結果(key:work_item_id, レポート名, errors, elapsed)
+
+    """
+    result = {'work_item_id': work_item_id}
+    error_dict = {}
+
+    started_at = time.perf_counter()
+    for report in report_list:
+        try:
+            result[report] = report_dict[report](work_item_id, args, merge_checker)
+        except Exception as e:
+            error_dict[report] = type(e).__name__ + ': ' + str(e)
+    result['errors'] = error_dict
+    result['elapsed'] = time.perf_counter() - started_at
+
+    return result
+
+
+def run(work_item_id_list :list, report_list :list, args, output_file, max_workers :int=None) -> bool:
+    """
+
+    WorkItemのIDの一覧について、指定したレポートをワーカースレッドで並列に実行し、
+    WorkItem毎の結果を完了した順にJSON Lines形式で出力する。
+    HTTPクライアント・キャッシュ等は現在のコンテキストのものを全WorkItemで共有する。
+
+    Args:
+        work_item_id_list (list): WorkItemのIDのリスト
+        report_list (list): 実行するレポート名のリスト
+        args: レポートの引数(branch, source_branch, strategy)
+        output_file: 出力先(テキスト)
+        max_workers (int): WorkItemの最大並列数。Noneの場合は設定値を使用する。
+
+    Returns:
+        bool: 全WorkItemのレポートが成功し、かつマージ状況のチェック結果が全てTrueの場合はTrue
+
+    """
+    ctx = context.get_context()
+    if max_workers == None:
+        max_workers = ctx.max_workers
+
+    merge_checker = merge_check.MergeChecker()
+    is_all_ok = True
+
+    # ワーカースレッドへ現在のコンテキストを引き継ぐ
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=context.set_context, initargs=(ctx,)) as executor:
+        future_list = [
+            executor.submit(run_work_item, work_item_id, report_list, args, merge_checker)
+            for work_item_id in work_item_id_list
+            ]
+
+        for future in as_completed(future_list):
+            result = future.result()
+            if len(result['errors']) != 0:
+                is_all_ok = False
+            if 'check_merged' in result and not result['check_merged']['is_all_merged']:
+                is_all_ok = False
+
+            output_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output_file.flush()
+
+    return is_all_ok
+
+
+def redirect_console_log(stream=None):
+    """
+
+    標準出力へ出力するログのハンドラ(settings_logger.jsonのconsoleHandler等)の出力先を変更する。
+    結果(JSON Lines)を標準出力へ出力する場合に、ログが結果に混在しないようにする。
+
+    Args:
+        stream: 変更後の出力先。Noneの場合は標準エラー出力。
+
+    """
+    if stream == None:
+        stream = sys.stderr
+
+    logger_list = [logging.getLogger()] + [
+        target_logger for target_logger in logging.Logger.manager.loggerDict.values() if isinstance(target_logger, logging.Logger)
+        ]
+    for target_logger in logger_list:
+        for handler in target_logger.handlers:
+            if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                handler.setStream(stream)
+
+
+def main(argv :list=None) -> int:
+    parser = argparse.ArgumentParser(description='WorkItemの一覧についてマージ状況のチェック・変更パスの出力を並列に実行する')
+    parser.add_argument('input', nargs='?', default='-', help='WorkItemのIDの一覧ファイル。未指定または-の場合は標準入力')
+    parser.add_argument('--branch', required=True, help='ターゲットブランチ名')
+    parser.add_argument('--source-branch', help='ブランチ差分のマージ元ブランチ名(changed_by_diff_branchの場合は必須)')
+    parser.add_argument('--report', action='append', choices=list(report_dict.keys()), help='実行するレポート(複数指定可)。未指定の場合はcheck_mergedとchanged_by_pr')
+    parser.add_argument('--strategy', choices=['commits', 'iterations'], help='PRの変更パス取得方式。未指定の場合は設定値')
+    parser.add_argument('--max-workers', type=int, help='WorkItemの最大並列数。未指定の場合は設定値(max_workers)')
+    parser.add_argument('--output', default='-', help='結果(JSON Lines)の出力先。未指定または-の場合は標準出力')
+    args = parser.parse_args(argv)
+
+    report_list = args.report if args.report != None else ['check_merged', 'changed_by_pr']
+    if 'changed_by_diff_branch' in report_list and args.source_branch == None:
+        parser.error('--source-branch is required for changed_by_diff_branch.')
+
+    if args.input == '-':
+        work_item_id_list = read_work_item_id_list(sys.stdin)
+    else:
+        with open(args.input, 'r') as input_file:
+            work_item_id_list = read_work_item_id_list(input_file)
+
+    ctx = context.get_context()
+    # 設定ファイルによるログの設定(コンテキストの取得時に読み込む)の後に、ログを標準エラー出力へ変更する
+    redirect_console_log()
+    try:
+        if args.output == '-':
+            is_all_ok = run(work_item_id_list, report_list, args, sys.stdout, args.max_workers)
+        else:
+            with open(args.output, 'w', encoding='utf-8') as output_file:
+                is_all_ok = run(work_item_id_list, report_list, args, output_file, args.max_workers)
+        ctx.export_metrics()
+    finally:
+        ctx.close()
+
+    return 0 if is_all_ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+import context
+import func
+import mock_server
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# ベンチマーク対象のエントリポイント(key:名前, value:(同期版, 非同期版))
+entry_point_dict = {
+    'get_pr_dict': (
+        lambda args: func.get_pr_dict(args.work_item_id, args.branch),
+        lambda args: func.get_pr_dict_async(args.work_item_id, args.branch)
+    ),
+    'print_changed_filepath_dict_by_pr': (
+        lambda args: func.print_changed_filepath_dict_by_pr(args.work_item_id, args.branch, args.strategy),
+        lambda args: func.print_changed_filepath_dict_by_pr_async(args.work_item_id, args.branch, args.strategy)
+    ),
+    'print_changed_filepath_dict_by_repo_pr': (
+        lambda args: func.print_changed_filepath_dict_by_repo_pr(args.work_item_id, args.branch, args.strategy),
+        lambda args: func.print_changed_filepath_dict_by_repo_pr_async(args.work_item_id, args.branch, args.strategy)
+    ),
+    'print_changed_filepath_dict_by_repo_diff_branch': (
+        lambda args: func.print_changed_filepath_dict_by_repo_diff_branch(args.work_item_id, args.source_branch, args.branch),
+        lambda args: func.print_changed_filepath_dict_by_repo_diff_branch_async(args.work_item_id, args.source_branch, args.branch)
+    ),
+    'check_merged': (
+        lambda args: func.check_merged(args.work_item_id, args.branch),
+        lambda args: func.check_merged_async(args.work_item_id, args.branch)
+    )
+}
+
+
+class MockServerProcess():
+    """
+
+    モックサーバーを子プロセスで起動する。
+    計測対象のプロセスとメモリ・GILを共有しないよう、別プロセスとする。
+
+    """
+
+    def __init__(self, server_args :list):
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_server.py')] + server_args,
+            stdout=subprocess.PIPE,
+            text=True
+            )
+        # 1行目に待受URLが出力される
+        self.url_core = self._process.stdout.readline().strip()
+        if self.url_core == '':
+            self.close()
+            raise RuntimeError('mock server failed to start.')
+
+    def get_stats(self) -> dict:
+        with urllib.request.urlopen(self.url_core + '_mock/stats') as res:
+            return json.load(res)
+
+    def reset_stats(self):
+        with urllib.request.urlopen(self.url_core + '_mock/reset') as res:
+            res.read()
+
+    def close(self):
+        self._process.terminate()
+        self._process.wait()
+
+
+def create_context(args, url_core :str, work_dir :str) -> context.Context:
+    """
+
+    モックサーバーへ接続するコンテキストを作成する。
+    キャッシュは指定した場合のみ作業ディレクトリに作成し、それ以外は無効とする。
+
+    """
+    ads = {
+        'url_core': url_core,
+        'organization': 'organization',
+        'project': 'project',
+        'id': 'user',
+        'pw': 'password',
+        'api_version': '7.1',
+        'pool_size': args.pool_size,
+        'max_workers': args.max_workers,
+        'pr_path_strategy': args.strategy,
+        'http_cache_max_entries': 1000 if args.http_cache else 0,
+        'repo_cache_path': None,
+        'change_cache_path': os.path.join(work_dir, 'change_cache.db') if args.change_cache else None,
+        'pr_index_path': os.path.join(work_dir, 'pr_index.db') if args.pr_index else None,
+        'pr_index_sync_interval': 0
+    }
+    return context.Context({'ads': ads})
+
+
+def run_entry_point(args, server :MockServerProcess, ctx :context.Context, name :str) -> dict:
+    """
+
+    エントリポイントを1回実行し、HTTP呼び出し回数・転送量・経過時間・ピークメモリを計測する。
+
+    Returns:
+        dict: 計測結果
+
+    """
+    sync_func, async_func = entry_point_dict[name]
+
+    server.reset_stats()
+    ctx.metrics.clear()
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    try:
+        with context.use(ctx):
+            if args.use_async:
+                asyncio.run(_run_async(async_func, args, ctx))
+            else:
+                sync_func(args)
+        wall_time = time.perf_counter() - started_at
+        current_memory, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    stats = server.get_stats()
+
+    return {
+        'entry_point': name,
+        'async': args.use_async,
+        'calls': sum(endpoint_stats['count'] for endpoint_stats in stats.values()),
+        'bytes': sum(endpoint_stats['bytes'] for endpoint_stats in stats.values()),
+        'wall_time': wall_time,
+        'peak_memory': peak_memory,
+        'endpoints': stats,
+        'client_metrics': ctx.metrics.get_summary()
+    }
+
+
+async def _run_async(async_func, args, ctx :context.Context):
+    try:
+        await async_func(args)
+    finally:
+        await ctx.aclient.close()
+
+
+def print_result_list(result_list :list):
+    print('%-48s %4s %7s %12s %10s %12s' % ('entry_point', 'run', 'calls', 'bytes', 'wall(s)', 'peak_mem(KB)'))
+    for result in result_list:
+        print('%-48s %4d %7d %12d %10.3f %12.1f' % (
+            result['entry_point'],
+            result['run'],
+            result['calls'],
+            result['bytes'],
+            result['wall_time'],
+            result['peak_memory'] / 1024
+            ))
+
+
+def main(argv :list=None):
+    parser = argparse.ArgumentParser(description='funcのエントリポイントをモックサーバーに対して計測する')
+    parser.add_argument('--entry', action='append', choices=list(entry_point_dict.keys()), help='計測するエントリポイント(複数指定可)。未指定の場合は全て')
+    parser.add_argument('--repeat', type=int, default=1, help='エントリポイント毎の実行回数。同一コンテキストで実行するため2回目以降はキャッシュが有効')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='非同期版を計測する')
+    parser.add_argument('--strategy', choices=['commits', 'iterations'], default='commits', help='PRの変更パス取得方式')
+    parser.add_argument('--pool-size', type=int, default=10, help='接続プールサイズ')
+    parser.add_argument('--max-workers', type=int, default=8, help='並列取得時の最大並列数')
+    parser.add_argument('--http-cache', action='store_true', help='条件付きGETキャッシュを有効にする')
+    parser.add_argument('--change-cache', action='store_true', help='コミット変更キャッシュを有効にする')
+    parser.add_argument('--pr-index', action='store_true', help='PRインデックスを有効にする')
+    parser.add_argument('--branch', default='master', help='ターゲットブランチ名')
+    parser.add_argument('--source-branch', default='feature', help='ブランチ差分のマージ元ブランチ名')
+    parser.add_argument('--json', dest='json_path', help='計測結果(JSON)の出力先')
+    mock_server.add_data_arguments(parser)
+    args = parser.parse_args(argv)
+    args.work_item_id = 1
+
+    server_args = [
+        '--repos', str(args.repos),
+        '--prs', str(args.prs),
+        '--commits', str(args.commits),
+        '--changes', str(args.changes),
+        '--diff-changes', str(args.diff_changes),
+        '--linked-prs', str(args.linked_prs),
+        '--latency', str(args.latency),
+        '--max-page-size', str(args.max_page_size)
+    ]
+
+    entry_list = args.entry if args.entry != None else list(entry_point_dict.keys())
+
+    result_list = []
+    server = MockServerProcess(server_args)
+    try:
+        for name in entry_list:
+            # エントリポイント毎にキャッシュを初期化する
+            with tempfile.TemporaryDirectory() as work_dir:
+                ctx = create_context(args, server.url_core, work_dir)
+                try:
+                    for run in range(args.repeat):
+                        result = run_entry_point(args, server, ctx, name)
+                        result['run'] = run + 1
+                        result_list.append(result)
+                finally:
+                    ctx.close()
+    finally:
+        server.close()
+
+    print_result_list(result_list)
+
+    if args.json_path != None:
+        with open(args.json_path, 'w') as json_file:
+            json.dump(result_list, json_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import json
+import sqlite3
+import threading
+import time
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# 削除時に1回で読み込むエントリ数
+evict_batch_size=100
+
+
+class ChangeCache():
+    """
+
+    コミット毎の変更パス-変更種類辞書のキャッシュ(SQLite)。
+    コミットの変更内容はコミットSHAに対して不変のため、リポジトリIDとコミットIDをキーに永続的に保持する。
+    合計サイズが上限を超過した場合は、参照日時の古いものから削除する。
+    合計サイズは保存毎にファイルより集計するため、同じファイルを複数のプロセス・インスタンスで共有できる。
+
+    """
+
+    def __init__(self, file_path :str, max_bytes :int=256 * 1024 * 1024):
+        """
+
+        Args:
+            file_path (str): キャッシュファイル(SQLite)のパス
+            max_bytes (int): キャッシュの合計サイズの上限(バイト)
+
+        """
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(file_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS commit_changes ('
+            ' repo_id TEXT NOT NULL,'
+            ' commit_id TEXT NOT NULL,'
+            ' path_dict TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' accessed_at REAL NOT NULL,'
+            ' PRIMARY KEY (repo_id, commit_id))'
+            )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS commit_changes_accessed_at ON commit_changes (accessed_at)'
+            )
+
+    def get(self, repo_id :str, commit_id :str) -> dict:
+        """
+
+        変更パス-変更種類辞書を取得する。
+
+        Args:
+            repo_id (str): レポジトリのID
+            commit_id (str): コミットID
+
+        Returns:
+            dict: 変更パス-変更種類辞書。キャッシュに存在しない場合はNone。
+
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT path_dict FROM commit_changes WHERE repo_id = ? AND commit_id = ?',
+                (repo_id, commit_id)
+                ).fetchone()
+            if row == None:
+                return None
+
+            self._conn.execute(
+                'UPDATE commit_changes SET accessed_at = ? WHERE repo_id = ? AND commit_id = ?',
+                (time.time(), repo_id, commit_id)
+                )
+
+        return json.loads(row[0])
+
+    def put(self, repo_id :str, commit_id :str, path_dict :dict):
+        """
+
+        変更パス-変更種類辞書を保存する。
+        合計サイズが上限を超過した場合は、参照日時の古いものから削除する。
+
+        Args:
+            repo_id (str): レポジトリのID
+            commit_id (str): コミットID
+            path_dict (dict): 変更パス-変更種類辞書
+
+        """
+        path_dict_json = json.dumps(path_dict)
+        size = len(path_dict_json.encode('utf-8'))
+
+        # 上限を超過する単一エントリは保存しない
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # 他のプロセスの保存・削除と競合しないよう、保存から削除までを1つのトランザクションとする
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO commit_changes (repo_id, commit_id, path_dict, size, accessed_at)'
+                    ' VALUES (?, ?, ?, ?, ?)',
+                    (repo_id, commit_id, path_dict_json, size, time.time())
+                    )
+                total_size = self._get_total_size()
+                if total_size > self.max_bytes:
+                    self._evict(total_size)
+                self._conn.execute('COMMIT')
+            except Exception as e:
+                self._conn.execute('ROLLBACK')
+                raise e
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM commit_changes')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _get_total_size(self) -> int:
+        return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM commit_changes').fetchone()[0]
+
+    def _evict(self, total_size :int):
+        # 参照日時の古いものから、合計サイズが上限の9割以下になるまで削除する
+        target_size = self.max_bytes * 0.9
+        evict_count = 0
+        while total_size > target_size:
+            rows = self._conn.execute(
+                'SELECT repo_id, commit_id, size FROM commit_changes ORDER BY accessed_at LIMIT ?',
+                (evict_batch_size,)
+                ).fetchall()
+            if len(rows) == 0:
+                break
+
+            evict_key_list = []
+            for repo_id, commit_id, size in rows:
+                if total_size <= target_size:
+                    break
+                evict_key_list.append((repo_id, commit_id))
+                total_size -= size
+
+            self._conn.executemany(
+                'DELETE FROM commit_changes WHERE repo_id = ? AND commit_id = ?',
+                evict_key_list
+                )
+            evict_count += len(evict_key_list)
+        logger.debug("change cache evicted. count=(%s)", evict_count)
@@ -0,0 +1,324 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+import settings
+import scheduler
+import http_cache
+import http_client
+import aio_client
+import metrics
+import transport
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+class Context():
+    """
+
+    AzureDevOpsの接続コンテキスト。
+    設定(組織・プロジェクト・認証情報等)と、設定に紐づくHTTPクライアント・キャッシュ等のリソースを保持する。
+    リソースは初回利用時に生成する。
+    設定毎にコンテキストを生成し、use()で切り替えることで、1プロセスで複数の組織・プロジェクトを扱える。
+
+    """
+
+    def __init__(self, settings_data :dict):
+        """
+
+        Args:
+            settings_data (dict): 設定(settings_app.jsonと同じ形式)
+
+        """
+        self.settings_data = settings_data
+
+        ads = settings_data['ads']
+        self.url_core = ads['url_core']
+        self.organization = ads['organization']
+        self.project = ads['project']
+        self.id = ads['id']
+        self.pw = ads['pw']
+        self.api_version = ads['api_version']
+
+        # 接続プールサイズ(未設定の場合は10)
+        self.pool_size = ads.get('pool_size', 10)
+        # タイムアウト秒数(未設定の場合は30秒)
+        self.timeout = ads.get('timeout', 30)
+        # GETリクエストの最大再試行回数(未設定の場合は5回)
+        self.max_retries = ads.get('max_retries', 5)
+        # エンドポイント毎のページサイズ(未設定のエンドポイントは100件)
+        self.page_size_dict = ads.get('page_size', {})
+        # サーバーの1ページの最大件数(未設定の場合は1000件)。ページサイズはこの件数を上限とする
+        self.max_page_size = ads.get('max_page_size', 1000)
+        # 条件付きGETキャッシュの最大保持件数(未設定の場合は1000件、0の場合は無効)
+        self.http_cache_max_entries = ads.get('http_cache_max_entries', 1000)
+        # リクエスト計測の出力先(未設定の場合は出力しない)
+        self.metrics_prometheus_path = ads.get('metrics_prometheus_path')
+        self.metrics_summary_path = ads.get('metrics_summary_path')
+        # リクエスト毎のトレース(Chromeトレース形式)の出力先(未設定の場合は記録しない)
+        self.metrics_trace_path = ads.get('metrics_trace_path')
+
+        # 記録・再生のモード(record:レスポンスを記録する、replay:記録したレスポンスを再生し通信しない。未設定の場合は通常の通信)
+        self.transport_mode = ads.get('transport_mode')
+        # 記録ファイルのパス(未設定の場合は./transport.db)
+        self.transport_archive_path = ads.get('transport_archive_path', './transport.db')
+
+        # WorkItemスナップショットの保持秒数(未設定の場合は60秒)
+        self.work_item_cache_ttl = ads.get('work_item_cache_ttl', 60)
+        # 添付ファイルの保存ディレクトリ(未設定の場合は./)
+        self.attachment_dir = ads.get('attachment_dir', './')
+
+        # 並列取得時の最大並列数(未設定の場合は8)
+        self.max_workers = ads.get('max_workers', 8)
+        # リポジトリキャッシュファイルのパス(未設定の場合は./repo_cache.json)
+        self.repo_cache_path = ads.get('repo_cache_path', './repo_cache.json')
+        # リポジトリキャッシュの保持秒数(未設定の場合は86400秒)
+        self.repo_cache_ttl = ads.get('repo_cache_ttl', 86400)
+        # コミット変更キャッシュファイルのパス(未設定の場合は./change_cache.db、nullの場合はキャッシュしない)
+        self.change_cache_path = ads.get('change_cache_path', './change_cache.db')
+        # コミット変更キャッシュの合計サイズの上限(未設定の場合は256MB)
+        self.change_cache_max_bytes = ads.get('change_cache_max_bytes', 256 * 1024 * 1024)
+        # PRの変更パス取得方式(commits:コミット毎の変更を集約、iterations:PRイテレーションの差分)
+        self.pr_path_strategy = ads.get('pr_path_strategy', 'commits')
+        # PRの一覧取得前に想定するリポジトリ毎のPRの推定件数(未設定の場合は1000件)
+        self.pr_count_estimate = ads.get('pr_count_estimate', 1000)
+        # PRを個別取得する閾値。WorkItemのPRの件数が一覧取得のページ数×この値以下の場合は個別に取得する(未設定の場合は1、0の場合は常に一覧取得)
+        self.pr_direct_lookup_ratio = ads.get('pr_direct_lookup_ratio', 1)
+        # PRインデックスファイルのパス(未設定の場合はPRインデックスを利用しない)
+        self.pr_index_path = ads.get('pr_index_path')
+        # PRインデックスの差分同期の間隔秒数(未設定の場合は60秒)
+        self.pr_index_sync_interval = ads.get('pr_index_sync_interval', 60)
+        # PRインデックスの全件同期の間隔秒数(未設定の場合は86400秒)
+        self.pr_index_full_sync_interval = ads.get('pr_index_full_sync_interval', 86400)
+
+        # リポジトリのローカルのミラーを作成するディレクトリ(未設定の場合はミラーを利用しない)
+        self.git_mirror_dir = ads.get('git_mirror_dir')
+        # ミラーの取得元URLの書式({repo_id}/{repo_name}を置換する。未設定の場合はAzure DevOpsのリポジトリURL)
+        self.git_mirror_url = ads.get('git_mirror_url')
+        # ミラーの差分取得の間隔秒数(未設定の場合は60秒)
+        self.git_mirror_fetch_interval = ads.get('git_mirror_fetch_interval', 60)
+
+        self._lock = threading.RLock()
+        self._resource_dict = {}
+
+    def get_resource(self, name :str, factory):
+        """
+
+        コンテキストに紐づくリソースを取得する。未生成の場合は生成する。
+
+        Args:
+            name (str): リソース名
+            factory: リソースを生成する関数
+
+        Returns:
+            リソース
+
+        """
+        with self._lock:
+            if name not in self._resource_dict:
+                self._resource_dict[name] = factory()
+            return self._resource_dict[name]
+
+    @property
+    def scheduler(self) -> scheduler.RequestScheduler:
+        return self.get_resource('scheduler', lambda: scheduler.RequestScheduler(max_window=self.pool_size))
+
+    @property
+    def http_cache(self) -> http_cache.HttpCache:
+        if self.http_cache_max_entries <= 0:
+            return None
+        return self.get_resource('http_cache', lambda: http_cache.HttpCache(max_entries=self.http_cache_max_entries))
+
+    @property
+    def metrics(self) -> metrics.RequestMetrics:
+        return self.get_resource('metrics', lambda: metrics.RequestMetrics(trace=self.metrics_trace_path != None))
+
+    @property
+    def transport_archive(self) -> transport.TransportArchive:
+        if self.transport_mode == None:
+            return None
+        return self.get_resource('transport_archive', lambda: transport.TransportArchive(self.transport_archive_path))
+
+    @property
+    def client(self) -> http_client.HttpClient:
+        return self.get_resource('client', lambda: http_client.HttpClient(
+            self.id,
+            self.pw,
+            self.api_version,
+            pool_size=self.pool_size,
+            timeout=self.timeout,
+            request_scheduler=self.scheduler,
+            max_retries=self.max_retries,
+            cache=self.http_cache,
+            hooks=[self.metrics],
+            adapter=self._create_adapter(),
+            max_page_size=self.max_page_size
+            ))
+
+    @property
+    def aclient(self) -> aio_client.AsyncHttpClient:
+        # スケジューラ・キャッシュは同期版と共有する
+        return self.get_resource('aclient', lambda: aio_client.AsyncHttpClient(
+            self.id,
+            self.pw,
+            self.api_version,
+            pool_size=self.pool_size,
+            timeout=self.timeout,
+            request_scheduler=self.scheduler,
+            max_retries=self.max_retries,
+            cache=self.http_cache,
+            hooks=[self.metrics],
+            transport=self._create_async_transport(),
+            max_page_size=self.max_page_size
+            ))
+
+    def _create_adapter(self) -> transport.RecordReplayAdapter:
+        if self.transport_mode == None:
+            return None
+        return transport.RecordReplayAdapter(self.transport_archive, self.transport_mode, pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+
+    def _create_async_transport(self) -> transport.AsyncRecordReplayTransport:
+        if self.transport_mode == None:
+            return None
+        return transport.AsyncRecordReplayTransport(self.transport_archive, self.transport_mode)
+
+    def get_url_base(self, area :str) -> str:
+        """
+
+        APIのベースURLを取得する。
+
+        Args:
+            area (str): APIのエリア(git, wit等)
+
+        Returns:
+            str: ベースURL(末尾は/)
+
+        """
+        return self.url_core + self.organization + '/' + self.project + '/_apis/' + area + '/'
+
+    def get_page_size(self, endpoint :str) -> int:
+        """
+
+        エンドポイントのページサイズを取得する。
+        サーバーの1ページの最大件数を超えるページサイズは最大件数とする
+        (超えたまま要求すると、上限で切り詰められたページを最終ページと判定してしまうため)。
+
+        Args:
+            endpoint (str): エンドポイント名(pullrequests, commits, changes等)
+
+        Returns:
+            int: ページサイズ
+
+        """
+        return min(self.page_size_dict.get(endpoint, 100), self.max_page_size)
+
+    def export_metrics(self):
+        """
+
+        リクエストの計測結果を設定された出力先へ出力する。
+
+        """
+        if self.metrics_prometheus_path != None:
+            self.metrics.write_prometheus(self.metrics_prometheus_path)
+        if self.metrics_summary_path != None:
+            self.metrics.write_summary(self.metrics_summary_path)
+        if self.metrics_trace_path != None:
+            self.metrics.write_trace(self.metrics_trace_path)
+
+    def close(self):
+        """
+
+        生成済みのリソースを閉じる。
+        非同期クライアントは閉じないため、イベントループ内で aclient.close() を待機すること。
+
+        """
+        with self._lock:
+            resource_list = list(self._resource_dict.values())
+            self._resource_dict.clear()
+
+        for resource in resource_list:
+            close = getattr(resource, 'close', None)
+            if close == None or asyncio.iscoroutinefunction(close):
+                continue
+            close()
+
+
+_default_context = None
+_default_context_lock = threading.Lock()
+
+_current_context = contextvars.ContextVar('context', default=None)
+
+
+def get_default_context() -> Context:
+    """
+
+    既定のコンテキストを取得する。
+    初回呼び出し時に、カレントディレクトリの設定ファイル(settings_app.json/settings_logger.json)を読み込む。
+
+    Returns:
+        Context: 既定のコンテキスト
+
+    """
+    global _default_context
+    with _default_context_lock:
+        if _default_context == None:
+            settings.get_settings_logger_data()
+            _default_context = Context(settings.get_settings_app_data())
+        return _default_context
+
+
+def get_context() -> Context:
+    """
+
+    現在のコンテキストを取得する。use()で指定されていない場合は既定のコンテキスト。
+
+    Returns:
+        Context: 現在のコンテキスト
+
+    """
+    ctx = _current_context.get()
+    if ctx != None:
+        return ctx
+    return get_default_context()
+
+
+def set_context(ctx :Context):
+    """
+
+    現在のスレッドのコンテキストを設定する。スレッドプールのinitializerに指定する。
+
+    Args:
+        ctx (Context): コンテキスト
+
+    """
+    _current_context.set(ctx)
+
+
+@contextlib.contextmanager
+def use(ctx :Context):
+    """
+
+    with文の範囲で現在のコンテキストを切り替える。
+    非同期タスクは生成時のコンテキストを引き継ぐ。
+
+    Args:
+        ctx (Context): コンテキスト
+
+    """
+    token = _current_context.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current_context.reset(token)
+
+
+def get_client() -> http_client.HttpClient:
+    return get_context().client
+
+
+def get_async_client() -> aio_client.AsyncHttpClient:
+    return get_context().aclient
+
+
+def get_page_size(endpoint :str) -> int:
+    return get_context().get_page_size(endpoint)
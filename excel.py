@@ -1,24 +1,78 @@
-import openpyxl
+import csv
+import os
 
-def get_repo_dict(file_path):
-    MAX_ROWS=10000
+def iter_repo_pr(file_path, sheet_name='Sheet1'):
+    """
 
-    wb = openpyxl.load_workbook(file_path)
-    ws = wb["Sheet1"]
+    リポジトリID-PRIDの一覧ファイル(Excel/CSV)を先頭から1行ずつ読み込む。
+    1行目は見出し行とし、1列目(リポジトリID)が空の行で終了する。
+    Excelは読み取り専用モードで行を順に読み込むため、行数の上限はなく、メモリ使用量はファイルサイズに依存しない。
 
-    repo_dict = {}
+    Args:
+        file_path (str): ファイルのパス。拡張子が.csvの場合はCSVとして読み込む。
+        sheet_name (str): シート名(Excelの場合)
+
+    Yields:
+        tuple: (リポジトリID, PRID)
+
+    """
+    if os.path.splitext(file_path)[1].lower() == '.csv':
+        yield from _iter_csv_repo_pr(file_path)
+        return
+
+    # openpyxlはExcelの読み込み時のみ必要なため、遅延して読み込む
+    import openpyxl
+
+    wb = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        ws = wb[sheet_name]
+
+        for row in ws.iter_rows(min_row=2, max_col=2, values_only=True):
+            repository_id = row[0] if len(row) > 0 else None
+            if repository_id == None:
+                break
+            pull_request_id = row[1] if len(row) > 1 else None
+
+            yield (repository_id, pull_request_id)
+    finally:
+        # 読み取り専用モードはファイルを開いたままのため閉じる
+        wb.close()
+
+def _iter_csv_repo_pr(file_path):
+    with open(file_path, 'r', newline='', encoding='utf-8-sig') as csv_file:
+        reader = csv.reader(csv_file)
+        next(reader, None)
 
-    for num in range(MAX_ROWS):
-        repository_id = ws.cell(row=num + 2, column=1).value
-        if repository_id == None:
-            break
-        pull_request_id = ws.cell(row=num + 2, column=2).value
+        for row in reader:
+            repository_id = row[0] if len(row) > 0 and row[0] != '' else None
+            if repository_id == None:
+                break
+            pull_request_id = row[1] if len(row) > 1 and row[1] != '' else None
+            # Excelと同様にPRIDは数値とする
+            if pull_request_id != None and pull_request_id.isdigit():
+                pull_request_id = int(pull_request_id)
 
-        if repository_id in repo_dict.keys():
+            yield (repository_id, pull_request_id)
+
+def get_repo_dict(file_path, sheet_name='Sheet1'):
+    """
+
+    リポジトリID-PRIDの一覧ファイル(Excel/CSV)より、リポジトリID-PRIDリスト辞書を作成する。
+
+    Args:
+        file_path (str): ファイルのパス。拡張子が.csvの場合はCSVとして読み込む。
+        sheet_name (str): シート名(Excelの場合)
+
+    Returns:
+        dict: リポジトリID-PRIDリスト辞書(key:repository_id, value:PRIDのリスト)
+
+    """
+    repo_dict = {}
+
+    for repository_id, pull_request_id in iter_repo_pr(file_path, sheet_name):
+        if repository_id in repo_dict:
             repo_dict[repository_id].append(pull_request_id)
         else:
-            list = [pull_request_id]
-            repo_dict[repository_id] = list
+            repo_dict[repository_id] = [pull_request_id]
 
     return repo_dict
-
@@ -1,6 +1,11 @@
-from requests import RequestException
+from concurrent.futures import ThreadPoolExecutor
+from requests import HTTPError, RequestException
+import asyncio
+import math
+import context
 import work_item
 import git_repo
+import git_mirror
 from logging import getLogger
 
 logger = getLogger(__name__)
@@ -9,6 +14,8 @@ def get_pr_dict(work_item_id: int, branch_name: str) -> dict:
     """
 
     WorkItemに設定されたPRについてPR辞書を取得する。
+    リポジトリ毎に、WorkItemのPRの件数とリポジトリのPRの推定件数より、
+    PRの個別取得(並列)とターゲットブランチ向けの全PRの一覧取得のうち、リクエスト数の少ない方式を選択する。
 
     Args:
         work_item_id (str): WorkItemのID
@@ -17,40 +24,30 @@ def get_pr_dict(work_item_id: int, branch_name: str) -> dict:
     Returns:
         PR辞書(key:pr_id(int), value:PR(PullRequest))。取得不可の場合はNone。
 
-    """   
+    """
     try:
         work_item_pr_id_dict = work_item.get_pr_id_dict(work_item_id)
 
-        # WorkItemに設定されたPRのリポジトリ一覧(repo_list)を作成(重複リポジトリは排除)する
-        # pr_list(repo_id(str)) 
-        repo_list = []
-        for pr_id in work_item_pr_id_dict.keys():
-            repo_id = work_item_pr_id_dict[pr_id]
-            repo_list.append(repo_id)
-        repo_list = list(set(repo_list))
+        # WorkItemに設定されたPRのリポジトリID-PRIDリスト辞書を作成する
+        repo_id_wi_pr_id_list_dict = _to_repo_id_wi_pr_id_list_dict(work_item_pr_id_dict)
 
-        # リポジトリ一覧(repo_list)の全リポジトリについて、
+        # リポジトリ毎に、WorkItemのPRを個別に取得するか、
         # GitRepoを照会し、該当するターゲットブランチ向けの全PRを取得の上、
         # GitRepoPR辞書(git_repo_list_pr_dict)を作成する
         # git_repo_list_pr_dict(key:pr_id(int)、value:PR(PullRequest))
-        git_repo_list_pr_dict = {}
-        for repo_id in repo_list:
-            git_repo_pr_dict = git_repo.get_pr_dict(repo_id, branch_name, 'all')
-            for pr_id in git_repo_pr_dict.keys():
-                pr = git_repo_pr_dict[pr_id]
-                git_repo_list_pr_dict[pr_id] = pr
-
-        # WorkItemに設定されたPRについて、
-        # GitRepoPR辞書(git_repo_list_pr_dict)をもとにPR辞書(pr_dict)を作成する
-        # pr_dict(key:pr_id(int)、value:PR(PullRequest)) 
-        pr_dict = {}
-        for pr_id in work_item_pr_id_dict.keys():
-            pr = git_repo_list_pr_dict.get(pr_id)
-            if pr != None and pr.target_branch == branch_name:
-                pr_dict[pr_id] = pr
+        git_repo_pr_dict_list = []
+        for repo_id, wi_pr_id_list in repo_id_wi_pr_id_list_dict.items():
+            if _is_direct_pr_lookup(repo_id, branch_name, len(wi_pr_id_list)):
+                git_repo_pr_dict_list.append(_get_pr_dict_direct(repo_id, wi_pr_id_list, branch_name))
+            else:
+                git_repo_pr_dict = git_repo.get_pr_dict(repo_id, branch_name, 'all')
+                _put_pr_count(repo_id, branch_name, len(git_repo_pr_dict))
+                git_repo_pr_dict_list.append(git_repo_pr_dict)
+
+        pr_dict = _to_pr_dict(work_item_pr_id_dict, git_repo_pr_dict_list, branch_name)
     except RequestException as e:
         logger.error(e)
-        logger.error("request failed. error=(%s)", e.response.text)
+        logger.error("request failed. error=(%s)", e.response.text if e.response != None else str(e))
         raise e
     except Exception as e:
         logger.error(e)
@@ -58,7 +55,7 @@ def get_pr_dict(work_item_id: int, branch_name: str) -> dict:
 
     return pr_dict
 
-def print_changed_filepath_dict_by_pr(work_item_id: int, branch_name: str):
+def print_changed_filepath_dict_by_pr(work_item_id: int, branch_name: str, strategy: str=None):
     """
 
     WorkItemに設定されたPRより変更パス-変更種類辞書を作成し、ログ出力する
@@ -66,32 +63,29 @@ def print_changed_filepath_dict_by_pr(work_item_id: int, branch_name: str):
     Args:
         work_item_id (str): WorkItemのID
         branch_name (str): ターゲットブランチ名
+        strategy (str): PRの変更パス取得方式(commits/iterations)。Noneの場合は設定値を使用する。
+
+    Returns:
+        dict: リポジトリ名-変更パス-変更種類辞書(key:リポジトリ名(str), value:変更パス-変更種類辞書)
 
-    """   
+    """
     try:
         # WorkItemに設定されたPRよりPR辞書を取得
         pr_dict = get_pr_dict(work_item_id, branch_name)
 
         # PR辞書より、リポジトリID-PRIDリスト辞書を作成する
-        repo_id_pr_id_list_dict = {}
-        for pr_id in pr_dict.keys():
-            pr = pr_dict[pr_id]
-            pr_id_list = repo_id_pr_id_list_dict.get(pr.repo_id)
-            if pr_id_list == None:
-                pr_id_list = []
-            pr_id_list.append(pr_id)
-            repo_id_pr_id_list_dict[pr.repo_id] = pr_id_list
-        
-        return print_changed_filepath_dict(repo_id_pr_id_list_dict)
+        repo_id_pr_id_list_dict = _to_repo_id_pr_id_list_dict(pr_dict)
+
+        return print_changed_filepath_dict(repo_id_pr_id_list_dict, strategy, branch_name)
     except RequestException as e:
         logger.error(e)
-        logger.error("request failed. error=(%s)", e.response.text)
+        logger.error("request failed. error=(%s)", e.response.text if e.response != None else str(e))
         raise e
     except Exception as e:
         logger.error(e)
         raise e
 
-def print_changed_filepath_dict_by_repo_pr(work_item_id: int, branch_name: str):
+def print_changed_filepath_dict_by_repo_pr(work_item_id: int, branch_name: str, strategy: str=None):
     """
 
     WorkItemに設定されたリポジトリよりマージ済みPRから変更パス-変更種類辞書を作成し、ログ出力する
@@ -99,80 +93,81 @@ def print_changed_filepath_dict_by_repo_pr(work_item_id: int, branch_name: str):
     Args:
         work_item_id (str): WorkItemのID
         branch_name (str): ターゲットブランチ名
+        strategy (str): PRの変更パス取得方式(commits/iterations)。Noneの場合は設定値を使用する。
+
+    Returns:
+        dict: リポジトリ名-変更パス-変更種類辞書(key:リポジトリ名(str), value:変更パス-変更種類辞書)
 
-    """   
+    """
     try:
         repo_id_list = work_item.get_repo_list(work_item_id)
-        
+
         repo_id_pr_id_list_dict = {}
         for repo_id in repo_id_list:
             pr_id_list = git_repo.get_pr_id_list(repo_id, branch_name, 'completed')
             if len(pr_id_list) != 0:
                 repo_id_pr_id_list_dict[repo_id] = pr_id_list
 
-        return print_changed_filepath_dict(repo_id_pr_id_list_dict)
+        return print_changed_filepath_dict(repo_id_pr_id_list_dict, strategy, branch_name)
     except RequestException as e:
         logger.error(e)
-        logger.error("request failed. error=(%s)", e.response.text)
+        logger.error("request failed. error=(%s)", e.response.text if e.response != None else str(e))
         raise e
     except Exception as e:
         logger.error(e)
         raise e
 
 
-def print_changed_filepath_dict(repo_id_pr_id_list_dict:dict):
+def print_changed_filepath_dict(repo_id_pr_id_list_dict:dict, strategy: str=None, branch_name: str=None):
     """
 
     リポジトリID-PRID辞書より、変更パス-変更種類辞書を作成し、ログ出力する
+    ローカルのミラーを利用する場合(git_mirror_dirを設定)は、ターゲットブランチ上のPRのマージコミットより作成する。
 
     Args:
         repo_id_pr_id_list_dict (dict): レポジトリID-PRIDリスト辞書
+        strategy (str): PRの変更パス取得方式(commits/iterations)。Noneの場合は設定値を使用する。
+        branch_name (str): ターゲットブランチ名。Noneの場合はローカルのミラーを利用しない。
 
-    """  
+    Returns:
+        dict: リポジトリ名-変更パス-変更種類辞書(key:リポジトリ名(str), value:変更パス-変更種類辞書)
+
+    """
 
     try:
-            
+        # 全リポジトリの全PRについて、変更パス-変更種類辞書を並列に取得する。
+        # 取得結果は(リポジトリID, PRID)のリストと同じ順序で返却される。
+        repo_pr_id_list = _to_repo_pr_id_list(repo_id_pr_id_list_dict)
+        if branch_name != None and git_mirror.is_enabled():
+            all_path_type_dict_list = git_mirror.get_pr_path_dict_list(repo_pr_id_list, branch_name, strategy)
+        else:
+            all_path_type_dict_list = git_repo.get_pr_path_dict_list(repo_pr_id_list, strategy=strategy)
+
+        repo_path_type_dict = {}
+        index = 0
         for repo_id in repo_id_pr_id_list_dict.keys():
-            logger.info('■' + git_repo.get_repo_name(repo_id))
-
             pr_id_list = repo_id_pr_id_list_dict[repo_id]
 
-            # 古いPRIDから順に処理するようにするため、PR_IDの昇順ソートを行う
-            pr_id_list.sort()
+            # PRID毎の変更パス-変更種類辞書リストを取得する。
+            path_type_dict_list = all_path_type_dict_list[index:index + len(pr_id_list)]
+            index += len(pr_id_list)
 
-            # PRID毎に変更パス-変更種類辞書を取得し、変更パス-変更種類辞書リストを取得する。、
-            path_type_dict_list = []
-            for pr_id in pr_id_list:
-                path_type_dict = git_repo.get_pr_path_dict_by_pr(repo_id, pr_id)
-                path_type_dict_list.append(path_type_dict)
-
-            # # 古いPRから順に処理するようにするため、PR_IDの昇順ソートを行う
-            # path_type_dict_list.reverse()
-
-            # 変更パス-変更種類辞書リストより、最新の変更パス-変更種類辞書を作成する。
-            # 変更パス-変更種類辞書リストは古い順にソートされているため、
-            # 順番に処理していることで重複パスは最新状態に更新され、非重複パスは追加される。
-            newest_path_type_dict = {}
-            for path_type_dict in path_type_dict_list:
-                for path in path_type_dict:
-                    newest_path_type_dict[path] = path_type_dict[path]
-
-            # 最新の変更パス-変更種類辞書を昇順ソートする。
-            # ソートではリスト型となるため、辞書型へ変換する
-            newest_path_type_sorted_list = sorted(newest_path_type_dict.items(), key=lambda x:x[0])
-            newest_path_type_dict.clear()
-            newest_path_type_dict.update(newest_path_type_sorted_list)
+            repo_name = git_repo.get_repo_name(repo_id)
+            logger.info('■' + repo_name)
 
+            newest_path_type_dict = _to_newest_path_type_dict(path_type_dict_list)
             for path in newest_path_type_dict:
                 logger.info(
                     newest_path_type_dict[path].ljust(10)
                     + ': '
                     + path
                     )
+            repo_path_type_dict[repo_name] = newest_path_type_dict
 
+        return repo_path_type_dict
     except RequestException as e:
         logger.error(e)
-        logger.error("request failed. error=(%s)", e.response.text)
+        logger.error("request failed. error=(%s)", e.response.text if e.response != None else str(e))
         raise e
     except Exception as e:
         logger.error(e)
@@ -183,20 +178,29 @@ def print_changed_filepath_dict_by_repo_diff_branch(work_item_id: int, source_br
     """
 
     WorkItemに設定されたリポジトリより変更パス-変更種類辞書を作成し、ログ出力する
+    ローカルのミラーを利用する場合(git_mirror_dirを設定)は、ミラーのブランチ差分より作成する。
 
     Args:
         work_item_id (str): WorkItemのID
         source_branch_name (str): マージ元ブランチ名
         target_branch_name (str): マージ先ブランチ名
 
-    """   
+    Returns:
+        dict: リポジトリ名-変更パス-変更種類辞書(key:リポジトリ名(str), value:変更パス-変更種類辞書)
+
+    """
     try:
         repo_id_list = work_item.get_repo_list(work_item_id)
-        
+
+        repo_path_type_dict = {}
         for repo_id in repo_id_list:
-            logger.info('■' + git_repo.get_repo_name(repo_id))
+            repo_name = git_repo.get_repo_name(repo_id)
+            logger.info('■' + repo_name)
 
-            path_type_dict = git_repo.get_pr_path_dict_by_diff_branch(repo_id, source_branch_name, target_branch_name)
+            if git_mirror.is_enabled():
+                path_type_dict = git_mirror.get_pr_path_dict_by_diff_branch(repo_id, source_branch_name, target_branch_name)
+            else:
+                path_type_dict = git_repo.get_pr_path_dict_by_diff_branch(repo_id, source_branch_name, target_branch_name)
 
             for path in path_type_dict:
                 logger.info(
@@ -204,10 +208,12 @@ def print_changed_filepath_dict_by_repo_diff_branch(work_item_id: int, source_br
                     + ': '
                     + path
                     )
+            repo_path_type_dict[repo_name] = path_type_dict
 
+        return repo_path_type_dict
     except RequestException as e:
         logger.error(e)
-        logger.error("request failed. error=(%s)", e.response.text)
+        logger.error("request failed. error=(%s)", e.response.text if e.response != None else str(e))
         raise e
     except Exception as e:
         logger.error(e)
@@ -226,7 +232,7 @@ def check_merged(work_item_id: int, branch_name: str) -> bool:
     Returns:
         bool: チェック結果
 
-    """  
+    """
 
     # PRマージ済みフラグ
     is_all_merged=True
@@ -235,14 +241,7 @@ def check_merged(work_item_id: int, branch_name: str) -> bool:
     pr_dict = get_pr_dict(work_item_id, branch_name)
 
     # PR辞書より、リポジトリID-PRIDリスト辞書を作成する
-    repo_id_pr_id_list_dict = {}
-    for pr_id in pr_dict.keys():
-        pr = pr_dict[pr_id]
-        pr_id_list = repo_id_pr_id_list_dict.get(pr.repo_id)
-        if pr_id_list == None:
-            pr_id_list = []
-        pr_id_list.append(pr_id)
-        repo_id_pr_id_list_dict[pr.repo_id] = pr_id_list
+    repo_id_pr_id_list_dict = _to_repo_id_pr_id_list_dict(pr_dict)
 
     # リポジトリID-PRIDリスト辞書より取得したwIのPRリストと
     # GITREPOより取得したマージ済みのPRリストを比較し、
@@ -268,3 +267,371 @@ def check_merged(work_item_id: int, branch_name: str) -> bool:
         logger.info(list(pr_not_merged_set))
 
     return is_all_merged
+
+
+async def get_pr_dict_async(work_item_id: int, branch_name: str) -> dict:
+    """
+
+    WorkItemに設定されたPRについてPR辞書を非同期に取得する。
+    リポジトリ毎のPR取得は並行に行う。取得方式の選択はget_pr_dictと同様。
+
+    Args:
+        work_item_id (str): WorkItemのID
+        branch_name (str): ターゲットブランチ名
+
+    Returns:
+        PR辞書(key:pr_id(int), value:PR(PullRequest))。
+
+    """
+    try:
+        work_item_pr_id_dict = await work_item.get_pr_id_dict_async(work_item_id)
+
+        repo_id_wi_pr_id_list_dict = _to_repo_id_wi_pr_id_list_dict(work_item_pr_id_dict)
+
+        git_repo_pr_dict_list = await asyncio.gather(*[
+            _get_repo_pr_dict_async(repo_id, wi_pr_id_list, branch_name)
+            for repo_id, wi_pr_id_list in repo_id_wi_pr_id_list_dict.items()
+            ])
+
+        return _to_pr_dict(work_item_pr_id_dict, git_repo_pr_dict_list, branch_name)
+    except Exception as e:
+        logger.error(e)
+        raise e
+
+async def print_changed_filepath_dict_by_pr_async(work_item_id: int, branch_name: str, strategy: str=None):
+    """
+
+    WorkItemに設定されたPRより変更パス-変更種類辞書を非同期に作成し、ログ出力する
+
+    Args:
+        work_item_id (str): WorkItemのID
+        branch_name (str): ターゲットブランチ名
+        strategy (str): PRの変更パス取得方式(commits/iterations)。Noneの場合は設定値を使用する。
+
+    Returns:
+        dict: リポジトリ名-変更パス-変更種類辞書(key:リポジトリ名(str), value:変更パス-変更種類辞書)
+
+    """
+    pr_dict = await get_pr_dict_async(work_item_id, branch_name)
+
+    return await print_changed_filepath_dict_async(_to_repo_id_pr_id_list_dict(pr_dict), strategy)
+
+async def print_changed_filepath_dict_by_repo_pr_async(work_item_id: int, branch_name: str, strategy: str=None):
+    """
+
+    WorkItemに設定されたリポジトリよりマージ済みPRから変更パス-変更種類辞書を非同期に作成し、ログ出力する
+
+    Args:
+        work_item_id (str): WorkItemのID
+        branch_name (str): ターゲットブランチ名
+        strategy (str): PRの変更パス取得方式(commits/iterations)。Noneの場合は設定値を使用する。
+
+    Returns:
+        dict: リポジトリ名-変更パス-変更種類辞書(key:リポジトリ名(str), value:変更パス-変更種類辞書)
+
+    """
+    try:
+        repo_id_list = await work_item.get_repo_list_async(work_item_id)
+
+        pr_id_list_list = await asyncio.gather(*[
+            git_repo.get_pr_id_list_async(repo_id, branch_name, 'completed') for repo_id in repo_id_list
+            ])
+
+        repo_id_pr_id_list_dict = {}
+        for repo_id, pr_id_list in zip(repo_id_list, pr_id_list_list):
+            if len(pr_id_list) != 0:
+                repo_id_pr_id_list_dict[repo_id] = pr_id_list
+    except Exception as e:
+        logger.error(e)
+        raise e
+
+    return await print_changed_filepath_dict_async(repo_id_pr_id_list_dict, strategy)
+
+async def print_changed_filepath_dict_async(repo_id_pr_id_list_dict:dict, strategy: str=None):
+    """
+
+    リポジトリID-PRID辞書より、変更パス-変更種類辞書を非同期に作成し、ログ出力する
+
+    Args:
+        repo_id_pr_id_list_dict (dict): レポジトリID-PRIDリスト辞書
+        strategy (str): PRの変更パス取得方式(commits/iterations)。Noneの場合は設定値を使用する。
+
+    Returns:
+        dict: リポジトリ名-変更パス-変更種類辞書(key:リポジトリ名(str), value:変更パス-変更種類辞書)
+
+    """
+    try:
+        repo_pr_id_list = _to_repo_pr_id_list(repo_id_pr_id_list_dict)
+        repo_id_list = list(repo_id_pr_id_list_dict.keys())
+
+        all_path_type_dict_list, repo_name_list = await asyncio.gather(
+            git_repo.get_pr_path_dict_list_async(repo_pr_id_list, strategy),
+            asyncio.gather(*[git_repo.get_repo_name_async(repo_id) for repo_id in repo_id_list])
+            )
+
+        repo_path_type_dict = {}
+        index = 0
+        for repo_id, repo_name in zip(repo_id_list, repo_name_list):
+            pr_id_list = repo_id_pr_id_list_dict[repo_id]
+
+            path_type_dict_list = all_path_type_dict_list[index:index + len(pr_id_list)]
+            index += len(pr_id_list)
+
+            logger.info('■' + repo_name)
+
+            newest_path_type_dict = _to_newest_path_type_dict(path_type_dict_list)
+            for path in newest_path_type_dict:
+                logger.info(
+                    newest_path_type_dict[path].ljust(10)
+                    + ': '
+                    + path
+                    )
+            repo_path_type_dict[repo_name] = newest_path_type_dict
+
+        return repo_path_type_dict
+    except Exception as e:
+        logger.error(e)
+        raise e
+
+async def print_changed_filepath_dict_by_repo_diff_branch_async(work_item_id: int, source_branch_name: str, target_branch_name: str):
+    """
+
+    WorkItemに設定されたリポジトリより変更パス-変更種類辞書を非同期に作成し、ログ出力する
+
+    Args:
+        work_item_id (str): WorkItemのID
+        source_branch_name (str): マージ元ブランチ名
+        target_branch_name (str): マージ先ブランチ名
+
+    Returns:
+        dict: リポジトリ名-変更パス-変更種類辞書(key:リポジトリ名(str), value:変更パス-変更種類辞書)
+
+    """
+    try:
+        repo_id_list = await work_item.get_repo_list_async(work_item_id)
+
+        path_type_dict_list, repo_name_list = await asyncio.gather(
+            asyncio.gather(*[
+                git_repo.get_pr_path_dict_by_diff_branch_async(repo_id, source_branch_name, target_branch_name)
+                for repo_id in repo_id_list
+                ]),
+            asyncio.gather(*[git_repo.get_repo_name_async(repo_id) for repo_id in repo_id_list])
+            )
+
+        repo_path_type_dict = {}
+        for repo_name, path_type_dict in zip(repo_name_list, path_type_dict_list):
+            logger.info('■' + repo_name)
+
+            for path in path_type_dict:
+                logger.info(
+                    path_type_dict[path].ljust(10)
+                    + ': '
+                    + path
+                    )
+            repo_path_type_dict[repo_name] = path_type_dict
+
+        return repo_path_type_dict
+    except Exception as e:
+        logger.error(e)
+        raise e
+
+async def check_merged_async(work_item_id: int, branch_name: str) -> bool:
+    """
+
+    WorkItemに設定されたPRよりマージ状況のチェックを非同期に行う
+
+    Args:
+        work_item_id (str): WorkItemのID
+        branch_name (str): ターゲットブランチ名
+
+    Returns:
+        bool: チェック結果
+
+    """
+    pr_dict = await get_pr_dict_async(work_item_id, branch_name)
+
+    repo_id_pr_id_list_dict = _to_repo_id_pr_id_list_dict(pr_dict)
+    repo_id_list = list(repo_id_pr_id_list_dict.keys())
+
+    git_pr_id_list_list, repo_name_list = await asyncio.gather(
+        asyncio.gather(*[
+            git_repo.get_pr_id_list_async(repo_id, branch_name, 'completed') for repo_id in repo_id_list
+            ]),
+        asyncio.gather(*[git_repo.get_repo_name_async(repo_id) for repo_id in repo_id_list])
+        )
+
+    is_all_merged=True
+    for repo_id, repo_name, git_pr_id_list in zip(repo_id_list, repo_name_list, git_pr_id_list_list):
+        wi_pr_id_list = repo_id_pr_id_list_dict[repo_id]
+
+        pr_merged_set = set(wi_pr_id_list) & set(git_pr_id_list)
+        pr_not_merged_set = set(wi_pr_id_list) - set(git_pr_id_list)
+
+        if len(pr_not_merged_set)!=0:
+            is_all_merged=False
+
+        logger.info('■' + repo_name)
+        logger.info('==PRマージ済み==')
+        logger.info(list(pr_merged_set))
+        logger.info('==PRマージ未了==')
+        logger.info(list(pr_not_merged_set))
+
+    return is_all_merged
+
+
+async def _get_repo_pr_dict_async(repo_id: str, wi_pr_id_list: list, branch_name: str) -> dict:
+    if _is_direct_pr_lookup(repo_id, branch_name, len(wi_pr_id_list)):
+        pr_list = await asyncio.gather(*[
+            _get_pr_or_none_async(repo_id, pr_id, branch_name) for pr_id in wi_pr_id_list
+            ])
+        return _to_git_repo_pr_dict(pr_list)
+
+    git_repo_pr_dict = await git_repo.get_pr_dict_async(repo_id, branch_name, 'all')
+    _put_pr_count(repo_id, branch_name, len(git_repo_pr_dict))
+    return git_repo_pr_dict
+
+async def _get_pr_or_none_async(repo_id: str, pr_id: int, branch_name: str):
+    # aiohttpは遅延して読み込むため、例外はステータスで判定する
+    try:
+        return await git_repo.get_pr_async(repo_id, pr_id, branch_name)
+    except Exception as e:
+        if getattr(e, 'status', None) == 404:
+            return None
+        raise e
+
+
+def _to_repo_id_wi_pr_id_list_dict(work_item_pr_id_dict: dict) -> dict:
+    """
+
+    PRID-リポジトリID辞書より、リポジトリID-PRIDリスト辞書を作成する
+
+    """
+    repo_id_wi_pr_id_list_dict = {}
+    for pr_id in work_item_pr_id_dict.keys():
+        repo_id = work_item_pr_id_dict[pr_id]
+        repo_id_wi_pr_id_list_dict.setdefault(repo_id, []).append(pr_id)
+    return repo_id_wi_pr_id_list_dict
+
+def _get_pr_count_dict() -> dict:
+    # 一覧取得で判明したPRの件数(key:(リポジトリID, ターゲットブランチ名), value:件数)
+    return context.get_context().get_resource('pr_count_dict', dict)
+
+def _put_pr_count(repo_id: str, branch_name: str, pr_count: int):
+    _get_pr_count_dict()[(repo_id, branch_name)] = pr_count
+
+def _is_direct_pr_lookup(repo_id: str, branch_name: str, wi_pr_count: int) -> bool:
+    """
+
+    WorkItemのPRを個別に取得するかを判定する。
+    一覧取得のページ数(リポジトリのPRの推定件数/ページサイズ)×pr_direct_lookup_ratio以下の件数であれば個別に取得する。
+    PRの推定件数は、一覧取得済みの場合はその件数、未取得の場合は設定値(pr_count_estimate)とする。
+
+    """
+    ctx = context.get_context()
+    # PRインデックスを利用する場合、一覧取得はローカルへの照会となるため個別に取得しない
+    if ctx.pr_index_path != None:
+        return False
+
+    pr_count = _get_pr_count_dict().get((repo_id, branch_name), ctx.pr_count_estimate)
+    page_count = max(1, math.ceil(pr_count / ctx.get_page_size('pullrequests')))
+    return wi_pr_count <= page_count * ctx.pr_direct_lookup_ratio
+
+def _get_pr_dict_direct(repo_id: str, wi_pr_id_list: list, branch_name: str) -> dict:
+    """
+
+    PRを個別に並列に取得し、PR辞書を作成する。存在しないPRは除外する。
+
+    """
+    ctx = context.get_context()
+    # ワーカースレッドへ現在のコンテキストを引き継ぐ
+    with ThreadPoolExecutor(max_workers=min(ctx.max_workers, len(wi_pr_id_list)), initializer=context.set_context, initargs=(ctx,)) as executor:
+        pr_list = list(executor.map(
+            lambda pr_id: _get_pr_or_none(repo_id, pr_id, branch_name),
+            wi_pr_id_list
+            ))
+    return _to_git_repo_pr_dict(pr_list)
+
+def _get_pr_or_none(repo_id: str, pr_id: int, branch_name: str):
+    try:
+        return git_repo.get_pr(repo_id, pr_id, branch_name)
+    except HTTPError as e:
+        if e.response != None and e.response.status_code == 404:
+            return None
+        raise e
+
+def _to_git_repo_pr_dict(pr_list: list) -> dict:
+    git_repo_pr_dict = {}
+    for pr in pr_list:
+        if pr != None:
+            git_repo_pr_dict[pr.pr_id] = pr
+    return git_repo_pr_dict
+
+def _to_pr_dict(work_item_pr_id_dict: dict, git_repo_pr_dict_list: list, branch_name: str) -> dict:
+    """
+
+    WorkItemに設定されたPRについて、GitRepoより取得したPR辞書のリストをもとにPR辞書を作成する
+
+    """
+    git_repo_list_pr_dict = {}
+    for git_repo_pr_dict in git_repo_pr_dict_list:
+        git_repo_list_pr_dict.update(git_repo_pr_dict)
+
+    # pr_dict(key:pr_id(int)、value:PR(PullRequest))
+    pr_dict = {}
+    for pr_id in work_item_pr_id_dict.keys():
+        pr = git_repo_list_pr_dict.get(pr_id)
+        if pr != None and pr.target_branch == branch_name:
+            pr_dict[pr_id] = pr
+    return pr_dict
+
+def _to_repo_id_pr_id_list_dict(pr_dict: dict) -> dict:
+    """
+
+    PR辞書より、リポジトリID-PRIDリスト辞書を作成する
+
+    """
+    repo_id_pr_id_list_dict = {}
+    for pr_id in pr_dict.keys():
+        pr = pr_dict[pr_id]
+        pr_id_list = repo_id_pr_id_list_dict.get(pr.repo_id)
+        if pr_id_list == None:
+            pr_id_list = []
+        pr_id_list.append(pr_id)
+        repo_id_pr_id_list_dict[pr.repo_id] = pr_id_list
+    return repo_id_pr_id_list_dict
+
+def _to_repo_pr_id_list(repo_id_pr_id_list_dict: dict) -> list:
+    """
+
+    リポジトリID-PRIDリスト辞書より、(リポジトリID, PRID)のリストを作成する
+    古いPRIDから順に処理するようにするため、リポジトリ毎にPR_IDの昇順ソートを行う
+
+    """
+    repo_pr_id_list = []
+    for repo_id in repo_id_pr_id_list_dict.keys():
+        repo_id_pr_id_list_dict[repo_id].sort()
+        for pr_id in repo_id_pr_id_list_dict[repo_id]:
+            repo_pr_id_list.append((repo_id, pr_id))
+    return repo_pr_id_list
+
+def _to_newest_path_type_dict(path_type_dict_list: list) -> dict:
+    """
+
+    古い順の変更パス-変更種類辞書リストより、パス昇順の最新の変更パス-変更種類辞書を作成する
+
+    """
+    # 変更パス-変更種類辞書リストより、最新の変更パス-変更種類辞書を作成する。
+    # 変更パス-変更種類辞書リストは古い順にソートされているため、
+    # 順番に処理していることで重複パスは最新状態に更新され、非重複パスは追加される。
+    newest_path_type_dict = {}
+    for path_type_dict in path_type_dict_list:
+        for path in path_type_dict:
+            newest_path_type_dict[path] = path_type_dict[path]
+
+    # 最新の変更パス-変更種類辞書を昇順ソートする。
+    # ソートではリスト型となるため、辞書型へ変換する
+    newest_path_type_sorted_list = sorted(newest_path_type_dict.items(), key=lambda x:x[0])
+    newest_path_type_dict.clear()
+    newest_path_type_dict.update(newest_path_type_sorted_list)
+
+    return newest_path_type_dict
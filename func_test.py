@@ -1,6 +1,11 @@
 from logging import getLogger
+import settings
+import context
 import func
 
+# ログ設定を読み込む
+settings.get_settings_logger_data()
+
 logger = getLogger(__name__)
 
 logger.info('~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
@@ -20,3 +25,5 @@ func.print_changed_filepath_dict_by_repo_diff_branch(3, 'feature', 'master')
 logger.info('~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
 logger.info('CheckResult: ' + str(func.check_merged(3, 'master')))
 
+# リクエストの計測結果を出力する(出力先が設定されている場合)
+context.get_context().export_metrics()
@@ -0,0 +1,373 @@
+import base64
+import os
+import re
+import subprocess
+import threading
+import time
+import urllib.parse
+import context
+import git_repo
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# マージコミットのメッセージ(Azure DevOpsがPRの完了時に作成する)
+merge_message_pattern=re.compile(r'^Merged PR (\d+):')
+
+# git diff --name-status の状態より変更種類への変換(名前変更は削除と追加として扱う)
+change_type_dict={
+    'A': 'add',
+    'M': 'edit',
+    'T': 'edit',
+    'D': 'delete'
+}
+
+
+class GitMirror():
+    """
+
+    リポジトリ毎のローカルのベアリポジトリ(ブランチのみのミラー)。
+    初回利用時にベアリポジトリを作成し、以降は取得間隔秒数毎に差分のみを取得(fetch)する。
+    ブランチ差分・PRの変更パス・マージ状況を、REST APIを呼び出さずにローカルのgitで求める。
+
+    """
+
+    def __init__(self, mirror_dir :str, url_template :str, user :str=None, password :str=None, fetch_interval :float=60):
+        """
+
+        Args:
+            mirror_dir (str): ミラーを作成するディレクトリ
+            url_template (str): 取得元URLの書式({repo_id}/{repo_name}はリポジトリID/リポジトリ名に置換する)
+            user (str): 認証ユーザー(HTTP(S)の場合)
+            password (str): 認証パスワード・トークン(HTTP(S)の場合)
+            fetch_interval (float): 取得間隔秒数
+
+        """
+        self.mirror_dir = mirror_dir
+        self.url_template = url_template
+        self.user = user
+        self.password = password
+        self.fetch_interval = fetch_interval
+
+        self._lock = threading.Lock()
+        # key:リポジトリ名, value:最終取得日時(epoch秒)
+        self._fetched_at_dict = {}
+        # key:リポジトリ名, value:Lock
+        self._repo_lock_dict = {}
+        # key:(リポジトリ名, ブランチ名), value:(ブランチのコミット, PRID-(マージコミット, 第1親)辞書)
+        self._merge_commit_dict_cache = {}
+
+    def get_path(self, repo_name :str) -> str:
+        return os.path.join(self.mirror_dir, repo_name + '.git')
+
+    def get_url(self, repo_id :str, repo_name :str) -> str:
+        return self.url_template.format(repo_id=repo_id, repo_name=urllib.parse.quote(repo_name))
+
+    def update(self, repo_id :str, repo_name :str):
+        """
+
+        ミラーを最新化する。未作成の場合は作成し、前回の取得より取得間隔秒数を超過した場合は差分を取得する。
+
+        Args:
+            repo_id (str): レポジトリのID
+            repo_name (str): レポジトリ名
+
+        Raises:
+            subprocess.CalledProcessError: gitの実行に失敗した場合
+
+        """
+        with self._lock:
+            repo_lock = self._repo_lock_dict.setdefault(repo_name, threading.Lock())
+
+        with repo_lock:
+            fetched_at = self._fetched_at_dict.get(repo_name)
+            if fetched_at != None and time.time() - fetched_at < self.fetch_interval:
+                return
+
+            path = self.get_path(repo_name)
+            if not os.path.exists(path):
+                os.makedirs(self.mirror_dir, exist_ok=True)
+                self._run(['init', '--bare', '--quiet', path])
+                self._run(['remote', 'add', 'origin', self.get_url(repo_id, repo_name)], path)
+                # PRのrefs/pull/*等は不要なため、ブランチのみを取得する
+                self._run(['config', 'remote.origin.fetch', '+refs/heads/*:refs/heads/*'], path)
+
+            logger.info("fetch mirror. repo=(%s)", repo_name)
+            self._run(['fetch', '--prune', '--quiet', 'origin'], path, auth=True)
+            self._fetched_at_dict[repo_name] = time.time()
+
+    def get_diff_path_dict(self, repo_name :str, source_branch_name :str, target_branch_name :str) -> dict:
+        """
+
+        ブランチ差分(マージ先ブランチとの共通祖先からマージ元ブランチまで)の変更パス-変更種類辞書を取得する。
+
+        Args:
+            repo_name (str): レポジトリ名
+            source_branch_name (str): マージ元ブランチ名
+            target_branch_name (str): マージ先ブランチ名
+
+        Raises:
+            subprocess.CalledProcessError: gitの実行に失敗した場合
+
+        Returns:
+            dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
+
+        """
+        return self._diff(repo_name, _to_ref(target_branch_name) + '...' + _to_ref(source_branch_name))
+
+    def get_merge_commit_dict(self, repo_name :str, branch_name :str) -> dict:
+        """
+
+        ブランチの履歴(祖先)に含まれるPRのマージコミットの辞書を取得する。
+        他のブランチで完了したPRが、そのブランチのマージによりこのブランチへ取り込まれた場合も含む。
+        結果はブランチのコミットが変わるまで保持する。
+
+        Args:
+            repo_name (str): レポジトリ名
+            branch_name (str): ブランチ名
+
+        Raises:
+            subprocess.CalledProcessError: gitの実行に失敗した場合
+
+        Returns:
+            dict: PRID-マージコミット辞書(key:PRID(int), value:(マージコミット(str), 第1親のコミット(str)))
+
+        """
+        path = self.get_path(repo_name)
+        head = self._run(['rev-parse', _to_ref(branch_name)], path).strip()
+
+        key = (repo_name, branch_name)
+        with self._lock:
+            cached = self._merge_commit_dict_cache.get(key)
+        if cached != None and cached[0] == head:
+            return cached[1]
+
+        output = self._run([
+            'log', '--format=%H%x1f%P%x1f%s%x1e', '-E', '--grep=^Merged PR [0-9]+:', head
+            ], path)
+
+        merge_commit_dict = {}
+        for record in output.split('\x1e'):
+            record = record.strip()
+            if record == '':
+                continue
+            commit, parents, subject = record.split('\x1f', 2)
+            m = merge_message_pattern.match(subject)
+            if m == None:
+                continue
+            pr_id = int(m.group(1))
+            # 新しい順に出力されるため、同じPRIDは最新のマージコミットを採用する
+            if pr_id not in merge_commit_dict:
+                parent_list = parents.split()
+                merge_commit_dict[pr_id] = (commit, parent_list[0] if len(parent_list) != 0 else None)
+
+        with self._lock:
+            self._merge_commit_dict_cache[key] = (head, merge_commit_dict)
+        return merge_commit_dict
+
+    def get_pr_path_dict(self, repo_name :str, pr_id :int, branch_name :str) -> dict:
+        """
+
+        PRのマージコミットより、PRの変更パス-変更種類辞書を取得する。
+
+        Args:
+            repo_name (str): レポジトリ名
+            pr_id (int): PRのID
+            branch_name (str): ターゲットブランチ名
+
+        Raises:
+            subprocess.CalledProcessError: gitの実行に失敗した場合
+
+        Returns:
+            dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))。マージコミットが存在しない場合はNone。
+
+        """
+        merge_commit = self.get_merge_commit_dict(repo_name, branch_name).get(pr_id)
+        if merge_commit == None or merge_commit[1] == None:
+            return None
+        commit, parent = merge_commit
+        return self._diff(repo_name, parent, commit)
+
+    def is_ancestor(self, repo_name :str, commit :str, branch_name :str) -> bool:
+        """
+
+        コミットがブランチの祖先(マージ済み)であるかを判定する。
+
+        Args:
+            repo_name (str): レポジトリ名
+            commit (str): コミットID
+            branch_name (str): ブランチ名
+
+        Returns:
+            bool: 祖先の場合はTrue、祖先でない場合はFalse。判定できない場合(ミラーに存在しないコミット等)はNone。
+
+        """
+        result = subprocess.run(
+            ['git', 'merge-base', '--is-ancestor', commit, _to_ref(branch_name)],
+            cwd=self.get_path(repo_name),
+            capture_output=True
+            )
+        # 祖先の場合は0、祖先でない場合は1、コミット・ブランチが存在しない場合等はそれ以外を返却する
+        if result.returncode == 0:
+            return True
+        if result.returncode == 1:
+            return False
+        return None
+
+    def _diff(self, repo_name :str, *revision_list) -> dict:
+        output = self._run(['diff', '--name-status', '--no-renames', '-z'] + list(revision_list), self.get_path(repo_name))
+
+        # 出力は 状態\0パス\0 の繰り返し
+        field_list = output.split('\0')
+        path_dict = {}
+        for index in range(0, len(field_list) - 1, 2):
+            change_type = change_type_dict.get(field_list[index][0], 'edit')
+            path_dict['/' + field_list[index + 1]] = change_type
+        return path_dict
+
+    def _run(self, arg_list :list, cwd :str=None, auth :bool=False) -> str:
+        env = None
+        if auth and self.password != None:
+            # 認証ヘッダーはコマンドライン・設定ファイルに残さないよう、環境変数で指定する
+            credential = base64.b64encode((str(self.user or '') + ':' + self.password).encode()).decode()
+            env = dict(os.environ)
+            env.update({
+                'GIT_CONFIG_COUNT': '1',
+                'GIT_CONFIG_KEY_0': 'http.extraHeader',
+                'GIT_CONFIG_VALUE_0': 'Authorization: Basic ' + credential,
+                'GIT_TERMINAL_PROMPT': '0'
+            })
+
+        logger.debug("git %s", ' '.join(arg_list))
+        result = subprocess.run(['git'] + arg_list, cwd=cwd, env=env, capture_output=True, check=True)
+        return result.stdout.decode('utf-8', errors='surrogateescape')
+
+
+def _to_ref(branch_name :str) -> str:
+    return 'refs/heads/' + branch_name
+
+
+def _get_mirror() -> GitMirror:
+    ctx = context.get_context()
+    if ctx.git_mirror_dir == None:
+        return None
+
+    def create():
+        url_template = ctx.git_mirror_url
+        if url_template == None:
+            url_template = ctx.url_core + ctx.organization + '/' + ctx.project + '/_git/{repo_name}'
+        return GitMirror(ctx.git_mirror_dir, url_template, ctx.id, ctx.pw, ctx.git_mirror_fetch_interval)
+
+    return ctx.get_resource('git_mirror', create)
+
+
+def is_enabled() -> bool:
+    """
+
+    ローカルのミラーを利用するか(git_mirror_dirが設定されているか)を判定する。
+
+    """
+    return _get_mirror() != None
+
+
+def _get_updated_mirror(repo_id :str) -> tuple:
+    mirror = _get_mirror()
+    repo_name = git_repo.get_repo_name(repo_id)
+    mirror.update(repo_id, repo_name)
+    return mirror, repo_name
+
+
+def get_pr_path_dict_by_diff_branch(repo_id :str, source_branch_name :str, target_branch_name :str) -> dict:
+    """
+
+    RepoIDとブランチ差分より、ローカルのミラーで変更パス-変更種類辞書を取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        source_branch_name (str): マージ元ブランチ名
+        target_branch_name (str): マージ先ブランチ名
+
+    Raises:
+        subprocess.CalledProcessError: gitの実行に失敗した場合
+
+    Returns:
+        dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
+
+    """
+    mirror, repo_name = _get_updated_mirror(repo_id)
+    return mirror.get_diff_path_dict(repo_name, source_branch_name, target_branch_name)
+
+
+def get_pr_path_dict_list(repo_pr_id_list :list, branch_name :str, strategy :str=None) -> list:
+    """
+
+    リポジトリID-PRIDのリストより、ローカルのミラーでPRのマージコミットの変更パス-変更種類辞書のリストを取得する。
+    ターゲットブランチにマージコミットが存在しないPR(未完了等)は、REST API(git_repo)で取得する。
+
+    Args:
+        repo_pr_id_list (list): (リポジトリID(str), PRID(int))のリスト
+        branch_name (str): ターゲットブランチ名
+        strategy (str): REST APIで取得する場合の取得方式(commits/iterations)。Noneの場合は設定値を使用する。
+
+    Raises:
+        subprocess.CalledProcessError: gitの実行に失敗した場合
+        RequestException: HttpRequestに失敗した場合
+
+    Returns:
+        list: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))のリスト(引数と同じ順序)
+
+    """
+    path_dict_list = []
+    missing_index_list = []
+    for repo_id, pr_id in repo_pr_id_list:
+        mirror, repo_name = _get_updated_mirror(repo_id)
+        path_dict = mirror.get_pr_path_dict(repo_name, pr_id, branch_name)
+        if path_dict == None:
+            missing_index_list.append(len(path_dict_list))
+        path_dict_list.append(path_dict)
+
+    if len(missing_index_list) != 0:
+        missing_path_dict_list = git_repo.get_pr_path_dict_list(
+            [repo_pr_id_list[index] for index in missing_index_list],
+            strategy=strategy
+            )
+        for index, path_dict in zip(missing_index_list, missing_path_dict_list):
+            path_dict_list[index] = path_dict
+
+    return path_dict_list
+
+
+def get_merged_pr_id_set(repo_id :str, branch_name :str, pr_list :list) -> set:
+    """
+
+    ローカルのミラーで、PRのリストのうちマージ済みのPRIDの集合を取得する。
+    PRの最終マージコミット(lastMergeCommit)がブランチの祖先の場合をマージ済みとする(マージコミットのメッセージによらない)。
+    ミラーはブランチ(refs/heads)のみを取得するため、祖先で判定できるのは最終マージコミットがそのままブランチに取り込まれる
+    マージコミットの作成で完了したPRに限る。スカッシュ・リベースで完了したPRは新しいコミットが作成され、
+    最終マージコミットがミラーに存在しないため、完了済み(completed)の状態で判定する。
+    最終マージコミットがない・ミラーに存在しない等で判定できないPRは、完了済み(completed)の場合をマージ済みとする。
+
+    Args:
+        repo_id (str): レポジトリのID
+        branch_name (str): ブランチ名
+        pr_list (list): PR(PullRequest)のリスト(ブランチ向けのPR)
+
+    Raises:
+        subprocess.CalledProcessError: gitの実行に失敗した場合
+
+    Returns:
+        set: マージ済みPRIDの集合
+
+    """
+    mirror, repo_name = _get_updated_mirror(repo_id)
+
+    merged_pr_id_set = set()
+    for pr in pr_list:
+        is_merged = None
+        if pr.last_merge_commit != None:
+            is_merged = mirror.is_ancestor(repo_name, pr.last_merge_commit, branch_name)
+        if is_merged == None:
+            is_merged = pr.status == 'completed'
+        if is_merged:
+            merged_pr_id_set.add(pr.pr_id)
+    return merged_pr_id_set
@@ -5,11 +5,13 @@ class PullRequest():
     status=None
     source_branch=None
     target_branch=None
+    last_merge_commit=None
 
-    def __init__(self, repo_id:str, repo_name:str, pr_id:int, status:str, source_branch:str, target_branch:str):
+    def __init__(self, repo_id:str, repo_name:str, pr_id:int, status:str, source_branch:str, target_branch:str, last_merge_commit:str=None):
         self.repo_id = repo_id
         self.repo_name = repo_name
         self.pr_id = pr_id
         self.status = status
         self.source_branch = source_branch
         self.target_branch = target_branch
+        self.last_merge_commit = last_merge_commit
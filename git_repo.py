@@ -1,27 +1,177 @@
-import requests
 from requests import RequestException
-import settings
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import datetime
+import threading
+import time
+import context
+import repo_cache
+import change_cache
+import pr_index
+import json_stream
 # import git_models
 from git_models import PullRequest
 from logging import getLogger
 logger = getLogger(__name__)
 
 
-settings_data=settings.get_settings_app_data()
+pr_path_strategy_list=['commits', 'iterations']
 
-id=settings_data['ads']['id']
-pw=settings_data['ads']['pw']
-organization = settings_data['ads']['organization']
-project=settings_data['ads']['project']
-url_core=settings_data['ads']['url_core']
-url_base=url_core + organization + '/'+ project +'/_apis/git/repositories/'
-api_version=settings_data['ads']['api_version']
+# 差分同期の検索開始日時を前回同期日時より遡らせる秒数(サーバーとの時刻差を吸収する)
+pr_index_sync_margin=300
+# 差分同期の検索条件(searchCriteria.minTime/queryTimeRangeType)に対応するapi-version
+pr_index_delta_api_version=(7, 1)
 
+_pr_index_lock = threading.Lock()
+
+# ブランチ差分の1ページの変更件数(page_sizeにdiffsが未設定の場合)
+diff_branch_page_size=1000
+# ブランチ差分をストリーミングで読み込む単位(バイト)
+diff_branch_chunk_size=64 * 1024
+
+
+def _get_url_base() -> str:
+    return context.get_context().get_url_base('git') + 'repositories/'
+
+def _get_repo_cache() -> repo_cache.RepoCache:
+    ctx = context.get_context()
+    # キャッシュファイルを共有する他の組織・プロジェクトと区別する
+    scope = ctx.url_core + ctx.organization + '/' + ctx.project
+    return ctx.get_resource('repo_cache', lambda: repo_cache.RepoCache(get_repo_id_name_dict, ctx.repo_cache_path, ctx.repo_cache_ttl, scope=scope))
+
+def _get_change_cache() -> change_cache.ChangeCache:
+    ctx = context.get_context()
+    if ctx.change_cache_path == None:
+        return None
+    return ctx.get_resource('change_cache', lambda: change_cache.ChangeCache(ctx.change_cache_path, ctx.change_cache_max_bytes))
+
+def _get_pr_index() -> pr_index.PrIndex:
+    ctx = context.get_context()
+    if ctx.pr_index_path == None:
+        return None
+    return ctx.get_resource('pr_index', lambda: pr_index.PrIndex(ctx.pr_index_path))
+
+
+def to_branch_name(ref_name :str) -> str:
+    """
+
+    参照名(refs/heads/...)よりブランチ名を取得する。ブランチ名は階層(/)を含む場合がある。
+
+    Args:
+        ref_name (str): 参照名
+
+    Returns:
+        str: refs/heads/を除いたブランチ名。refs/heads/で始まらない場合は参照名のまま。
+
+    """
+    if ref_name.startswith('refs/heads/'):
+        return ref_name[len('refs/heads/'):]
+    return ref_name
+
+def _to_pr(pr_data :dict, repo_id :str=None) -> PullRequest:
+    """
+
+    PRのJSONデータをPRに変換する。
+
+    Args:
+        pr_data (dict): PRのJSONデータ
+        repo_id (str): レポジトリのID。Noneの場合はPRのJSONデータより設定する。
+
+    Returns:
+        PullRequest: PR
+
+    """    
+    if repo_id == None:
+        repo_id = pr_data['repository']['id']
+        repo_name = pr_data['repository']['name']
+    else:
+        repo_name = None
+
+    pr = PullRequest(
+        repo_id=repo_id,
+        repo_name=repo_name,
+        pr_id=pr_data['pullRequestId'],
+        status=pr_data['status'],
+        target_branch=to_branch_name(pr_data['targetRefName']),
+        source_branch=to_branch_name(pr_data['sourceRefName']),
+        last_merge_commit=(pr_data.get('lastMergeCommit') or {}).get('commitId')
+    )
+
+    return pr
+
+def _to_path_dict(changes) -> dict:
+    """
+
+    変更のJSONデータのリスト(またはイテレータ)より、ファイル(blob)の変更パス-変更種類辞書を作成する。
+
+    Args:
+        changes: 変更のJSONデータのリスト(またはイテレータ)
+
+    Returns:
+        dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
+
+    """    
+    path_dict = {}
+    for change in changes:
+        path = change['item']['path']
+        change_type = change['changeType']
+        git_object_type = change['item']['gitObjectType']
+        if git_object_type == 'blob':
+            path_dict[path] = change_type
+
+    return path_dict
+
+def _pr_list_params(branch_name :str, status :str) -> dict:
+    params = { 
+        'searchCriteria.status': status,
+        'searchCriteria.targetRefName': 'refs/heads/'+branch_name
+    }
+    return params
+
+def _get_diff_branch_page_size() -> int:
+    # サーバーの1ページの最大件数を上限とする
+    ctx = context.get_context()
+    return min(ctx.page_size_dict.get('diffs', diff_branch_page_size), ctx.max_page_size)
+
+def _is_diff_branch_last_page(change_count :int, res_data :dict) -> bool:
+    # サーバーの上限によりページサイズ未満で返却される場合があるため、件数では判定せず、
+    # 全件を含む(allChangesIncluded)か、空のページの場合を最終ページとする
+    return change_count == 0 or res_data.get('allChangesIncluded') == True
+
+def _diff_branch_params(source_branch_name :str, target_branch_name :str, page_size :int=diff_branch_page_size) -> dict:
+    params = { 
+        '$top': page_size,
+        'baseVersion': target_branch_name,
+        'targetVersion': source_branch_name
+    }
+    return params
+
+
+def get_repo_id_name_dict() -> dict:
+    """
+
+    プロジェクトの全リポジトリについて、リポジトリID-リポジトリ名辞書を取得する。
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    Returns:
+        dict: リポジトリID-リポジトリ名辞書(key:repo_id(str), value:repo_name(str))
+
+    """    
+    return _to_repo_id_name_dict(context.get_client().get_json(_get_url_base().rstrip('/')))
+
+def _to_repo_id_name_dict(res_data :dict) -> dict:
+    id_name_dict = {}
+    for repo in res_data['value']:
+        id_name_dict[repo['id']] = repo['name']
+    return id_name_dict
 
 def get_repo_name(repo_id :str) -> str:
     """
 
     リポジトリ名を取得する。
+    リポジトリキャッシュに存在する場合は、キャッシュより取得する。
 
     Args:
         repo_id (str): レポジトリのID
@@ -33,22 +183,20 @@ def get_repo_name(repo_id :str) -> str:
         str: レポジトリ名。
 
     """    
-    params = { 
-        'api-version': api_version
-    }
-
-    url = url_base + repo_id
-    res = requests.get(url, params=params, auth=(id, pw))
-
-    res.raise_for_status()
+    repo_name = _get_repo_cache().get_name(repo_id)
+    if repo_name != None:
+        return repo_name
 
-    res_data = res.json()
+    # 一覧に存在しない場合は個別に照会する
+    url = _get_url_base() + repo_id
+    res_data = context.get_client().get_json(url)
     return res_data['name']
 
 def get_repo_id(repo_name :str) -> str:
     """
 
     リポジトリIDを取得する。
+    リポジトリキャッシュに存在する場合は、キャッシュより取得する。
 
     Args:
         repo_name (str): レポジトリ名
@@ -60,19 +208,16 @@ def get_repo_id(repo_name :str) -> str:
         str: レポジトリID。
 
     """    
-    params = { 
-        'api-version': api_version
-    }
-
-    url = url_base + repo_name
-    res = requests.get(url, params=params, auth=(id, pw))
+    repo_id = _get_repo_cache().get_id(repo_name)
+    if repo_id != None:
+        return repo_id
 
-    res.raise_for_status()
-
-    res_data = res.json()
+    # 一覧に存在しない場合は個別に照会する
+    url = _get_url_base() + repo_name
+    res_data = context.get_client().get_json(url)
     return res_data['id']
 
-def get_pr(repo_id :str, pr_id :int, target_branch :str) -> PullRequest:
+def get_pr(repo_id :str, pr_id :int, target_branch :str=None) -> PullRequest:
     """
 
     PRを取得する。
@@ -80,44 +225,52 @@ def get_pr(repo_id :str, pr_id :int, target_branch :str) -> PullRequest:
     Args:
         repo_id (str): レポジトリのID
         pr_id (int): レポジトリのID
-        branch_name (str): ブランチ名
+        target_branch (str): ブランチ名。Noneの場合はブランチで絞り込まない。
 
     Raises:
         RequestException: HttpRequestに失敗した場合
 
     Returns:
-        PullRequest:取得したPR。
+        PullRequest:取得したPR。ターゲットブランチが異なる場合はNone。
 
     """    
 
-    params = { 
-        'api-version': api_version
-    }
+    url = _get_url_base() + repo_id + '/pullrequests/' + str(pr_id)
 
-    url = url_base + repo_id + '/pullrequests/' + str(pr_id)
+    pr = _to_pr(context.get_client().get_json(url))
 
-    res = requests.get(url, params=params, auth=(id, pw))
+    if target_branch != None and pr.target_branch!=target_branch: 
+        return None
 
-    res.raise_for_status()
+    return pr
 
-    res_data = res.json()
+def iter_pr(repo_id :str, branch_name :str, status :str, page_size :int=None):
+    """
 
-    targetRefNames=res_data['targetRefName'].split('/')
-    sourceRefNames=res_data['sourceRefName'].split('/')
+    PRを全ページ分、1件ずつ取得する。
 
-    if targetRefNames[2]!=target_branch: 
-        return None
+    Args:
+        repo_id (str): レポジトリのID
+        branch_name (str): ブランチ名
+        status (str): GITステータス
+        page_size (int): ページサイズ。Noneの場合は設定値を使用する。
 
-    pr = PullRequest(
-        repo_id=res_data['repository']['id'],
-        repo_name=res_data['repository']['name'],
-        pr_id=res_data['pullRequestId'],
-        status=res_data['status'],
-        target_branch=targetRefNames[2],
-        source_branch=sourceRefNames[2]
-    )
+    Raises:
+        RequestException: HttpRequestに失敗した場合
 
-    return pr
+    Yields:
+        PullRequest: PR
+
+    """    
+    if page_size == None:
+        page_size = context.get_page_size('pullrequests')
+
+    params = _pr_list_params(branch_name, status)
+
+    url = _get_url_base() + repo_id + '/pullrequests'
+
+    for pr_data in context.get_client().iter_pages(url, params=params, page_size=page_size):
+        yield _to_pr(pr_data, repo_id)
 
 def get_pr_dict(repo_id :str, branch_name :str, status :str) -> dict:
     """
@@ -138,33 +291,8 @@ def get_pr_dict(repo_id :str, branch_name :str, status :str) -> dict:
     """    
     pr_dict = {}
 
-    params = { 
-        'searchCriteria.status': status,
-        'searchCriteria.targetRefName': 'refs/heads/'+branch_name,
-        'api-version': api_version
-    }
-
-    url = url_base + repo_id + '/pullrequests'
-
-    res = requests.get(url, params=params, auth=(id, pw))
-
-    res.raise_for_status()
-
-    res_data = res.json()
-    for pr_data in res_data["value"]:
-        targetRefNames=pr_data['targetRefName'].split('/')
-        sourceRefNames=pr_data['sourceRefName'].split('/')
-        pr_id=pr_data['pullRequestId']
-        pr = PullRequest(
-            repo_id=repo_id,
-            repo_name=None,
-            pr_id=pr_id,
-            status=pr_data['status'],
-            target_branch=targetRefNames[2],
-            source_branch=sourceRefNames[2]
-        )
-
-        pr_dict[pr_id] = pr
+    for pr in _iter_pr_or_index(repo_id, branch_name, status):
+        pr_dict[pr.pr_id] = pr
     
     return pr_dict
 
@@ -187,33 +315,188 @@ def get_pr_id_list(repo_id :str, branch_name :str, status :str) -> list:
     """    
     list=[]
 
-    params = { 
-        'searchCriteria.status': status,
-        'searchCriteria.targetRefName': 'refs/heads/'+branch_name,
-        'api-version': api_version
-    }
+    for pr in _iter_pr_or_index(repo_id, branch_name, status):
+        list.append(pr.pr_id)
+    
+    return list
 
-    url = url_base + repo_id + '/pullrequests'
+def _iter_pr_or_index(repo_id :str, branch_name :str, status :str):
+    # PRインデックスを利用する場合は、差分を同期の上でローカルに照会する
+    index = _get_pr_index()
+    if index != None:
+        sync_pr_index(repo_id)
+        return iter(index.find(repo_id, branch_name, status))
+    return iter_pr(repo_id, branch_name, status)
 
-    res = requests.get(url, params=params, auth=(id, pw))
+def _pr_index_sync_params_list(repo_id :str, now :float) -> tuple:
+    """
 
-    res.raise_for_status()
+    PRインデックスの同期に用いるPR一覧のクエリパラメータを作成する。
+    未同期または全件同期の間隔を超過した場合は全件、それ以外は前回同期以降に作成・完了されたPRの差分とする。
+    差分同期の検索条件はapi-version 7.1以降のみ有効なため、それより前のapi-versionの場合は常に全件とする。
+    なお、差分は作成・完了日時で検索するため、ターゲットブランチの変更・再アクティブ化等の
+    作成・完了を伴わない変更は、次回の全件同期まで反映されない。
 
-    res_data = res.json()
-    for pull_request in res_data["value"]:
-        pull_request_id = pull_request['pullRequestId']
-        list.append(pull_request_id)
-    
-    return list
+    Args:
+        repo_id (str): レポジトリのID
+        now (float): 同期日時(epoch秒)
+
+    Returns:
+        tuple: (クエリパラメータのリスト, 全件同期か)。同期不要の場合はクエリパラメータのリストがNone。
 
-def get_pr_path_dict_by_pr(repo_id :str, pr_id :int) -> dict:
+    """
+    ctx = context.get_context()
+
+    sync_state = _get_pr_index().get_sync_state(repo_id)
+    if sync_state == None or now - sync_state[1] >= ctx.pr_index_full_sync_interval:
+        return [{'searchCriteria.status': 'all'}], True
+
+    synced_at = sync_state[0]
+    if now - synced_at < ctx.pr_index_sync_interval:
+        return None, False
+
+    if not _is_pr_index_delta_supported(ctx.api_version):
+        # 古いapi-versionでは差分の検索条件が無視され全件が返却されるため、明示的に全件同期とする
+        logger.warning("pr index delta sync requires api-version %s or later, full sync instead. api_version=(%s)", '.'.join(str(v) for v in pr_index_delta_api_version), ctx.api_version)
+        return [{'searchCriteria.status': 'all'}], True
+
+    min_time = datetime.datetime.fromtimestamp(synced_at - pr_index_sync_margin, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    params_list = []
+    for query_time_range_type in ['created', 'closed']:
+        params_list.append({
+            'searchCriteria.status': 'all',
+            'searchCriteria.minTime': min_time,
+            'searchCriteria.queryTimeRangeType': query_time_range_type
+        })
+    return params_list, False
+
+def _is_pr_index_delta_supported(api_version :str) -> bool:
+    # 7.1-preview等の接尾辞は除いて比較する
+    try:
+        version = tuple(int(v) for v in api_version.split('-')[0].split('.')[:2])
+    except ValueError:
+        return False
+    return version >= pr_index_delta_api_version
+
+def sync_pr_index(repo_id :str):
     """
 
-    PRIDより変更パス-変更種類辞書を取得する。
+    リポジトリのPRをPRインデックスへ同期する。
+    前回同期より差分同期の間隔秒数が経過していない場合は同期しない。
 
     Args:
         repo_id (str): レポジトリのID
-        branch_name (str): ブランチ名
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    """
+    repo_lock_dict = context.get_context().get_resource('pr_index_repo_lock_dict', dict)
+    with _pr_index_lock:
+        repo_lock = repo_lock_dict.setdefault(repo_id, threading.Lock())
+
+    with repo_lock:
+        now = time.time()
+        params_list, is_full = _pr_index_sync_params_list(repo_id, now)
+        if params_list == None:
+            return
+
+        url = _get_url_base() + repo_id + '/pullrequests'
+
+        pr_list = []
+        for params in params_list:
+            # 同期毎に検索条件が異なるため、条件付きGETキャッシュは利用しない
+            for pr_data in context.get_client().iter_pages(url, params=params, page_size=context.get_page_size('pullrequests'), use_cache=False):
+                pr_list.append(_to_pr(pr_data, repo_id))
+
+        _get_pr_index().put(repo_id, pr_list, now, is_full)
+
+def iter_pr_commit_id(repo_id :str, pr_id :int, page_size :int=None):
+    """
+
+    PRのコミットIDを全ページ分、1件ずつ取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        pr_id (int): PRのID
+        page_size (int): ページサイズ。Noneの場合は設定値を使用する。
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    Yields:
+        str: コミットID
+
+    """    
+    if page_size == None:
+        page_size = context.get_page_size('commits')
+
+    url_commits = _get_url_base() + repo_id + '/pullrequests/'+ str(pr_id) + '/commits'
+
+    for commit in context.get_client().iter_pages(url_commits, page_size=page_size):
+        yield commit['commitId']
+
+def get_pr_commit_id_list(repo_id :str, pr_id :int) -> list:
+    """
+
+    PRのコミットIDのリストを取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        pr_id (int): PRのID
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    Returns:
+        list: コミットID(str)のリスト
+
+    """    
+    return list(iter_pr_commit_id(repo_id, pr_id))
+
+def iter_commit_change(repo_id :str, commit_id :str, page_size :int=None):
+    """
+
+    コミットの変更を全ページ分、1件ずつ取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        commit_id (str): コミットID
+        page_size (int): ページサイズ。Noneの場合は設定値を使用する。
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    Yields:
+        dict: 変更のJSONデータ
+
+    """    
+    if page_size == None:
+        page_size = context.get_page_size('changes')
+
+    url_changes = _get_url_base() + repo_id + '/commits/'+ commit_id + '/changes'
+
+    # コミット変更APIのページングパラメータは$なしのtop/skip
+    # コミットの変更内容は不変でありコミット変更キャッシュに保持するため、条件付きGETキャッシュは利用しない
+    yield from context.get_client().iter_pages(
+        url_changes,
+        value_key='changes',
+        page_size=page_size,
+        top_param='top',
+        skip_param='skip',
+        use_cache=False
+        )
+
+def get_commit_path_dict(repo_id :str, commit_id :str) -> dict:
+    """
+
+    コミットIDより変更パス-変更種類辞書を取得する。
+    コミット変更キャッシュに存在する場合は、キャッシュより取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        commit_id (str): コミットID
 
     Raises:
         RequestException: HttpRequestに失敗した場合
@@ -222,48 +505,186 @@ def get_pr_path_dict_by_pr(repo_id :str, pr_id :int) -> dict:
         dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
 
     """    
+    cache = _get_change_cache()
+    if cache != None:
+        path_dict = cache.get(repo_id, commit_id)
+        if path_dict != None:
+            return path_dict
+
+    path_dict = _to_path_dict(iter_commit_change(repo_id, commit_id))
+
+    if cache != None:
+        cache.put(repo_id, commit_id, path_dict)
+
+    return path_dict
+
+def get_pr_last_iteration_id(repo_id :str, pr_id :int) -> int:
+    """
+
+    PRの最新イテレーションのIDを取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        pr_id (int): PRのID
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    Returns:
+        int: 最新イテレーションのID。イテレーションが存在しない場合はNone。
+
+    """    
+    url_iterations = _get_url_base() + repo_id + '/pullrequests/'+ str(pr_id) + '/iterations'
+
+    return _to_last_iteration_id(context.get_client().get_json(url_iterations))
+
+def get_pr_path_dict_by_iteration(repo_id :str, pr_id :int) -> dict:
+    """
+
+    PRの最新イテレーションとPR作成元(マージベース)との差分より変更パス-変更種類辞書を取得する。
+    コミット数によらず、イテレーション一覧と差分の取得(ページ数分)のみで完了する。
+    なお、変更種類はコミット毎の最終の変更種類ではなく、PR全体での正味の変更種類となる。
+
+    Args:
+        repo_id (str): レポジトリのID
+        pr_id (int): PRのID
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    Returns:
+        dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
+
+    """    
+    iteration_id = get_pr_last_iteration_id(repo_id, pr_id)
+    if iteration_id == None:
+        return {}
+
+    url_changes = _get_url_base() + repo_id + '/pullrequests/'+ str(pr_id) + '/iterations/' + str(iteration_id) + '/changes'
+
+    # $compareTo=0でPR作成元との差分(PR全体の正味の変更)を取得する
     params = { 
-        'api-version': api_version
+        '$compareTo': 0
     }
 
-    url_commits = url_base + repo_id + '/pullrequests/'+ str(pr_id) + '/commits'
-
-    res_commits = requests.get(
-        url_commits,
+    return _to_iteration_path_dict(context.get_client().iter_pages(
+        url_changes,
         params=params,
-        auth=(id, pw)
-        )
+        value_key='changeEntries',
+        page_size=context.get_page_size('iterations')
+        ))
+
+def _to_last_iteration_id(res_data :dict) -> int:
+    iteration_id = None
+    for iteration in res_data['value']:
+        if iteration_id == None or iteration_id < iteration['id']:
+            iteration_id = iteration['id']
+    return iteration_id
+
+def _to_iteration_path_dict(change_entries) -> dict:
+    """
 
-    res_commits.raise_for_status()
+    イテレーション変更のJSONデータのリスト(またはイテレータ)より、ファイル(blob)の変更パス-変更種類辞書を作成する。
+    イテレーション変更のitemにはgitObjectTypeが設定されない場合があるため、未設定の場合はファイルとみなす。
 
+    """    
     path_dict = {}
+    for change in change_entries:
+        item = change['item']
+        if item.get('gitObjectType', 'blob') == 'blob':
+            path_dict[item['path']] = change['changeType']
+
+    return path_dict
+
+def _check_pr_path_strategy(strategy :str) -> str:
+    if strategy == None:
+        strategy = context.get_context().pr_path_strategy
+    if strategy not in pr_path_strategy_list:
+        raise ValueError('unknown pr path strategy. strategy=(' + str(strategy) + ')')
+    return strategy
 
-    res_commits_data = res_commits.json()
+def get_pr_path_dict_list(repo_pr_id_list :list, max_workers :int=None, strategy :str=None) -> list:
+    """
 
+    リポジトリID-PRIDのリストより、変更パス-変更種類辞書のリストを取得する。
+    取得方式がcommitsの場合は、コミット一覧・コミット毎の変更を並列に取得し、
+    結果は引数と同じ順序(PR内はコミット一覧の順序)で集約する。
+    取得方式がiterationsの場合は、PR毎にイテレーションの差分を並列に取得する。
 
-    for commit in res_commits_data["value"]:
-        commit_id = commit['commitId']
+    Args:
+        repo_pr_id_list (list): (リポジトリID(str), PRID(int))のリスト
+        max_workers (int): 最大並列数。Noneの場合は設定値を使用する。
+        strategy (str): 取得方式(commits/iterations)。Noneの場合は設定値を使用する。
 
-        url_changes = url_base + repo_id + '/commits/'+ commit_id + '/changes'
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+        ValueError: 取得方式が不正な場合
 
-        resChanges = requests.get(
-            url_changes,
-            params=params,
-            auth=(id, pw)
+    Returns:
+        list: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))のリスト
+
+    """    
+    strategy = _check_pr_path_strategy(strategy)
+
+    if max_workers == None:
+        max_workers = context.get_context().max_workers
+
+    # ワーカースレッドへ現在のコンテキストを引き継ぐ
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=context.set_context, initargs=(context.get_context(),)) as executor:
+        if strategy == 'iterations':
+            return list(executor.map(
+                lambda repo_pr_id: get_pr_path_dict_by_iteration(*repo_pr_id),
+                repo_pr_id_list
+                ))
+
+        # PR毎のコミットIDリストを並列に取得する
+        commit_id_list_list = list(executor.map(
+            lambda repo_pr_id: get_pr_commit_id_list(*repo_pr_id),
+            repo_pr_id_list
+            ))
+
+        # 全PRのコミットを平坦化し、コミット毎の変更パス-変更種類辞書を並列に取得する
+        repo_commit_id_list = []
+        for (repo_id, pr_id), commit_id_list in zip(repo_pr_id_list, commit_id_list_list):
+            for commit_id in commit_id_list:
+                repo_commit_id_list.append((repo_id, commit_id))
+
+        commit_path_dict_iter = executor.map(
+            lambda repo_commit_id: get_commit_path_dict(*repo_commit_id),
+            repo_commit_id_list
             )
 
-        resChanges.raise_for_status()
+        # executor.mapは引数の順序で結果を返却するため、
+        # 逐次取得時と同じ順序で重複パスが後勝ちで更新される。
+        path_dict_list = []
+        for commit_id_list in commit_id_list_list:
+            path_dict = {}
+            for _ in commit_id_list:
+                path_dict.update(next(commit_path_dict_iter))
+            path_dict_list.append(path_dict)
 
-        resChangesData = resChanges.json()
+    return path_dict_list
 
-        for change in resChangesData["changes"]:
-            path = change['item']['path']
-            change_type = change['changeType']
-            git_object_type = change['item']['gitObjectType']
-            if git_object_type == 'blob':
-                path_dict[path] = change_type
+def get_pr_path_dict_by_pr(repo_id :str, pr_id :int, max_workers :int=None, strategy :str=None) -> dict:
+    """
 
-    return path_dict
+    PRIDより変更パス-変更種類辞書を取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        pr_id (int): PRのID
+        max_workers (int): 最大並列数。Noneの場合は設定値を使用する。
+        strategy (str): 取得方式(commits/iterations)。Noneの場合は設定値を使用する。
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+        ValueError: 取得方式が不正な場合
+
+    Returns:
+        dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
+
+    """    
+    return get_pr_path_dict_list([(repo_id, pr_id)], max_workers, strategy)[0]
 
 def get_pr_path_dict_by_diff_branch(repo_id :str, source_branch_name :str, target_branch_name :str) -> dict:
     """
@@ -282,29 +703,426 @@ def get_pr_path_dict_by_diff_branch(repo_id :str, source_branch_name :str, targe
         dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
 
     """    
-    list=[]
+    path_dict = {}
+    for path, change_type in iter_diff_branch_change(repo_id, source_branch_name, target_branch_name):
+        path_dict[path] = change_type
+    return path_dict
 
-    params = { 
-        '$top': 100000,
-        'baseVersion': target_branch_name,
-        'targetVersion': source_branch_name,
-        'api-version': api_version
-    }
+def iter_diff_branch_change(repo_id :str, source_branch_name :str, target_branch_name :str, page_size :int=None):
+    """
 
-    url = url_base + repo_id + '/diffs/commits'
+    RepoIDとブランチ差分より、ファイル(blob)の変更を1件ずつ取得する。
+    差分をページ毎に取得し、レスポンスの変更の配列をストリーミングで解析するため、
+    メモリ使用量は差分の件数に依存しない。
 
-    res = requests.get(url, params=params, auth=(id, pw))
+    Args:
+        repo_id (str): レポジトリのID
+        source_branch_name (str): マージ元ブランチ名
+        target_branch_name (str): マージ先ブランチ名
+        page_size (int): ページサイズ。Noneの場合は設定値(page_sizeのdiffs。未設定の場合は1000)を使用する。
 
-    res.raise_for_status()
+    Raises:
+        RequestException: HttpRequestに失敗した場合
 
-    res_data = res.json()
+    Yields:
+        tuple: (変更パス(str), 変更種類(str))
 
-    path_dict = {}
-    for change in res_data["changes"]:
-        path = change['item']['path']
-        change_type = change['changeType']
-        git_object_type = change['item']['gitObjectType']
-        if git_object_type == 'blob':
-            path_dict[path] = change_type
+    """
+    if page_size == None:
+        page_size = _get_diff_branch_page_size()
+
+    params = _diff_branch_params(source_branch_name, target_branch_name, page_size)
+
+    url = _get_url_base() + repo_id + '/diffs/commits'
+
+    while True:
+        change_count = 0
+        # 変更の配列以外の値(allChangesIncluded等)
+        res_data = {}
+
+        res = context.get_client().get(url, params=params, stream=True)
+        try:
+            res.raise_for_status()
+
+            for change in json_stream.iter_array_items(res.iter_content(chunk_size=diff_branch_chunk_size), 'changes', res_data):
+                change_count += 1
+                if change['item']['gitObjectType'] == 'blob':
+                    yield (change['item']['path'], change['changeType'])
+        finally:
+            res.close()
+
+        if _is_diff_branch_last_page(change_count, res_data):
+            return
+        params['$skip'] = params.get('$skip', 0) + change_count
+
+
+
+async def get_repo_name_async(repo_id :str) -> str:
+    """
+
+    リポジトリ名を非同期に取得する。
+    リポジトリキャッシュは同期版(get_repo_name)と共有する。
+
+    Args:
+        repo_id (str): レポジトリのID
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Returns:
+        str: レポジトリ名。
+
+    """    
+    repo_name = _get_repo_cache().find_name(repo_id)
+    if repo_name != None:
+        return repo_name
+
+    _get_repo_cache().update(_to_repo_id_name_dict(await context.get_async_client().get_json(_get_url_base().rstrip('/'))))
+
+    repo_name = _get_repo_cache().find_name(repo_id)
+    if repo_name != None:
+        return repo_name
+
+    # 一覧に存在しない場合は個別に照会する
+    res_data = await context.get_async_client().get_json(_get_url_base() + repo_id)
+    return res_data['name']
+
+async def get_pr_async(repo_id :str, pr_id :int, target_branch :str=None) -> PullRequest:
+    """
+
+    PRを非同期に取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        pr_id (int): PRのID
+        target_branch (str): ブランチ名。Noneの場合はブランチで絞り込まない。
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Returns:
+        PullRequest:取得したPR。ターゲットブランチが異なる場合はNone。
+
+    """    
+    url = _get_url_base() + repo_id + '/pullrequests/' + str(pr_id)
+
+    pr = _to_pr(await context.get_async_client().get_json(url))
+
+    if target_branch != None and pr.target_branch!=target_branch: 
+        return None
+
+    return pr
+
+async def iter_pr_async(repo_id :str, branch_name :str, status :str, page_size :int=None):
+    """
+
+    PRを全ページ分、1件ずつ非同期に取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        branch_name (str): ブランチ名
+        status (str): GITステータス
+        page_size (int): ページサイズ。Noneの場合は設定値を使用する。
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Yields:
+        PullRequest: PR
+
+    """    
+    if page_size == None:
+        page_size = context.get_page_size('pullrequests')
+
+    url = _get_url_base() + repo_id + '/pullrequests'
+
+    async for pr_data in context.get_async_client().iter_pages(url, params=_pr_list_params(branch_name, status), page_size=page_size):
+        yield _to_pr(pr_data, repo_id)
+
+async def get_pr_dict_async(repo_id :str, branch_name :str, status :str) -> dict:
+    """
+
+    PR辞書を非同期に取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        branch_name (str): ブランチ名
+        status (str): GITステータス
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Returns:
+        PR辞書(key:pr_id(int), value:PR(PullRequest))。
+
+    """    
+    pr_dict = {}
+    index = _get_pr_index()
+    if index != None:
+        await sync_pr_index_async(repo_id)
+        for pr in index.find(repo_id, branch_name, status):
+            pr_dict[pr.pr_id] = pr
+        return pr_dict
+
+    async for pr in iter_pr_async(repo_id, branch_name, status):
+        pr_dict[pr.pr_id] = pr
+
+    return pr_dict
+
+async def get_pr_id_list_async(repo_id :str, branch_name :str, status :str) -> list:
+    """
+
+    PRIDのリストを非同期に取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        branch_name (str): ブランチ名
+        status (str): GITステータス
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Returns:
+        list: PRIDのリスト。
+
+    """    
+    pr_id_list = []
+    index = _get_pr_index()
+    if index != None:
+        await sync_pr_index_async(repo_id)
+        for pr in index.find(repo_id, branch_name, status):
+            pr_id_list.append(pr.pr_id)
+        return pr_id_list
+
+    async for pr in iter_pr_async(repo_id, branch_name, status):
+        pr_id_list.append(pr.pr_id)
+
+    return pr_id_list
+
+async def sync_pr_index_async(repo_id :str):
+    """
+
+    リポジトリのPRをPRインデックスへ非同期に同期する。
+    同期の条件は同期版(sync_pr_index)と同じ。
+
+    Args:
+        repo_id (str): レポジトリのID
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    """
+    now = time.time()
+    params_list, is_full = _pr_index_sync_params_list(repo_id, now)
+    if params_list == None:
+        return
+
+    url = _get_url_base() + repo_id + '/pullrequests'
+
+    pr_list = []
+    for params in params_list:
+        async for pr_data in context.get_async_client().iter_pages(url, params=params, page_size=context.get_page_size('pullrequests'), use_cache=False):
+            pr_list.append(_to_pr(pr_data, repo_id))
+
+    _get_pr_index().put(repo_id, pr_list, now, is_full)
+
+async def get_pr_commit_id_list_async(repo_id :str, pr_id :int) -> list:
+    """
+
+    PRのコミットIDのリストを非同期に取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        pr_id (int): PRのID
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Returns:
+        list: コミットID(str)のリスト
+
+    """    
+    url_commits = _get_url_base() + repo_id + '/pullrequests/'+ str(pr_id) + '/commits'
+
+    commit_id_list = []
+    async for commit in context.get_async_client().iter_pages(url_commits, page_size=context.get_page_size('commits')):
+        commit_id_list.append(commit['commitId'])
+
+    return commit_id_list
+
+async def get_commit_path_dict_async(repo_id :str, commit_id :str) -> dict:
+    """
+
+    コミットIDより変更パス-変更種類辞書を非同期に取得する。
+    コミット変更キャッシュは同期版(get_commit_path_dict)と共有する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        commit_id (str): コミットID
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Returns:
+        dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
+
+    """    
+    cache = _get_change_cache()
+    if cache != None:
+        path_dict = cache.get(repo_id, commit_id)
+        if path_dict != None:
+            return path_dict
+
+    url_changes = _get_url_base() + repo_id + '/commits/'+ commit_id + '/changes'
+
+    changes = []
+    async for change in context.get_async_client().iter_pages(
+        url_changes,
+        value_key='changes',
+        page_size=context.get_page_size('changes'),
+        top_param='top',
+        skip_param='skip',
+        use_cache=False
+        ):
+        changes.append(change)
+
+    path_dict = _to_path_dict(changes)
+
+    if cache != None:
+        cache.put(repo_id, commit_id, path_dict)
 
     return path_dict
+
+async def get_pr_path_dict_by_iteration_async(repo_id :str, pr_id :int) -> dict:
+    """
+
+    PRの最新イテレーションとPR作成元(マージベース)との差分より変更パス-変更種類辞書を非同期に取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        pr_id (int): PRのID
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Returns:
+        dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
+
+    """    
+    url_iterations = _get_url_base() + repo_id + '/pullrequests/'+ str(pr_id) + '/iterations'
+
+    iteration_id = _to_last_iteration_id(await context.get_async_client().get_json(url_iterations))
+    if iteration_id == None:
+        return {}
+
+    url_changes = url_iterations + '/' + str(iteration_id) + '/changes'
+
+    change_entries = []
+    async for change in context.get_async_client().iter_pages(
+        url_changes,
+        params={'$compareTo': 0},
+        value_key='changeEntries',
+        page_size=context.get_page_size('iterations')
+        ):
+        change_entries.append(change)
+
+    return _to_iteration_path_dict(change_entries)
+
+async def get_pr_path_dict_list_async(repo_pr_id_list :list, strategy :str=None) -> list:
+    """
+
+    リポジトリID-PRIDのリストより、変更パス-変更種類辞書のリストを非同期に取得する。
+    同時接続数はクライアントの接続数上限で制限される。
+    結果は引数と同じ順序(PR内はコミット一覧の順序)で集約する。
+
+    Args:
+        repo_pr_id_list (list): (リポジトリID(str), PRID(int))のリスト
+        strategy (str): 取得方式(commits/iterations)。Noneの場合は設定値を使用する。
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+        ValueError: 取得方式が不正な場合
+
+    Returns:
+        list: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))のリスト
+
+    """    
+    if _check_pr_path_strategy(strategy) == 'iterations':
+        return list(await asyncio.gather(*[
+            get_pr_path_dict_by_iteration_async(repo_id, pr_id) for repo_id, pr_id in repo_pr_id_list
+            ]))
+
+    commit_id_list_list = await asyncio.gather(*[
+        get_pr_commit_id_list_async(repo_id, pr_id) for repo_id, pr_id in repo_pr_id_list
+        ])
+
+    # asyncio.gatherは引数の順序で結果を返却するため、
+    # 逐次取得時と同じ順序で重複パスが後勝ちで更新される。
+    commit_path_dict_list_list = await asyncio.gather(*[
+        asyncio.gather(*[
+            get_commit_path_dict_async(repo_id, commit_id) for commit_id in commit_id_list
+            ])
+        for (repo_id, pr_id), commit_id_list in zip(repo_pr_id_list, commit_id_list_list)
+        ])
+
+    path_dict_list = []
+    for commit_path_dict_list in commit_path_dict_list_list:
+        path_dict = {}
+        for commit_path_dict in commit_path_dict_list:
+            path_dict.update(commit_path_dict)
+        path_dict_list.append(path_dict)
+
+    return path_dict_list
+
+async def get_pr_path_dict_by_pr_async(repo_id :str, pr_id :int, strategy :str=None) -> dict:
+    """
+
+    PRIDより変更パス-変更種類辞書を非同期に取得する。
+
+    Args:
+        repo_id (str): レポジトリのID
+        pr_id (int): PRのID
+        strategy (str): 取得方式(commits/iterations)。Noneの場合は設定値を使用する。
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+        ValueError: 取得方式が不正な場合
+
+    Returns:
+        dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
+
+    """    
+    return (await get_pr_path_dict_list_async([(repo_id, pr_id)], strategy))[0]
+
+async def get_pr_path_dict_by_diff_branch_async(repo_id :str, source_branch_name :str, target_branch_name :str) -> dict:
+    """
+
+    RepoIDとブランチ差分より変更パス-変更種類辞書を非同期に取得する。
+    ページングの仕様は同期版(iter_diff_branch_change)と同じ。
+
+    Args:
+        repo_id (str): レポジトリのID
+        source_branch_name (str): マージ元ブランチ名
+        target_branch_name (str): マージ先ブランチ名
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Returns:
+        dict: 変更パス-変更種類辞書(key:変更パス(str), value:変更種類(str))
+
+    """    
+    params = _diff_branch_params(source_branch_name, target_branch_name, _get_diff_branch_page_size())
+
+    url = _get_url_base() + repo_id + '/diffs/commits'
+
+    path_dict = {}
+    while True:
+        res_data = await context.get_async_client().get_json(url, params=params)
+
+        change_list = res_data['changes']
+        path_dict.update(_to_path_dict(change_list))
+
+        if _is_diff_branch_last_page(len(change_list), res_data):
+            return path_dict
+        params['$skip'] = params.get('$skip', 0) + len(change_list)
@@ -0,0 +1,375 @@
+import argparse
+import json
+import sys
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from requests.exceptions import HTTPError
+import context
+import git_repo
+import work_item
+import merge_check
+from git_models import PullRequest
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# PRの状態を更新するイベントの種類
+pr_event_type_list=['git.pullrequest.created', 'git.pullrequest.updated', 'git.pullrequest.merged']
+# WorkItemのPRリンクを更新するイベントの種類
+work_item_event_type_list=['workitem.created', 'workitem.updated', 'workitem.deleted', 'workitem.restored']
+
+
+class MergeState():
+    """
+
+    WorkItem→PR→マージ状況のメモリ上の状態。
+    サービスフックのイベントにより更新し、マージ状況・変更パスの照会には保持した状態で応答する。
+    未保持のWorkItem・PR(起動直後等)はREST APIで取得して保持する。
+    取得できない(404)PRは未検出として保持し、PRのイベントを受信するまで再取得しない。
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key:WorkItemのID, value:PRID-リポジトリID辞書
+        self._work_item_pr_id_dict = {}
+        # key:PRID, value:PR(PullRequest)
+        self._pr_dict = {}
+        # key:PRID, value:変更パス-変更種類辞書
+        self._pr_path_dict = {}
+        # 取得できない(404)PRID
+        self._not_found_pr_id_set = set()
+
+    def handle_event(self, event :dict) -> bool:
+        """
+
+        サービスフックのイベントを状態に反映する。
+
+        Args:
+            event (dict): サービスフックのペイロード
+
+        Raises:
+            KeyError: 対象のイベントに必要な値がない場合
+            TypeError: 対象のイベントの値の型が不正な場合
+            ValueError: 対象のイベントの値が不正な場合
+
+        Returns:
+            bool: 反映した場合はTrue。対象外のイベントの場合はFalse。
+
+        """
+        event_type = event.get('eventType')
+        if event_type not in pr_event_type_list and event_type not in work_item_event_type_list:
+            return False
+
+        resource = event.get('resource') or {}
+        if not isinstance(resource, dict):
+            raise TypeError('resource must be an object.')
+
+        if event_type in pr_event_type_list:
+            pr = _to_hook_pr(resource)
+            with self._lock:
+                self._pr_dict[pr.pr_id] = pr
+                self._not_found_pr_id_set.discard(pr.pr_id)
+                # PRの更新(プッシュ・完了等)により変更パスが変わるため破棄する
+                self._pr_path_dict.pop(pr.pr_id, None)
+            logger.info("pull request updated. pr_id=(%s), status=(%s)", pr.pr_id, pr.status)
+            return True
+
+        # workitem.updatedのidは更新のIDのため、workItemIdを優先する
+        work_item_id = int(resource.get('workItemId', resource.get('id')))
+        # PRリンクは次回の照会時に取得する
+        with self._lock:
+            self._work_item_pr_id_dict.pop(work_item_id, None)
+        work_item.clear_cache(work_item_id)
+        logger.info("work item updated. work_item_id=(%s)", work_item_id)
+        return True
+
+    def get_pr_dict(self, work_item_id :int) -> dict:
+        """
+
+        WorkItemに設定されたPRのPR辞書を取得する。未保持のWorkItem・PRはREST APIで取得する。
+        取得できない(404)PRは含めない。
+
+        Args:
+            work_item_id (int): WorkItemのID
+
+        Raises:
+            RequestException: HttpRequestに失敗した場合(PRの404を除く)
+
+        Returns:
+            PR辞書(key:pr_id(int), value:PR(PullRequest))
+
+        """
+        pr_dict = {}
+        for pr_id, repo_id in self._get_pr_id_dict(work_item_id).items():
+            with self._lock:
+                if pr_id in self._not_found_pr_id_set:
+                    continue
+                pr = self._pr_dict.get(pr_id)
+            if pr == None:
+                try:
+                    pr = git_repo.get_pr(repo_id, pr_id)
+                except HTTPError as e:
+                    if e.response == None or e.response.status_code != 404:
+                        raise e
+                    logger.warning("pull request not found. work_item_id=(%s), repo_id=(%s), pr_id=(%s)", work_item_id, repo_id, pr_id)
+                    with self._lock:
+                        # 取得中にイベントで更新された場合はイベントを優先する
+                        if pr_id not in self._pr_dict:
+                            self._not_found_pr_id_set.add(pr_id)
+                    continue
+                with self._lock:
+                    # 取得中にイベントで更新された場合はイベントを優先する
+                    pr = self._pr_dict.setdefault(pr_id, pr)
+            pr_dict[pr_id] = pr
+        return pr_dict
+
+    def get_not_found_pr_id_list(self, work_item_id :int) -> list:
+        """
+
+        WorkItemに設定されたPRのうち、取得できない(404)PRのPRIDを取得する。
+
+        Args:
+            work_item_id (int): WorkItemのID
+
+        Raises:
+            RequestException: HttpRequestに失敗した場合
+
+        Returns:
+            list: PRIDのリスト(昇順)
+
+        """
+        pr_id_dict = self._get_pr_id_dict(work_item_id)
+        with self._lock:
+            return sorted(pr_id for pr_id in pr_id_dict if pr_id in self._not_found_pr_id_set)
+
+    def _get_pr_id_dict(self, work_item_id :int) -> dict:
+        with self._lock:
+            pr_id_dict = self._work_item_pr_id_dict.get(work_item_id)
+        if pr_id_dict == None:
+            pr_id_dict = work_item.get_pr_id_dict(work_item_id)
+            with self._lock:
+                self._work_item_pr_id_dict[work_item_id] = pr_id_dict
+        return pr_id_dict
+
+    def check_merged(self, work_item_id :int, branch_name :str) -> merge_check.MergeResult:
+        """
+
+        WorkItemに設定されたPRのうち、ターゲットブランチ向けのPRのマージ状況をチェックする。
+        完了済み(completed)のPRをマージ済みとする。取得できない(404)PRは未検出とし、マージ済みとしない。
+
+        Args:
+            work_item_id (int): WorkItemのID
+            branch_name (str): ターゲットブランチ名
+
+        Raises:
+            RequestException: HttpRequestに失敗した場合
+
+        Returns:
+            MergeResult: チェック結果
+
+        """
+        repo_id_pr_list_dict = self._get_repo_id_pr_list_dict(work_item_id, branch_name)
+
+        repo_result_list = []
+        for repo_id, pr_list in repo_id_pr_list_dict.items():
+            repo_result_list.append(merge_check.RepoMergeResult(
+                repo_id,
+                git_repo.get_repo_name(repo_id),
+                [pr.pr_id for pr in pr_list if pr.status == 'completed'],
+                [pr.pr_id for pr in pr_list if pr.status != 'completed']
+                ))
+
+        return merge_check.MergeResult(work_item_id, branch_name, repo_result_list, self.get_not_found_pr_id_list(work_item_id))
+
+    def get_changed_path_dict(self, work_item_id :int, branch_name :str) -> dict:
+        """
+
+        WorkItemに設定されたターゲットブランチ向けのPRより、リポジトリ毎の変更パス-変更種類辞書を取得する。
+        PR毎の変更パスは保持し、PRの更新イベントを受信するまで再取得しない。取得できない(404)PRは含めない。
+
+        Args:
+            work_item_id (int): WorkItemのID
+            branch_name (str): ターゲットブランチ名
+
+        Raises:
+            RequestException: HttpRequestに失敗した場合
+
+        Returns:
+            dict: リポジトリ名-変更パス-変更種類辞書(key:リポジトリ名(str), value:変更パス-変更種類辞書)
+
+        """
+        repo_id_pr_list_dict = self._get_repo_id_pr_list_dict(work_item_id, branch_name)
+
+        # 未保持のPRの変更パスをまとめて取得する
+        with self._lock:
+            missing_repo_pr_id_list = [
+                (repo_id, pr.pr_id)
+                for repo_id, pr_list in repo_id_pr_list_dict.items()
+                for pr in pr_list
+                if pr.pr_id not in self._pr_path_dict
+                ]
+        if len(missing_repo_pr_id_list) != 0:
+            path_dict_list = git_repo.get_pr_path_dict_list(missing_repo_pr_id_list)
+            with self._lock:
+                for (repo_id, pr_id), path_dict in zip(missing_repo_pr_id_list, path_dict_list):
+                    self._pr_path_dict[pr_id] = path_dict
+
+        repo_path_type_dict = {}
+        for repo_id, pr_list in repo_id_pr_list_dict.items():
+            # 古いPRから順に反映し、重複パスは最新のPRの変更種類とする
+            path_type_dict = {}
+            for pr in sorted(pr_list, key=lambda pr: pr.pr_id):
+                with self._lock:
+                    path_type_dict.update(self._pr_path_dict.get(pr.pr_id, {}))
+            repo_path_type_dict[git_repo.get_repo_name(repo_id)] = dict(sorted(path_type_dict.items()))
+        return repo_path_type_dict
+
+    def _get_repo_id_pr_list_dict(self, work_item_id :int, branch_name :str) -> dict:
+        # ターゲットブランチ向けのPRのリポジトリID-PRリスト辞書
+        repo_id_pr_list_dict = {}
+        for pr in self.get_pr_dict(work_item_id).values():
+            if pr.target_branch == branch_name:
+                repo_id_pr_list_dict.setdefault(pr.repo_id, []).append(pr)
+        return repo_id_pr_list_dict
+
+
+def _to_hook_pr(resource :dict) -> PullRequest:
+    # ブランチ名はREST APIで取得したPRと同じ形式とする
+    return PullRequest(
+        repo_id=resource['repository']['id'],
+        repo_name=resource['repository'].get('name'),
+        pr_id=int(resource['pullRequestId']),
+        status=resource['status'],
+        source_branch=git_repo.to_branch_name(resource['sourceRefName']),
+        target_branch=git_repo.to_branch_name(resource['targetRefName']),
+        last_merge_commit=(resource.get('lastMergeCommit') or {}).get('commitId')
+    )
+
+
+class HookHandler(BaseHTTPRequestHandler):
+    """
+
+    サービスフックの受信(POST /hooks)と、マージ状況(GET /check-merged)・変更パス(GET /changed-files)の照会に応答する。
+    照会のクエリパラメータは work_item_id と branch。
+    取得できない(404)PRがある場合も他のPRで応答し、未検出のPRIDはマージ状況のnot_found・変更パスのX-Not-Found-Pr-Idsヘッダーで返す。
+
+    """
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def do_POST(self):
+        if urllib.parse.urlsplit(self.path).path != '/hooks':
+            self._send(404, {'message': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            event = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self._send(400, {'message': str(e)})
+            return
+
+        if not isinstance(event, dict):
+            self._send(400, {'message': 'payload must be a JSON object.'})
+            return
+
+        try:
+            with context.use(self.server.ctx):
+                is_handled = self.server.state.handle_event(event)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("invalid payload. eventType=(%s), error=(%r)", event.get('eventType'), e)
+            self._send(400, {'message': 'invalid payload. ' + repr(e)})
+            return
+        self._send(200, {'eventType': event.get('eventType'), 'handled': is_handled})
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+
+        query_dict = {
+            '/check-merged': lambda work_item_id, branch_name: (self.server.state.check_merged(work_item_id, branch_name).to_dict(), {}),
+            '/changed-files': lambda work_item_id, branch_name: (
+                self.server.state.get_changed_path_dict(work_item_id, branch_name),
+                {'X-Not-Found-Pr-Ids': ','.join(str(pr_id) for pr_id in self.server.state.get_not_found_pr_id_list(work_item_id))}
+                )
+        }
+        query = query_dict.get(url.path)
+        if query == None:
+            self._send(404, {'message': 'not found'})
+            return
+
+        if not params.get('work_item_id', '').isdigit() or params.get('branch') == None:
+            self._send(400, {'message': 'work_item_id and branch are required.'})
+            return
+
+        try:
+            with context.use(self.server.ctx):
+                body, header_dict = query(int(params['work_item_id']), params['branch'])
+        except Exception as e:
+            logger.error(e)
+            self._send(502, {'message': str(e)})
+            return
+        self._send(200, body, header_dict)
+
+    def _send(self, status :int, body, header_dict :dict=None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (header_dict or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class HookServer(ThreadingHTTPServer):
+    """
+
+    マージ状況の常駐サーバー。
+    受信したサービスフックのイベントで状態を更新し、照会には保持した状態で応答する。
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, ctx :context.Context, host :str='127.0.0.1', port :int=0):
+        """
+
+        Args:
+            ctx (Context): REST APIの呼び出しに使用するコンテキスト
+            host (str): 待受アドレス
+            port (int): 待受ポート。0の場合は空きポート。
+
+        """
+        super().__init__((host, port), HookHandler)
+        self.ctx = ctx
+        self.state = MergeState()
+
+    def get_url(self) -> str:
+        return 'http://%s:%d/' % self.server_address[:2]
+
+
+def main(argv :list=None):
+    parser = argparse.ArgumentParser(description='サービスフックでマージ状況を更新する常駐サーバー')
+    parser.add_argument('--host', default='127.0.0.1', help='待受アドレス')
+    parser.add_argument('--port', type=int, default=8080, help='待受ポート。0の場合は空きポート')
+    args = parser.parse_args(argv)
+
+    server = HookServer(context.get_context(), host=args.host, port=args.port)
+
+    logger.info("hook server started. url=(%s)", server.get_url())
+    print(server.get_url(), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.ctx.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
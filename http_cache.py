@@ -0,0 +1,135 @@
+import collections
+import threading
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# キャッシュに保持するレスポンスヘッダー(ページングに必要なもの)
+cached_header_list=['x-ms-continuationtoken']
+
+
+class CacheEntry():
+    etag=None
+    last_modified=None
+    data=None
+    headers=None
+
+    def __init__(self, etag:str, last_modified:str, data, headers:dict):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.data = data
+        self.headers = headers
+
+
+class HttpCache():
+    """
+
+    ETag/Last-Modifiedによる再検証キャッシュ。
+    レスポンスの解析済みJSONを検証子(ETag/Last-Modified)と共に保持し、
+    次回のGETではIf-None-Match/If-Modified-Sinceを送信して、304の場合は保持したJSONを返却する。
+    保持件数が上限を超過した場合は、参照の古いものから削除する。
+
+    """
+
+    def __init__(self, max_entries :int=1000):
+        """
+
+        Args:
+            max_entries (int): 最大保持件数
+
+        """
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entry_dict = collections.OrderedDict()
+        self._hit_count = 0
+        self._miss_count = 0
+
+    @staticmethod
+    def make_key(url :str, params :dict) -> tuple:
+        """
+
+        URLとクエリパラメータよりキャッシュキーを作成する。
+
+        """
+        if params == None:
+            return (url, ())
+        return (url, tuple(sorted((str(key), str(value)) for key, value in params.items())))
+
+    def get(self, key :tuple) -> CacheEntry:
+        with self._lock:
+            entry = self._entry_dict.get(key)
+            if entry != None:
+                self._entry_dict.move_to_end(key)
+            return entry
+
+    def get_conditional_headers(self, entry :CacheEntry) -> dict:
+        """
+
+        キャッシュエントリより条件付きGETのリクエストヘッダーを作成する。
+
+        Args:
+            entry (CacheEntry): キャッシュエントリ。Noneの場合は空のヘッダー。
+
+        Returns:
+            dict: リクエストヘッダー
+
+        """
+        headers = {}
+        if entry == None:
+            return headers
+        if entry.etag != None:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified != None:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def put(self, key :tuple, data, headers) -> bool:
+        """
+
+        レスポンスを保持する。検証子(ETag/Last-Modified)が無いレスポンスは保持しない。
+
+        Args:
+            key (tuple): キャッシュキー
+            data: レスポンスの解析済みJSON
+            headers: レスポンスヘッダー
+
+        Returns:
+            bool: 保持した場合はTrue
+
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if etag == None and last_modified == None:
+            return False
+
+        cached_headers = {}
+        for header in cached_header_list:
+            if headers.get(header) != None:
+                cached_headers[header] = headers.get(header)
+
+        with self._lock:
+            self._entry_dict[key] = CacheEntry(etag, last_modified, data, cached_headers)
+            self._entry_dict.move_to_end(key)
+            while len(self._entry_dict) > self.max_entries:
+                self._entry_dict.popitem(last=False)
+        return True
+
+    def record(self, is_hit :bool):
+        with self._lock:
+            if is_hit:
+                self._hit_count += 1
+            else:
+                self._miss_count += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entry_dict),
+                'hit_count': self._hit_count,
+                'miss_count': self._miss_count
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entry_dict.clear()
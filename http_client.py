@@ -0,0 +1,284 @@
+import requests
+from requests.adapters import HTTPAdapter
+import time
+import scheduler
+import http_cache
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# 継続トークンを返却するレスポンスヘッダー
+continuation_token_header='x-ms-continuationtoken'
+
+
+def next_page_params(params :dict, items :list, headers, page_size :int, top_param :str, skip_param :str) -> dict:
+    """
+
+    取得したページより、次ページのクエリパラメータを作成する。
+    継続トークンが返却された場合は継続トークンを、それ以外はスキップ件数を指定する。
+    ページサイズ未満のページは最終ページとするため、ページサイズはサーバーの1ページの最大件数以下とすること。
+
+    Args:
+        params (dict): 取得したページのクエリパラメータ
+        items (list): 取得したページの要素リスト
+        headers: 取得したページのレスポンスヘッダー
+        page_size (int): ページサイズ
+        top_param (str): 取得件数のパラメータ名
+        skip_param (str): スキップ件数のパラメータ名
+
+    Returns:
+        dict: 次ページのクエリパラメータ。最終ページの場合はNone。
+
+    """
+    if len(items) == 0:
+        return None
+
+    continuation_token = headers.get(continuation_token_header)
+    if continuation_token:
+        next_params = dict(params)
+        next_params['continuationToken'] = continuation_token
+        return next_params
+
+    if len(items) < page_size:
+        return None
+
+    next_params = dict(params)
+    next_params[skip_param] = params.get(skip_param, 0) + len(items)
+    return next_params
+
+
+def call_hooks(hooks :list, method :str, url :str, status :int, size :int, started_at :float, elapsed :float):
+    """
+
+    送信毎のフックを呼び出す。フックの例外はログ出力のみとし、リクエストを失敗させない。
+
+    Args:
+        hooks (list): フックのリスト
+        method (str): HTTPメソッド
+        url (str): URL(クエリパラメータを含まない)
+        status (int): HTTPステータス。通信エラーの場合はNone。
+        size (int): レスポンスのサイズ(バイト)
+        started_at (float): 送信日時(epoch秒)
+        elapsed (float): 経過秒数
+
+    """
+    for hook in hooks:
+        try:
+            hook(method, url, status, size, started_at, elapsed)
+        except Exception as e:
+            logger.warning("request hook failed. hook=(%s), error=(%s)", hook, e)
+
+
+class HttpClient():
+    """
+
+    AzureDevOps向けのHTTPクライアント。
+    Keep-Aliveの接続プールを保持し、認証情報・api-version・タイムアウトを一括で設定する。
+    リクエストはスケジューラを経由して送信し、スロットリング時のGETは再試行する。
+    キャッシュを指定した場合、JSONのGETはETag/Last-Modifiedによる条件付きGETとする。
+    フックを登録した場合、送信毎(再試行を含む)に(HTTPメソッド, URL, HTTPステータス, サイズ, 送信日時, 経過秒数)で呼び出す。
+    トランスポートアダプタを指定した場合は、既定のアダプタの代わりに使用する(記録・再生等)。
+    サーバーの1ページの最大件数を指定した場合、一覧APIのページサイズはこの件数を上限とする。
+
+    """
+
+    def __init__(self, user :str, password :str, api_version :str, pool_size :int=10, timeout :float=30, request_scheduler :scheduler.RequestScheduler=None, max_retries :int=5, cache :http_cache.HttpCache=None, hooks :list=None, adapter :HTTPAdapter=None, max_page_size :int=None):
+        self.api_version = api_version
+        self.max_page_size = max_page_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = cache
+        self.hooks = list(hooks) if hooks != None else []
+
+        if request_scheduler == None:
+            request_scheduler = scheduler.RequestScheduler(max_window=pool_size)
+        self.scheduler = request_scheduler
+
+        self.session = requests.Session()
+        self.session.auth = (user, password)
+
+        if adapter == None:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method :str, url :str, params :dict=None, **kwargs) -> requests.Response:
+        """
+
+        HttpRequestを送信する。
+        api-versionが未指定の場合は付与し、タイムアウトが未指定の場合は既定値を設定する。
+        GETリクエストは、スロットリング・一時的なサーバーエラー・通信エラーの場合に
+        待機の上で最大再試行回数まで再試行する。
+
+        Args:
+            method (str): HTTPメソッド
+            url (str): URL
+            params (dict): クエリパラメータ
+
+        Raises:
+            RequestException: 通信に失敗した場合
+
+        Returns:
+            requests.Response: レスポンス
+
+        """
+        _params = {'api-version': self.api_version}
+        if params != None:
+            _params.update(params)
+
+        kwargs.setdefault('timeout', self.timeout)
+
+        is_idempotent = method.upper() == 'GET'
+
+        attempt = 0
+        while True:
+            self.scheduler.acquire()
+            released = False
+            started_at = time.time()
+            started = time.perf_counter()
+            try:
+                res = self.session.request(method, url, params=_params, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.scheduler.release(is_connection_error=True)
+                released = True
+                call_hooks(self.hooks, method, url, None, 0, started_at, time.perf_counter() - started)
+                if not is_idempotent or attempt >= self.max_retries:
+                    raise e
+                delay = self.scheduler.get_retry_delay(attempt)
+                logger.warning("request failed, retrying. url=(%s), attempt=(%s), delay=(%s), error=(%s)", url, attempt + 1, delay, e)
+            else:
+                self.scheduler.release(res.status_code, res.headers)
+                released = True
+                call_hooks(self.hooks, method, url, res.status_code, self._get_response_size(res, kwargs.get('stream', False)), started_at, time.perf_counter() - started)
+                if not is_idempotent or res.status_code not in scheduler.retry_status_list or attempt >= self.max_retries:
+                    return res
+                delay = self.scheduler.get_retry_delay(attempt, res.headers)
+                logger.warning("request failed, retrying. url=(%s), status=(%s), attempt=(%s), delay=(%s)", url, res.status_code, attempt + 1, delay)
+                res.close()
+            finally:
+                # その他の例外(本文の受信失敗・不正なURL・再生時の記録なし等)の場合も送信枠を返却する
+                if not released:
+                    self.scheduler.release()
+                    call_hooks(self.hooks, method, url, None, 0, started_at, time.perf_counter() - started)
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _get_response_size(self, res :requests.Response, stream :bool) -> int:
+        # ストリーミングの場合は本文を読み込まずにContent-Lengthより取得する
+        if stream:
+            return int(res.headers.get('Content-Length', 0))
+        return len(res.content)
+
+    def get(self, url :str, params :dict=None, **kwargs) -> requests.Response:
+        return self.request('GET', url, params=params, **kwargs)
+
+    def get_json(self, url :str, params :dict=None, use_cache :bool=True):
+        """
+
+        GETリクエストを送信し、レスポンスのJSONを取得する。
+
+        Args:
+            url (str): URL
+            params (dict): クエリパラメータ
+            use_cache (bool): 条件付きGETキャッシュを利用するか
+
+        Raises:
+            RequestException: HttpRequestに失敗した場合
+
+        Returns:
+            レスポンスのJSON
+
+        """
+        res_data, headers = self.get_json_with_headers(url, params=params, use_cache=use_cache)
+        return res_data
+
+    def get_json_with_headers(self, url :str, params :dict=None, use_cache :bool=True) -> tuple:
+        """
+
+        GETリクエストを送信し、レスポンスのJSONとレスポンスヘッダーを取得する。
+        キャッシュを利用する場合、保持したレスポンスの検証子をIf-None-Match/If-Modified-Sinceで送信し、
+        304(Not Modified)の場合は保持したJSONを返却する。
+        保持したレスポンスがない(検証子を送信していない)にもかかわらず304の場合は、再検証を要求して再取得する。
+
+        Args:
+            url (str): URL
+            params (dict): クエリパラメータ
+            use_cache (bool): 条件付きGETキャッシュを利用するか
+
+        Raises:
+            RequestException: HttpRequestに失敗した場合。再取得も304の場合を含む。
+
+        Returns:
+            tuple: (レスポンスのJSON, レスポンスヘッダー)。304の場合のレスポンスヘッダーは保持したもの。
+
+        """
+        if self.cache == None or not use_cache:
+            res = self.get(url, params=params)
+            res.raise_for_status()
+            return res.json(), res.headers
+
+        key = self.cache.make_key(url, params)
+        entry = self.cache.get(key)
+
+        res = self.get(url, params=params, headers=self.cache.get_conditional_headers(entry))
+
+        if res.status_code == 304:
+            if entry != None:
+                self.cache.record(True)
+                return entry.data, entry.headers
+
+            # 検証子を送信していない304は中継サーバー等のキャッシュによるため、再検証を要求して再取得する
+            logger.warning("not modified without cached entry, refetching. url=(%s)", url)
+            res = self.get(url, params=params, headers={'Cache-Control': 'no-cache'})
+            if res.status_code == 304:
+                raise requests.HTTPError('304 Not Modified without cached entry for url: ' + res.url, response=res)
+
+        res.raise_for_status()
+        self.cache.record(False)
+
+        res_data = res.json()
+        self.cache.put(key, res_data, res.headers)
+        return res_data, res.headers
+
+    def iter_pages(self, url :str, params :dict=None, value_key :str='value', page_size :int=100, top_param :str='$top', skip_param :str='$skip', use_cache :bool=True):
+        """
+
+        ページングされた一覧APIを最終ページまで順に取得し、要素を1件ずつ返却する。
+        $top/$skipによるページングと、継続トークン(x-ms-continuationtoken)の双方に対応する。
+
+        Args:
+            url (str): URL
+            params (dict): クエリパラメータ
+            value_key (str): レスポンスの要素リストのキー
+            page_size (int): ページサイズ
+            top_param (str): 取得件数のパラメータ名
+            skip_param (str): スキップ件数のパラメータ名
+            use_cache (bool): 条件付きGETキャッシュを利用するか
+
+        Raises:
+            RequestException: HttpRequestに失敗した場合
+
+        Yields:
+            一覧の要素(dict)
+
+        """
+        if self.max_page_size != None:
+            page_size = min(page_size, self.max_page_size)
+
+        page_params = dict(params) if params != None else {}
+        page_params[top_param] = page_size
+
+        while page_params != None:
+            res_data, headers = self.get_json_with_headers(url, params=page_params, use_cache=use_cache)
+
+            items = res_data[value_key]
+            yield from items
+
+            page_params = next_page_params(page_params, items, headers, page_size, top_param, skip_param)
+
+    def patch(self, url :str, params :dict=None, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, params=params, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,126 @@
+import codecs
+import json
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+_decoder = json.JSONDecoder()
+
+_whitespace = ' \t\r\n'
+
+
+class _Reader():
+    """
+
+    バイト列のチャンクを順に読み込み、JSONの値を先頭から1つずつ解析する。
+    解析済みの部分は次のチャンクの読み込み時に破棄するため、保持するのは未解析の部分のみとなる。
+
+    """
+
+    def __init__(self, chunk_iter):
+        self._chunk_iter = iter(chunk_iter)
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+
+        chunk = next(self._chunk_iter, None)
+        if chunk == None:
+            text = self._text_decoder.decode(b'', final=True)
+            self._eof = True
+        else:
+            text = self._text_decoder.decode(chunk)
+
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        # 空白を読み飛ばし、次の文字を返却する。終端の場合は空文字。
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _whitespace:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char :str):
+        next_char = self.peek()
+        if next_char != char:
+            raise ValueError('invalid json. expected=(' + char + '), actual=(' + next_char + ')')
+        self._pos += 1
+
+    def decode_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                # 値がチャンクの境界で途切れている場合は、次のチャンクを読み込んで再度解析する
+                if not self._fill():
+                    raise e
+                continue
+
+            # 数値は末尾で途切れている可能性があるため、後続の文字を読み込むまで確定しない
+            if end == len(self._buffer) and self._fill():
+                continue
+
+            self._pos = end
+            return value
+
+
+def iter_array_items(chunk_iter, key :str, other_value_dict :dict=None):
+    """
+
+    JSONオブジェクトのバイト列をチャンク毎に読み込み、指定したキーの配列の要素を1件ずつ返却する。
+    配列全体を読み込まないため、メモリ使用量は要素1件とチャンクのサイズに依存し、配列の件数に依存しない。
+    指定したキー以外の値は読み込んで破棄する。ただし、other_value_dictを指定した場合はそれに格納する。
+
+    Args:
+        chunk_iter: JSONオブジェクト(UTF-8)のバイト列のチャンクのイテレータ
+        key (str): 配列のキー(最上位のオブジェクトのキー)
+        other_value_dict (dict): 指定したキー以外の最上位の値の格納先。全ての要素を返却した後に確定する。
+
+    Raises:
+        ValueError: JSONの形式が不正な場合
+
+    Yields:
+        配列の要素
+
+    """
+    reader = _Reader(chunk_iter)
+
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+
+    while True:
+        name = reader.decode_value()
+        reader.expect(':')
+
+        if name == key and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield reader.decode_value()
+                    if reader.peek() != ',':
+                        break
+                    reader.expect(',')
+                reader.expect(']')
+        else:
+            value = reader.decode_value()
+            if other_value_dict != None:
+                other_value_dict[name] = value
+
+        if reader.peek() != ',':
+            break
+        reader.expect(',')
+
+    reader.expect('}')
@@ -0,0 +1,204 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import context
+import func
+import git_repo
+import git_mirror
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+class RepoMergeResult():
+    repo_id=None
+    repo_name=None
+    merged_pr_id_list=None
+    not_merged_pr_id_list=None
+
+    def __init__(self, repo_id:str, repo_name:str, merged_pr_id_list:list, not_merged_pr_id_list:list):
+        self.repo_id = repo_id
+        self.repo_name = repo_name
+        self.merged_pr_id_list = merged_pr_id_list
+        self.not_merged_pr_id_list = not_merged_pr_id_list
+
+    def to_dict(self) -> dict:
+        return {
+            'repo_id': self.repo_id,
+            'repo_name': self.repo_name,
+            'merged': self.merged_pr_id_list,
+            'not_merged': self.not_merged_pr_id_list
+        }
+
+
+class MergeResult():
+    work_item_id=None
+    branch_name=None
+    is_all_merged=None
+    repo_result_list=None
+    not_found_pr_id_list=None
+
+    def __init__(self, work_item_id:int, branch_name:str, repo_result_list:list, not_found_pr_id_list:list=None):
+        self.work_item_id = work_item_id
+        self.branch_name = branch_name
+        self.repo_result_list = repo_result_list
+        # 取得できない(404)ため、ターゲットブランチ・マージ状況を確認できないPRID
+        self.not_found_pr_id_list = not_found_pr_id_list if not_found_pr_id_list != None else []
+        self.is_all_merged = (
+            len(self.not_found_pr_id_list) == 0
+            and all(len(repo_result.not_merged_pr_id_list) == 0 for repo_result in repo_result_list)
+            )
+
+    def to_dict(self) -> dict:
+        return {
+            'work_item_id': self.work_item_id,
+            'branch_name': self.branch_name,
+            'is_all_merged': self.is_all_merged,
+            'repos': [repo_result.to_dict() for repo_result in self.repo_result_list],
+            'not_found': self.not_found_pr_id_list
+        }
+
+
+class MergeChecker():
+    """
+
+    複数WorkItemのマージ状況のチェック。
+    (リポジトリ, ターゲットブランチ)毎の完了済みPRIDの集合を1回だけ取得して保持し、
+    WorkItem毎のマージ済み・マージ未了は集合演算で判定する。
+    ローカルのミラーを利用する場合(git_mirror_dirを設定)は、WorkItemのPRの最終マージコミットがブランチの祖先であるかで判定する。
+    スカッシュ・リベースで完了したPR等、最終マージコミットがミラーに存在しないPRは完了済みの状態で判定する(git_mirror.get_merged_pr_id_set)。
+    インスタンスはスレッド間で共有できる。同じ(リポジトリ, ターゲットブランチ)を並行に参照した場合も取得は1回とする。
+    保持した集合は破棄するまで更新しないため、一連のチェック毎にインスタンスを生成すること。
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key:(リポジトリID, ターゲットブランチ名), value:完了済みPRIDの集合
+        self._completed_pr_id_set_dict = {}
+        # key:(リポジトリID, ターゲットブランチ名), value:取得中のロック
+        self._key_lock_dict = {}
+
+    def get_completed_pr_id_set(self, repo_id :str, branch_name :str) -> set:
+        """
+
+        完了済みPRIDの集合を取得する。未取得の場合はGitRepoより取得する。
+
+        Args:
+            repo_id (str): レポジトリのID
+            branch_name (str): ターゲットブランチ名
+
+        Raises:
+            RequestException: HttpRequestに失敗した場合
+
+        Returns:
+            set: 完了済みPRIDの集合
+
+        """
+        key = (repo_id, branch_name)
+        with self._lock:
+            pr_id_set = self._completed_pr_id_set_dict.get(key)
+            if pr_id_set != None:
+                return pr_id_set
+            key_lock = self._key_lock_dict.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # 待機中に他のスレッドが取得済みの場合はそれを利用する
+            with self._lock:
+                pr_id_set = self._completed_pr_id_set_dict.get(key)
+            if pr_id_set != None:
+                return pr_id_set
+
+            pr_id_set = set(git_repo.get_pr_id_list(repo_id, branch_name, 'completed'))
+
+            with self._lock:
+                self._completed_pr_id_set_dict[key] = pr_id_set
+                self._key_lock_dict.pop(key, None)
+            return pr_id_set
+
+    def check(self, work_item_id :int, branch_name :str) -> MergeResult:
+        """
+
+        WorkItemに設定されたPRのマージ状況をチェックする。
+
+        Args:
+            work_item_id (int): WorkItemのID
+            branch_name (str): ターゲットブランチ名
+
+        Raises:
+            RequestException: HttpRequestに失敗した場合
+            subprocess.CalledProcessError: gitの実行に失敗した場合
+
+        Returns:
+            MergeResult: チェック結果
+
+        """
+        pr_dict = func.get_pr_dict(work_item_id, branch_name)
+
+        # リポジトリID-PRリスト辞書(WorkItemのPR)
+        repo_id_pr_list_dict = {}
+        for pr in pr_dict.values():
+            repo_id_pr_list_dict.setdefault(pr.repo_id, []).append(pr)
+
+        repo_result_list = []
+        for repo_id, wi_pr_list in repo_id_pr_list_dict.items():
+            if git_mirror.is_enabled():
+                completed_pr_id_set = git_mirror.get_merged_pr_id_set(repo_id, branch_name, wi_pr_list)
+            else:
+                completed_pr_id_set = self.get_completed_pr_id_set(repo_id, branch_name)
+
+            wi_pr_id_set = set(pr.pr_id for pr in wi_pr_list)
+            repo_result_list.append(RepoMergeResult(
+                repo_id,
+                git_repo.get_repo_name(repo_id),
+                sorted(wi_pr_id_set & completed_pr_id_set),
+                sorted(wi_pr_id_set - completed_pr_id_set)
+                ))
+
+        return MergeResult(work_item_id, branch_name, repo_result_list)
+
+    def check_list(self, work_item_id_list :list, branch_name :str, max_workers :int=None) -> list:
+        """
+
+        WorkItemのIDのリストについて、マージ状況を並列にチェックする。
+
+        Args:
+            work_item_id_list (list): WorkItemのIDのリスト
+            branch_name (str): ターゲットブランチ名
+            max_workers (int): 最大並列数。Noneの場合は設定値を使用する。
+
+        Raises:
+            RequestException: HttpRequestに失敗した場合
+
+        Returns:
+            list: チェック結果(MergeResult)のリスト(引数と同じ順序)
+
+        """
+        if max_workers == None:
+            max_workers = context.get_context().max_workers
+
+        # ワーカースレッドへ現在のコンテキストを引き継ぐ
+        with ThreadPoolExecutor(max_workers=max_workers, initializer=context.set_context, initargs=(context.get_context(),)) as executor:
+            return list(executor.map(
+                lambda work_item_id: self.check(work_item_id, branch_name),
+                work_item_id_list
+                ))
+
+
+def check_merged_list(work_item_id_list :list, branch_name :str, max_workers :int=None) -> list:
+    """
+
+    WorkItemのIDのリストについて、マージ状況をチェックする。
+    (リポジトリ, ターゲットブランチ)毎の完了済みPRの一覧は1回だけ取得する。
+
+    Args:
+        work_item_id_list (list): WorkItemのIDのリスト
+        branch_name (str): ターゲットブランチ名
+        max_workers (int): 最大並列数。Noneの場合は設定値を使用する。
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    Returns:
+        list: チェック結果(MergeResult)のリスト(引数と同じ順序)
+
+    """
+    return MergeChecker().check_list(work_item_id_list, branch_name, max_workers)
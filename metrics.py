@@ -0,0 +1,232 @@
+import json
+import os
+import re
+import threading
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# レイテンシーのヒストグラムの区切り(秒)
+latency_bucket_list=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# URLより論理エンドポイントを判定するパターン(先に一致したものを採用する)
+endpoint_pattern_list=[
+    ('attachments', re.compile(r'/_apis/wit/attachments(/|$)')),
+    ('workitem', re.compile(r'/_apis/wit/workitems(/|$)')),
+    ('iterations', re.compile(r'/pullrequests/\d+/iterations(/|$)')),
+    ('commits', re.compile(r'/pullrequests/\d+/commits$')),
+    ('pullrequests', re.compile(r'/pullrequests(/\d+)?$')),
+    ('changes', re.compile(r'/commits/[^/]+/changes$')),
+    ('diffs', re.compile(r'/diffs/')),
+    ('repositories', re.compile(r'/_apis/git/repositories(/[^/]+)?$'))
+]
+
+
+def get_endpoint(url :str) -> str:
+    """
+
+    URLより論理エンドポイント名を取得する。
+
+    Args:
+        url (str): URL(クエリパラメータを含まない)
+
+    Returns:
+        str: エンドポイント名(workitem, pullrequests, commits, changes, diffs, attachments等)。判定できない場合はother。
+
+    """
+    for endpoint, pattern in endpoint_pattern_list:
+        if pattern.search(url):
+            return endpoint
+    return 'other'
+
+
+class EndpointStats():
+    count=0
+    bytes=0
+    latency_sum=0.0
+    latency_max=0.0
+
+    def __init__(self):
+        self.status_dict = {}
+        # 区切り毎の件数(末尾は区切りの上限超過)
+        self.bucket_count_list = [0] * (len(latency_bucket_list) + 1)
+
+    def add(self, status :int, size :int, elapsed :float):
+        self.count += 1
+        self.bytes += size
+        self.latency_sum += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+
+        status_key = str(status) if status != None else 'error'
+        self.status_dict[status_key] = self.status_dict.get(status_key, 0) + 1
+
+        for index, bucket in enumerate(latency_bucket_list):
+            if elapsed <= bucket:
+                self.bucket_count_list[index] += 1
+                return
+        self.bucket_count_list[-1] += 1
+
+    def get_quantile(self, quantile :float) -> float:
+        # ヒストグラムの区切りの上限による近似値
+        target = self.count * quantile
+        total = 0
+        for index, bucket_count in enumerate(self.bucket_count_list):
+            total += bucket_count
+            if total >= target and bucket_count != 0:
+                return min(latency_bucket_list[index], self.latency_max) if index < len(latency_bucket_list) else self.latency_max
+        return self.latency_max
+
+
+class RequestMetrics():
+    """
+
+    HTTPリクエストの計測。
+    HTTPクライアントのフックとして登録し、論理エンドポイント毎に件数・転送量・HTTPステータス・レイテンシーのヒストグラムを集計する。
+    集計結果はPrometheusのテキスト形式、またはJSONのサマリーで出力する。
+    トレースを有効にした場合は、全リクエストをChromeトレース形式(chrome://tracing)で出力する。
+
+    """
+
+    def __init__(self, trace :bool=False):
+        """
+
+        Args:
+            trace (bool): リクエスト毎のトレースを記録するか
+
+        """
+        self.trace = trace
+
+        self._lock = threading.Lock()
+        # key:(エンドポイント, HTTPメソッド), value:EndpointStats
+        self._stats_dict = {}
+        self._trace_event_list = []
+
+    def __call__(self, method :str, url :str, status :int, size :int, started_at :float, elapsed :float):
+        """
+
+        リクエストを記録する。HTTPクライアントのフックとして呼び出される。
+
+        Args:
+            method (str): HTTPメソッド
+            url (str): URL(クエリパラメータを含まない)
+            status (int): HTTPステータス。通信エラーの場合はNone。
+            size (int): レスポンスのサイズ(バイト)
+            started_at (float): 送信日時(epoch秒)
+            elapsed (float): 経過秒数
+
+        """
+        endpoint = get_endpoint(url)
+        method = method.upper()
+
+        with self._lock:
+            stats = self._stats_dict.get((endpoint, method))
+            if stats == None:
+                stats = EndpointStats()
+                self._stats_dict[(endpoint, method)] = stats
+            stats.add(status, size, elapsed)
+
+            if self.trace:
+                self._trace_event_list.append({
+                    'name': method + ' ' + endpoint,
+                    'cat': endpoint,
+                    'ph': 'X',
+                    'ts': int(started_at * 1000000),
+                    'dur': int(elapsed * 1000000),
+                    'pid': os.getpid(),
+                    'tid': threading.get_ident(),
+                    'args': {'url': url, 'status': status, 'bytes': size}
+                })
+
+    def get_summary(self) -> dict:
+        """
+
+        エンドポイント毎の集計結果を取得する。
+
+        Returns:
+            dict: 集計結果(key:"{HTTPメソッド} {エンドポイント}", value:件数・転送量・HTTPステータス毎の件数・レイテンシー)
+
+        """
+        summary = {}
+        with self._lock:
+            for (endpoint, method), stats in sorted(self._stats_dict.items()):
+                summary[method + ' ' + endpoint] = {
+                    'count': stats.count,
+                    'bytes': stats.bytes,
+                    'status': dict(stats.status_dict),
+                    'latency': {
+                        'sum': stats.latency_sum,
+                        'mean': stats.latency_sum / stats.count,
+                        'max': stats.latency_max,
+                        'p50': stats.get_quantile(0.5),
+                        'p95': stats.get_quantile(0.95)
+                    }
+                }
+        return summary
+
+    def to_prometheus(self) -> str:
+        """
+
+        集計結果をPrometheusのテキスト形式で取得する。
+
+        Returns:
+            str: Prometheusのテキスト形式
+
+        """
+        request_line_list = []
+        bytes_line_list = []
+        duration_line_list = []
+        with self._lock:
+            for (endpoint, method), stats in sorted(self._stats_dict.items()):
+                labels = 'endpoint="%s",method="%s"' % (endpoint, method)
+                for status, count in sorted(stats.status_dict.items()):
+                    request_line_list.append('ads_http_requests_total{%s,status="%s"} %d' % (labels, status, count))
+                bytes_line_list.append('ads_http_response_bytes_total{%s} %d' % (labels, stats.bytes))
+
+                total = 0
+                for index, bucket in enumerate(latency_bucket_list):
+                    total += stats.bucket_count_list[index]
+                    duration_line_list.append('ads_http_request_duration_seconds_bucket{%s,le="%s"} %d' % (labels, bucket, total))
+                duration_line_list.append('ads_http_request_duration_seconds_bucket{%s,le="+Inf"} %d' % (labels, stats.count))
+                duration_line_list.append('ads_http_request_duration_seconds_sum{%s} %f' % (labels, stats.latency_sum))
+                duration_line_list.append('ads_http_request_duration_seconds_count{%s} %d' % (labels, stats.count))
+
+        line_list = []
+        line_list.append('# HELP ads_http_requests_total Azure DevOps HTTP requests.')
+        line_list.append('# TYPE ads_http_requests_total counter')
+        line_list.extend(request_line_list)
+        line_list.append('# HELP ads_http_response_bytes_total Azure DevOps HTTP response bytes.')
+        line_list.append('# TYPE ads_http_response_bytes_total counter')
+        line_list.extend(bytes_line_list)
+        line_list.append('# HELP ads_http_request_duration_seconds Azure DevOps HTTP request latency.')
+        line_list.append('# TYPE ads_http_request_duration_seconds histogram')
+        line_list.extend(duration_line_list)
+        return '\n'.join(line_list) + '\n'
+
+    def get_trace(self) -> dict:
+        """
+
+        リクエスト毎のトレースをChromeトレース形式で取得する。
+
+        Returns:
+            dict: Chromeトレース形式(traceEvents)
+
+        """
+        with self._lock:
+            return {'traceEvents': list(self._trace_event_list)}
+
+    def write_prometheus(self, file_path :str):
+        with open(file_path, 'w') as metrics_file:
+            metrics_file.write(self.to_prometheus())
+
+    def write_summary(self, file_path :str):
+        with open(file_path, 'w') as summary_file:
+            json.dump(self.get_summary(), summary_file, indent=2)
+
+    def write_trace(self, file_path :str):
+        with open(file_path, 'w') as trace_file:
+            json.dump(self.get_trace(), trace_file)
+
+    def clear(self):
+        with self._lock:
+            self._stats_dict.clear()
+            self._trace_event_list.clear()
@@ -0,0 +1,393 @@
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+class MockData():
+    """
+
+    モックサーバーが返却する合成データ。
+    リポジトリ・PR・コミット・変更を指定件数で生成する。
+    WorkItem(ID:1)には最新から指定件数のPRリンクと、全リポジトリのブランチリンクを設定する。
+
+    """
+
+    def __init__(self, repos :int=3, prs :int=200, commits :int=5, changes :int=20, diff_changes :int=500, linked_prs :int=10, branch_name :str='master'):
+        """
+
+        Args:
+            repos (int): リポジトリ数
+            prs (int): リポジトリ毎のPR数
+            commits (int): PR毎のコミット数
+            changes (int): コミット毎の変更数
+            diff_changes (int): ブランチ差分の変更数
+            linked_prs (int): WorkItemにリンクするPR数
+            branch_name (str): PRのターゲットブランチ名
+
+        """
+        self.project = 'project'
+        self.commits = commits
+        self.changes = changes
+        self.diff_changes = diff_changes
+        # 添付ファイル(key:添付ファイルID, value:内容(bytes))
+        self.attachment_dict = {}
+        # 受信したWorkItemの更新操作(key:WorkItemのID, value:更新操作のリストのリスト(リクエスト毎))
+        self.patch_dict = {}
+        # 更新を失敗(400)とするWorkItemのID
+        self.patch_error_id_set = set()
+
+        self.repo_dict = {}
+        for repo_no in range(repos):
+            repo_id = '00000000-0000-0000-0000-%012d' % repo_no
+            self.repo_dict[repo_id] = 'repo%d' % repo_no
+
+        self.pr_dict = {}
+        pr_id = 1
+        for pr_no in range(prs):
+            for repo_id, repo_name in self.repo_dict.items():
+                self.pr_dict[pr_id] = {
+                    'pullRequestId': pr_id,
+                    'status': 'active' if pr_no % 4 == 0 else 'completed',
+                    'sourceRefName': 'refs/heads/feature/%d' % pr_id,
+                    'targetRefName': 'refs/heads/' + branch_name,
+                    'repository': {'id': repo_id, 'name': repo_name}
+                }
+                pr_id += 1
+
+        relations = []
+        for pr in list(self.pr_dict.values())[-linked_prs:] if linked_prs > 0 else []:
+            relations.append({
+                'rel': 'ArtifactLink',
+                'url': 'vstfs:///Git/PullRequestId/' + urllib.parse.quote(self.project + '/' + pr['repository']['id'] + '/' + str(pr['pullRequestId']), safe=''),
+                'attributes': {'name': 'Pull Request'}
+            })
+        for repo_id in self.repo_dict:
+            relations.append({
+                'rel': 'ArtifactLink',
+                'url': 'vstfs:///Git/Ref/' + urllib.parse.quote(self.project + '/' + repo_id + '/GBfeature', safe=''),
+                'attributes': {'name': 'Branch'}
+            })
+
+        self.work_item = {
+            'id': 1,
+            'rev': 1,
+            'fields': {'Microsoft.VSTS.CodeReview.AcceptedDate': '2024-01-01T00:00:00Z'},
+            'relations': relations
+        }
+
+    def get_commit_id_list(self, pr_id :int) -> list:
+        return ['%08x%032x' % (pr_id, commit_no) for commit_no in range(self.commits)]
+
+    def get_commit_change_list(self, commit_id :str) -> list:
+        pr_id = int(commit_id[:8], 16)
+        commit_no = int(commit_id[8:], 16)
+        change_list = [{'item': {'path': '/src', 'gitObjectType': 'tree'}, 'changeType': 'edit'}]
+        for change_no in range(self.changes):
+            # PR内のコミット間で一部のパスを重複させる
+            change_list.append({
+                'item': {'path': '/src/pr%d/file%d.py' % (pr_id, change_no + commit_no), 'gitObjectType': 'blob'},
+                'changeType': 'add' if commit_no == 0 else 'edit'
+            })
+        return change_list
+
+    def get_iteration_change_list(self, pr_id :int) -> list:
+        change_list = []
+        for change_no in range(self.changes + self.commits - 1):
+            change_list.append({
+                'item': {'path': '/src/pr%d/file%d.py' % (pr_id, change_no)},
+                'changeType': 'add'
+            })
+        return change_list
+
+    def get_diff_change_list(self) -> list:
+        change_list = []
+        for change_no in range(self.diff_changes):
+            change_list.append({
+                'item': {'path': '/src/diff/file%d.py' % change_no, 'gitObjectType': 'blob'},
+                'changeType': 'edit'
+            })
+        return change_list
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+
+    AzureDevOps REST APIのモック。
+    WorkItem・リポジトリ・PR・コミット・差分・添付ファイルのGETと、WorkItemのPATCHに応答する。
+    添付ファイルはRangeヘッダー(bytes={開始}-)による部分取得に対応する。
+    応答前に指定秒数待機し、一覧は$top/$skip(コミット変更はtop/skip)でページングする。
+    ETagを返却し、If-None-Matchが一致する場合は304を返却する。
+
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+
+        if url.path == '/_mock/stats':
+            return self._send(200, self.server.get_stats(), count=False)
+        if url.path == '/_mock/reset':
+            self.server.reset_stats()
+            return self._send(200, {}, count=False)
+
+        time.sleep(self.server.latency)
+
+        m = re.search(r'/_apis/wit/attachments/([^/]+)$', url.path)
+        if m:
+            return self._send_attachment(m.group(1))
+
+        endpoint, status, body = self._route(url.path, params)
+        self._send(status, body, endpoint=endpoint)
+
+    def _send_attachment(self, attachment_id :str):
+        content = self.server.data.attachment_dict.get(attachment_id)
+        if content == None:
+            return self._send(404, {'message': 'not found'}, endpoint='attachments')
+
+        status = 200
+        header_dict = {}
+        m = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if m:
+            start = int(m.group(1))
+            if start >= len(content):
+                status = 416
+                header_dict['Content-Range'] = 'bytes */%d' % len(content)
+                content = b''
+            else:
+                status = 206
+                header_dict['Content-Range'] = 'bytes %d-%d/%d' % (start, len(content) - 1, len(content))
+                content = content[start:]
+
+        self.server.record('attachments', status, len(content))
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in header_dict.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_PATCH(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+
+        time.sleep(self.server.latency)
+
+        m = re.search(r'/_apis/wit/workitems/(\d+)$', self.path.split('?')[0])
+        if m:
+            data = self.server.data
+            work_item_id = int(m.group(1))
+            self.server.record_patch(work_item_id, json.loads(body) if length > 0 else [])
+            if work_item_id in data.patch_error_id_set:
+                return self._send(400, {'message': 'invalid patch'}, endpoint='workitem')
+            return self._send(200, self.server.data.work_item, endpoint='workitem')
+        self._send(404, {'message': 'not found'}, endpoint='other')
+
+    def _route(self, path :str, params :dict) -> tuple:
+        data = self.server.data
+
+        if re.search(r'/_apis/wit/workitems/\d+$', path):
+            return 'workitem', 200, data.work_item
+        if path.endswith('/_apis/git/repositories'):
+            return 'repositories', 200, {'value': [{'id': repo_id, 'name': repo_name} for repo_id, repo_name in data.repo_dict.items()]}
+
+        m = re.search(r'/repositories/([^/]+)/pullrequests/(\d+)/iterations/(\d+)/changes$', path)
+        if m:
+            return 'iterations', 200, {'changeEntries': self._page(data.get_iteration_change_list(int(m.group(2))), params, '$top', '$skip')}
+        m = re.search(r'/repositories/([^/]+)/pullrequests/(\d+)/iterations$', path)
+        if m:
+            return 'iterations', 200, {'value': [{'id': 1}]}
+        m = re.search(r'/repositories/([^/]+)/pullrequests/(\d+)/commits$', path)
+        if m:
+            commit_list = [{'commitId': commit_id} for commit_id in data.get_commit_id_list(int(m.group(2)))]
+            return 'commits', 200, {'value': self._page(commit_list, params, '$top', '$skip')}
+        m = re.search(r'/repositories/([^/]+)/pullrequests/(\d+)$', path)
+        if m:
+            pr = data.pr_dict.get(int(m.group(2)))
+            if pr == None:
+                return 'pullrequests', 404, {'message': 'not found'}
+            return 'pullrequests', 200, pr
+        m = re.search(r'/repositories/([^/]+)/pullrequests$', path)
+        if m:
+            return 'pullrequests', 200, {'value': self._page(self._find_pr_list(m.group(1), params), params, '$top', '$skip')}
+        m = re.search(r'/repositories/([^/]+)/commits/([^/]+)/changes$', path)
+        if m:
+            return 'changes', 200, {'changes': self._page(data.get_commit_change_list(m.group(2)), params, 'top', 'skip')}
+        m = re.search(r'/repositories/([^/]+)/diffs/commits$', path)
+        if m:
+            change_list = data.get_diff_change_list()
+            page = self._page(change_list, params, '$top', '$skip')
+            return 'diffs', 200, {
+                'allChangesIncluded': int(params.get('$skip', 0)) + len(page) >= len(change_list),
+                'changes': page
+            }
+        m = re.search(r'/repositories/([^/]+)$', path)
+        if m:
+            for repo_id, repo_name in data.repo_dict.items():
+                if m.group(1) in (repo_id, repo_name):
+                    return 'repositories', 200, {'id': repo_id, 'name': repo_name}
+
+        return 'other', 404, {'message': 'not found'}
+
+    def _find_pr_list(self, repo_id :str, params :dict) -> list:
+        status = params.get('searchCriteria.status', 'active')
+        target_ref_name = params.get('searchCriteria.targetRefName')
+        # 差分同期(minTime指定)の場合、合成データは変更されないため空とする
+        if 'searchCriteria.minTime' in params:
+            return []
+
+        pr_list = []
+        for pr in sorted(self.server.data.pr_dict.values(), key=lambda pr: -pr['pullRequestId']):
+            if pr['repository']['id'] != repo_id:
+                continue
+            if status != 'all' and pr['status'] != status:
+                continue
+            if target_ref_name != None and pr['targetRefName'] != target_ref_name:
+                continue
+            pr_list.append(pr)
+        return pr_list
+
+    def _page(self, item_list :list, params :dict, top_param :str, skip_param :str) -> list:
+        top = min(int(params.get(top_param, self.server.max_page_size)), self.server.max_page_size)
+        skip = int(params.get(skip_param, 0))
+        return item_list[skip:skip + top]
+
+    def _send(self, status :int, body, endpoint :str=None, count :bool=True):
+        data = json.dumps(body).encode('utf-8')
+        etag = '"' + hashlib.md5(data).hexdigest() + '"'
+
+        if status == 200 and self.command == 'GET' and self.headers.get('If-None-Match') == etag:
+            status = 304
+            data = b''
+
+        if count:
+            self.server.record(endpoint, status, len(data))
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if status in (200, 304):
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockServer(ThreadingHTTPServer):
+    """
+
+    AzureDevOps REST APIのモックサーバー。
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, data :MockData, port :int=0, latency :float=0, max_page_size :int=1000):
+        """
+
+        Args:
+            data (MockData): 合成データ
+            port (int): 待受ポート。0の場合は空きポート。
+            latency (float): 応答前の待機秒数
+            max_page_size (int): 一覧の1ページの最大件数
+
+        """
+        super().__init__(('127.0.0.1', port), MockHandler)
+        self.data = data
+        self.latency = latency
+        self.max_page_size = max_page_size
+
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._connection_count = 0
+
+    def get_url_core(self) -> str:
+        return 'http://127.0.0.1:%d/' % self.server_address[1]
+
+    def get_request(self):
+        request = super().get_request()
+        with self._lock:
+            self._connection_count += 1
+        return request
+
+    def get_connection_count(self) -> int:
+        # 受け付けた接続数(Keep-Aliveの接続は1とする)
+        with self._lock:
+            return self._connection_count
+
+    def record(self, endpoint :str, status :int, size :int):
+        with self._lock:
+            endpoint_stats = self._stats.setdefault(endpoint, {'count': 0, 'bytes': 0, 'status': {}})
+            endpoint_stats['count'] += 1
+            endpoint_stats['bytes'] += size
+            endpoint_stats['status'][str(status)] = endpoint_stats['status'].get(str(status), 0) + 1
+
+    def record_patch(self, work_item_id :int, operation_list :list):
+        with self._lock:
+            self.data.patch_dict.setdefault(work_item_id, []).append(operation_list)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+            self._connection_count = 0
+
+
+def add_data_arguments(parser :argparse.ArgumentParser):
+    parser.add_argument('--repos', type=int, default=3, help='リポジトリ数')
+    parser.add_argument('--prs', type=int, default=200, help='リポジトリ毎のPR数')
+    parser.add_argument('--commits', type=int, default=5, help='PR毎のコミット数')
+    parser.add_argument('--changes', type=int, default=20, help='コミット毎の変更数')
+    parser.add_argument('--diff-changes', type=int, default=500, help='ブランチ差分の変更数')
+    parser.add_argument('--linked-prs', type=int, default=10, help='WorkItemにリンクするPR数')
+    parser.add_argument('--latency', type=float, default=0.0, help='応答前の待機秒数')
+    parser.add_argument('--max-page-size', type=int, default=1000, help='一覧の1ページの最大件数')
+
+
+def create_data(args) -> MockData:
+    return MockData(
+        repos=args.repos,
+        prs=args.prs,
+        commits=args.commits,
+        changes=args.changes,
+        diff_changes=args.diff_changes,
+        linked_prs=args.linked_prs
+        )
+
+
+def main(argv :list=None):
+    parser = argparse.ArgumentParser(description='AzureDevOps REST APIのモックサーバー')
+    parser.add_argument('--port', type=int, default=0, help='待受ポート。0の場合は空きポート')
+    add_data_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = MockServer(create_data(args), port=args.port, latency=args.latency, max_page_size=args.max_page_size)
+
+    # 呼び出し元が待受URLを取得できるよう、1行目に出力する
+    print(server.get_url_core(), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
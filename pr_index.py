@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+from git_models import PullRequest
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+class PrIndex():
+    """
+
+    PRのローカルインデックス(SQLite)。
+    リポジトリ毎にPRを保持し、リポジトリ・ターゲットブランチ・ステータスでの照会をローカルで行う。
+    リポジトリ毎に最終同期日時を保持し、同期は前回同期以降に作成・完了されたPRの差分のみとする。
+
+    """
+
+    def __init__(self, file_path :str):
+        """
+
+        Args:
+            file_path (str): インデックスファイル(SQLite)のパス
+
+        """
+        self.file_path = file_path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(file_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS pull_requests ('
+            ' repo_id TEXT NOT NULL,'
+            ' repo_name TEXT,'
+            ' pr_id INTEGER NOT NULL,'
+            ' status TEXT NOT NULL,'
+            ' source_branch TEXT NOT NULL,'
+            ' target_branch TEXT NOT NULL,'
+            ' last_merge_commit TEXT,'
+            ' PRIMARY KEY (repo_id, pr_id))'
+            )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS pull_requests_repo_target_status'
+            ' ON pull_requests (repo_id, target_branch, status)'
+            )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS sync_state ('
+            ' repo_id TEXT NOT NULL PRIMARY KEY,'
+            ' synced_at REAL NOT NULL,'
+            ' full_synced_at REAL NOT NULL)'
+            )
+        self._migrate()
+
+    def _migrate(self):
+        # 最終マージコミットの列がない旧形式のファイルは列を追加し、次回の同期を全件同期として値を取得する
+        column_list = [row[1] for row in self._conn.execute('PRAGMA table_info(pull_requests)').fetchall()]
+        if 'last_merge_commit' not in column_list:
+            logger.info("pr index migrated. file=(%s)", self.file_path)
+            self._conn.execute('ALTER TABLE pull_requests ADD COLUMN last_merge_commit TEXT')
+            self._conn.execute('DELETE FROM sync_state')
+
+    def get_sync_state(self, repo_id :str) -> tuple:
+        """
+
+        リポジトリの同期日時を取得する。
+
+        Args:
+            repo_id (str): レポジトリのID
+
+        Returns:
+            tuple: (最終同期日時(epoch秒), 最終全件同期日時(epoch秒))。未同期の場合はNone。
+
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT synced_at, full_synced_at FROM sync_state WHERE repo_id = ?',
+                (repo_id,)
+                ).fetchone()
+        if row == None:
+            return None
+        return (row[0], row[1])
+
+    def put(self, repo_id :str, pr_list :list, synced_at :float, is_full :bool):
+        """
+
+        PRを保存し、リポジトリの同期日時を更新する。
+        全件同期の場合は、リポジトリの既存のPRを置き換える。
+
+        Args:
+            repo_id (str): レポジトリのID
+            pr_list (list): PRのリスト(PullRequest)
+            synced_at (float): 同期日時(epoch秒)
+            is_full (bool): 全件同期か
+
+        """
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                if is_full:
+                    self._conn.execute('DELETE FROM pull_requests WHERE repo_id = ?', (repo_id,))
+                    full_synced_at = synced_at
+                else:
+                    row = self._conn.execute(
+                        'SELECT full_synced_at FROM sync_state WHERE repo_id = ?',
+                        (repo_id,)
+                        ).fetchone()
+                    full_synced_at = row[0] if row != None else synced_at
+
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO pull_requests (repo_id, repo_name, pr_id, status, source_branch, target_branch, last_merge_commit)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(repo_id, pr.repo_name, pr.pr_id, pr.status, pr.source_branch, pr.target_branch, pr.last_merge_commit) for pr in pr_list]
+                    )
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO sync_state (repo_id, synced_at, full_synced_at) VALUES (?, ?, ?)',
+                    (repo_id, synced_at, full_synced_at)
+                    )
+                self._conn.execute('COMMIT')
+            except Exception as e:
+                self._conn.execute('ROLLBACK')
+                raise e
+
+        logger.debug("pr index synced. repo_id=(%s), count=(%s), full=(%s)", repo_id, len(pr_list), is_full)
+
+    def find(self, repo_id :str, target_branch :str, status :str) -> list:
+        """
+
+        PRを照会する。
+
+        Args:
+            repo_id (str): レポジトリのID
+            target_branch (str): ターゲットブランチ名
+            status (str): GITステータス。allの場合は全ステータス。
+
+        Returns:
+            list: PRのリスト(PullRequest)。PRIDの降順。
+
+        """
+        sql = (
+            'SELECT repo_id, repo_name, pr_id, status, source_branch, target_branch, last_merge_commit FROM pull_requests'
+            ' WHERE repo_id = ? AND target_branch = ?'
+            )
+        params = [repo_id, target_branch]
+        if status != 'all':
+            sql += ' AND status = ?'
+            params.append(status)
+        sql += ' ORDER BY pr_id DESC'
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        pr_list = []
+        for row in rows:
+            pr_list.append(PullRequest(
+                repo_id=row[0],
+                repo_name=row[1],
+                pr_id=row[2],
+                status=row[3],
+                source_branch=row[4],
+                target_branch=row[5],
+                last_merge_commit=row[6]
+            ))
+        return pr_list
+
+    def clear(self, repo_id :str=None):
+        with self._lock:
+            if repo_id == None:
+                self._conn.execute('DELETE FROM pull_requests')
+                self._conn.execute('DELETE FROM sync_state')
+            else:
+                self._conn.execute('DELETE FROM pull_requests WHERE repo_id = ?', (repo_id,))
+                self._conn.execute('DELETE FROM sync_state WHERE repo_id = ?', (repo_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# 同じキャッシュファイルを参照する複数のキャッシュ(コンテキスト)の書き込みを直列化する
+_file_lock = threading.Lock()
+
+
+class RepoCache():
+    """
+
+    リポジトリID-リポジトリ名の双方向キャッシュ。
+    プロジェクトの全リポジトリ一覧を1回の取得で読み込み、ローカルファイルへ保持する。
+    保持秒数を超過した場合、または未知のリポジトリを参照した場合は一覧を再取得する。
+    ただし、未知のリポジトリによる再取得は再取得間隔秒数に1回までとする。
+    キャッシュファイルはスコープ(組織・プロジェクト)毎に区別して保持するため、複数のスコープで同じファイルを共有できる。
+
+    """
+
+    def __init__(self, loader, file_path :str=None, ttl :float=86400, refresh_interval :float=60, scope :str=''):
+        """
+
+        Args:
+            loader: リポジトリID-リポジトリ名辞書を取得する関数
+            file_path (str): キャッシュファイルのパス。Noneの場合はファイルに保持しない。
+            ttl (float): 保持秒数
+            refresh_interval (float): 未知のリポジトリによる再取得間隔秒数
+            scope (str): スコープ(キャッシュファイル内のキー。組織・プロジェクトを識別する文字列)
+
+        """
+        self.loader = loader
+        self.file_path = file_path
+        self.scope = scope
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._fetched_at = None
+        self._id_name_dict = {}
+        self._name_id_dict = {}
+
+        self._load_file()
+
+    def get_name(self, repo_id :str) -> str:
+        """
+
+        リポジトリ名を取得する。
+
+        Args:
+            repo_id (str): レポジトリのID
+
+        Returns:
+            str: レポジトリ名。存在しない場合はNone。
+
+        """
+        return self._get(lambda: self._id_name_dict.get(repo_id))
+
+    def get_id(self, repo_name :str) -> str:
+        """
+
+        リポジトリIDを取得する。
+        リポジトリ名は大文字小文字を区別しない。リポジトリIDを指定した場合はそのまま返却する。
+
+        Args:
+            repo_name (str): レポジトリ名
+
+        Returns:
+            str: レポジトリID。存在しない場合はNone。
+
+        """
+        def find():
+            repo_id = self._name_id_dict.get(repo_name.lower())
+            if repo_id == None and repo_name in self._id_name_dict:
+                repo_id = repo_name
+            return repo_id
+
+        return self._get(find)
+
+    def find_name(self, repo_id :str) -> str:
+        """
+
+        一覧を再取得せずに、保持しているリポジトリ名を取得する。
+
+        Returns:
+            str: レポジトリ名。保持していない、または保持秒数を超過した場合はNone。
+
+        """
+        with self._lock:
+            if self._is_expired():
+                return None
+            return self._id_name_dict.get(repo_id)
+
+    def update(self, id_name_dict :dict):
+        """
+
+        リポジトリID-リポジトリ名辞書でキャッシュを置き換え、ファイルへ保存する。
+
+        Args:
+            id_name_dict (dict): リポジトリID-リポジトリ名辞書(key:repo_id(str), value:repo_name(str))
+
+        """
+        with self._lock:
+            self._set(id_name_dict, time.time())
+            self._save_file()
+
+    def clear(self):
+        # 他のスコープのキャッシュは残す
+        with self._lock:
+            self._set({}, None)
+            self._save_file()
+
+    def _get(self, find):
+        with self._lock:
+            if not self._is_expired():
+                value = find()
+                if value != None:
+                    return value
+                if time.time() - self._fetched_at < self.refresh_interval:
+                    return None
+
+            # 保持秒数超過、または未知のリポジトリの場合は一覧を再取得する
+            self._set(self.loader(), time.time())
+            self._save_file()
+
+            return find()
+
+    def _is_expired(self) -> bool:
+        return self._fetched_at == None or time.time() - self._fetched_at >= self.ttl
+
+    def _set(self, id_name_dict :dict, fetched_at :float):
+        self._id_name_dict = dict(id_name_dict)
+        self._name_id_dict = {}
+        for repo_id, repo_name in self._id_name_dict.items():
+            self._name_id_dict[repo_name.lower()] = repo_id
+        self._fetched_at = fetched_at
+
+    def _load_file(self):
+        if self.file_path == None:
+            return
+
+        with _file_lock:
+            scope_data = self._read_file().get(self.scope)
+        if scope_data != None:
+            self._set(scope_data['repos'], scope_data['fetched_at'])
+
+    def _read_file(self) -> dict:
+        # スコープ-キャッシュデータ辞書(key:スコープ, value:{'fetched_at', 'repos'})
+        if not os.path.exists(self.file_path):
+            return {}
+
+        try:
+            with open(self.file_path, 'r') as cache_file:
+                cache_data = json.load(cache_file)
+            # 形式の異なるデータ(スコープ毎に区別しない旧形式等)は無視する
+            return {
+                scope: scope_data
+                for scope, scope_data in cache_data.items()
+                if isinstance(scope_data, dict) and isinstance(scope_data.get('repos'), dict) and 'fetched_at' in scope_data
+            }
+        except (OSError, ValueError, AttributeError) as e:
+            # 破損したキャッシュファイルは無視し、次回参照時に再取得する
+            logger.warning("repo cache ignored. file=(%s), error=(%s)", self.file_path, e)
+            return {}
+
+    def _save_file(self):
+        if self.file_path == None:
+            return
+
+        # 他のスコープのキャッシュを保持するため、ファイルを読み込んだ上で自スコープのみを更新する
+        with _file_lock:
+            cache_data = self._read_file()
+            if self._fetched_at == None:
+                cache_data.pop(self.scope, None)
+            else:
+                cache_data[self.scope] = {
+                    'fetched_at': self._fetched_at,
+                    'repos': self._id_name_dict
+                }
+
+            if len(cache_data) == 0:
+                if os.path.exists(self.file_path):
+                    os.remove(self.file_path)
+                return
+
+            tmp_file_path = self.file_path + '.tmp'
+            with open(tmp_file_path, 'w') as cache_file:
+                json.dump(cache_data, cache_file)
+            os.replace(tmp_file_path, self.file_path)
@@ -0,0 +1,212 @@
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from requests import RequestException
+import context
+import excel
+import git_repo
+import work_item
+from work_item_models import WorkItemPatch
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+class BranchLinkResult():
+    work_item_id=None
+    added_list=None
+    skipped_list=None
+    error=None
+
+    def __init__(self, work_item_id:int, added_list:list, skipped_list:list, error:str=None):
+        self.work_item_id = work_item_id
+        self.added_list = added_list
+        self.skipped_list = skipped_list
+        self.error = error
+
+    def to_dict(self) -> dict:
+        return {
+            'work_item_id': self.work_item_id,
+            'added': [_to_link_dict(link) for link in self.added_list],
+            'skipped': [_to_link_dict(link) for link in self.skipped_list],
+            'error': self.error
+        }
+
+
+def _to_link_dict(link :tuple) -> dict:
+    return {
+        'repo_id': link[0],
+        'branch_name': link[1]
+    }
+
+
+def read_link_list(file_path :str, branch_name :str=None, sheet_name :str='Sheet1', max_workers :int=None) -> list:
+    """
+
+    リポジトリID-PRIDの一覧ファイル(Excel/CSV)より、リンクする(リポジトリID, ブランチ名)のリストを作成する。
+    ブランチ名を指定した場合は一覧のリポジトリ毎にそのブランチとし、未指定の場合は一覧のPRのソースブランチとする。
+    重複する(リポジトリID, ブランチ名)は先に出現したもののみとする(リポジトリIDは大文字・小文字を区別しない)。
+
+    Args:
+        file_path (str): ファイルのパス。拡張子が.csvの場合はCSVとして読み込む。
+        branch_name (str): ブランチ名。Noneの場合はPRのソースブランチ。
+        sheet_name (str): シート名(Excelの場合)
+        max_workers (int): PRの取得の最大並列数。Noneの場合は設定値を使用する。
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    Returns:
+        list: (リポジトリID(str), ブランチ名(str))のリスト
+
+    """
+    repo_dict = excel.get_repo_dict(file_path, sheet_name)
+
+    if branch_name != None:
+        link_list = [(repo_id, branch_name) for repo_id in repo_dict.keys()]
+    else:
+        repo_pr_id_list = []
+        for repo_id, pr_id_list in repo_dict.items():
+            for pr_id in pr_id_list:
+                if pr_id == None:
+                    logger.warning("pull request id is empty. repo_id=(%s)", repo_id)
+                    continue
+                repo_pr_id_list.append((repo_id, pr_id))
+
+        if max_workers == None:
+            max_workers = context.get_context().max_workers
+
+        # ワーカースレッドへ現在のコンテキストを引き継ぐ
+        with ThreadPoolExecutor(max_workers=max_workers, initializer=context.set_context, initargs=(context.get_context(),)) as executor:
+            pr_list = list(executor.map(
+                lambda repo_pr_id: git_repo.get_pr(repo_pr_id[0], repo_pr_id[1]),
+                repo_pr_id_list
+                ))
+        link_list = [(repo_id, pr.source_branch) for (repo_id, pr_id), pr in zip(repo_pr_id_list, pr_list)]
+
+    link_dict = {}
+    for repo_id, link_branch_name in link_list:
+        link_dict.setdefault((repo_id.lower(), link_branch_name), (repo_id, link_branch_name))
+    return list(link_dict.values())
+
+
+def _get_branch_link_set(work_item_id :int) -> set:
+    # 他の処理で更新されている可能性があるため、キャッシュを使用せずに取得する
+    work_item.clear_cache(work_item_id)
+    return work_item.get_branch_link_set(work_item_id)
+
+
+def link_branch_list(work_item_id_list :list, link_list :list, max_workers :int=None, dry_run :bool=False) -> list:
+    """
+
+    WorkItemのIDのリストについて、リポジトリリンク（ブランチリンク）を冪等に追加する。
+    WorkItem毎に既存のリンクを1回だけ取得し、未設定のリンクのみをWorkItem毎に1回のリクエストで並列に追加する。
+    設定済みのリンクはスキップする。失敗したWorkItemがあっても他のWorkItemの処理は継続する。
+
+    Args:
+        work_item_id_list (list): WorkItemのIDのリスト
+        link_list (list): (リポジトリID, ブランチ名)のリスト
+        max_workers (int): 最大並列数。Noneの場合は設定値を使用する。
+        dry_run (bool): Trueの場合は追加せず、追加するリンクの判定のみを行う。
+
+    Returns:
+        list: 結果(BranchLinkResult)のリスト(引数と同じ順序)
+
+    """
+    ctx = context.get_context()
+    if max_workers == None:
+        max_workers = ctx.max_workers
+
+    # ワーカースレッドへ現在のコンテキストを引き継ぐ
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=context.set_context, initargs=(ctx,)) as executor:
+        future_list = [executor.submit(_get_branch_link_set, work_item_id) for work_item_id in work_item_id_list]
+
+    result_list = []
+    patch_list = []
+    for work_item_id, future in zip(work_item_id_list, future_list):
+        try:
+            branch_link_set = future.result()
+        except RequestException as e:
+            logger.error("get work item failed. work_item_id=(%s), error=(%s)", work_item_id, e)
+            result_list.append(BranchLinkResult(work_item_id, [], [], str(e)))
+            continue
+
+        added_list = []
+        skipped_list = []
+        patch = WorkItemPatch(work_item_id)
+        for repo_id, branch_name in link_list:
+            if (repo_id.lower(), branch_name) in branch_link_set:
+                skipped_list.append((repo_id, branch_name))
+                continue
+            # 同じリンクを重複して追加しない
+            branch_link_set.add((repo_id.lower(), branch_name))
+            added_list.append((repo_id, branch_name))
+            work_item.add_branch_link(patch, repo_id, git_repo.get_repo_name(repo_id), branch_name)
+
+        result_list.append(BranchLinkResult(work_item_id, added_list, skipped_list))
+        patch_list.append(patch)
+
+    if dry_run:
+        return result_list
+
+    # 追加の結果(WorkItemの初出の順序)を反映する。失敗したWorkItemは追加なしとする
+    patch_result_dict = {
+        patch_result['work_item_id']: patch_result
+        for patch_result in work_item.apply_patch_list(patch_list, max_workers)
+    }
+    for result in result_list:
+        patch_result = patch_result_dict.get(result.work_item_id)
+        if patch_result != None and patch_result['error'] != None:
+            result.error = patch_result['error']
+            result.added_list = []
+
+    return result_list
+
+
+def summarize(result_list :list) -> dict:
+    """
+
+    リンクの追加結果を集計する。
+
+    Args:
+        result_list (list): 結果(BranchLinkResult)のリスト
+
+    Returns:
+        dict: 集計結果(key:added(追加したリンク数), skipped(スキップしたリンク数), failed(失敗したWorkItem数), work_items(WorkItem毎の結果))
+
+    """
+    return {
+        'added': sum(len(result.added_list) for result in result_list),
+        'skipped': sum(len(result.skipped_list) for result in result_list),
+        'failed': sum(1 for result in result_list if result.error != None),
+        'work_items': [result.to_dict() for result in result_list]
+    }
+
+
+def main(argv :list=None) -> int:
+    parser = argparse.ArgumentParser(description='リポジトリID-PRIDの一覧ファイルよりWorkItemへリポジトリリンク（ブランチリンク）を冪等に追加する')
+    parser.add_argument('input', help='リポジトリID-PRIDの一覧ファイル(Excel/CSV)')
+    parser.add_argument('--work-item', type=int, action='append', required=True, help='リンクを追加するWorkItemのID(複数指定可)')
+    parser.add_argument('--branch', help='ブランチ名。未指定の場合は一覧のPRのソースブランチ')
+    parser.add_argument('--sheet', default='Sheet1', help='シート名(Excelの場合)')
+    parser.add_argument('--max-workers', type=int, help='最大並列数。未指定の場合は設定値(max_workers)')
+    parser.add_argument('--dry-run', action='store_true', help='追加せず、追加するリンクの判定結果のみを出力する')
+    args = parser.parse_args(argv)
+
+    ctx = context.get_context()
+    try:
+        link_list = read_link_list(args.input, args.branch, args.sheet, args.max_workers)
+        result_list = link_branch_list(list(dict.fromkeys(args.work_item)), link_list, args.max_workers, args.dry_run)
+        summary = summarize(result_list)
+        ctx.export_metrics()
+    finally:
+        ctx.close()
+
+    logger.info("branch links. added=(%s), skipped=(%s), failed=(%s)", summary['added'], summary['skipped'], summary['failed'])
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
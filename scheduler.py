@@ -0,0 +1,231 @@
+import asyncio
+import collections
+import email.utils
+import random
+import threading
+import time
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# スロットリング(流量制限)を示すHTTPステータス
+throttled_status_list=[429, 503]
+# 冪等なリクエストで再試行するHTTPステータス
+retry_status_list=[429, 500, 502, 503, 504]
+
+
+class RequestScheduler():
+    """
+
+    AzureDevOpsのスロットリングに追従するリクエストスケジューラ。
+    同時実行数のウィンドウをAIMD方式(成功時は加算的に増加、スロットリング・通信エラー時は乗算的に減少)で調整し、
+    Retry-After/X-RateLimit-*ヘッダーに従ってリクエストの送信を待機させる。
+
+    """
+
+    def __init__(self, max_window :int=10, min_window :int=1, backoff_base :float=0.5, backoff_max :float=60, throughput_span :float=60):
+        """
+
+        Args:
+            max_window (int): 同時実行数の上限
+            min_window (int): 同時実行数の下限
+            backoff_base (float): 再試行待機秒数の基準値
+            backoff_max (float): 再試行待機秒数の上限
+            throughput_span (float): スループットを算出する期間(秒)
+
+        """
+        self.max_window = max_window
+        self.min_window = min_window
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.throughput_span = throughput_span
+
+        self._cond = threading.Condition()
+        self._window = float(max_window)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._completed_at_deque = collections.deque()
+        self._request_count = 0
+        self._throttled_count = 0
+        self._retry_count = 0
+
+    def acquire(self):
+        """
+
+        リクエストの送信枠を取得する。送信可能になるまで待機する。
+
+        """
+        with self._cond:
+            while True:
+                wait_sec = self._get_wait_sec()
+                if wait_sec == 0:
+                    self._in_flight += 1
+                    return
+                self._cond.wait(wait_sec)
+
+    async def acquire_async(self):
+        """
+
+        リクエストの送信枠を非同期に取得する。送信可能になるまでイベントループを止めずに待機する。
+
+        """
+        while True:
+            with self._cond:
+                wait_sec = self._get_wait_sec()
+                if wait_sec == 0:
+                    self._in_flight += 1
+                    return
+            await asyncio.sleep(wait_sec)
+
+    def release(self, status :int=None, headers=None, is_connection_error :bool=False):
+        """
+
+        リクエストの送信枠を返却し、レスポンスよりウィンドウを調整する。
+        ウィンドウはスロットリング・通信エラーの場合のみ減少させ、その他の例外(status、headersがNone)の場合は調整しない。
+
+        Args:
+            status (int): HTTPステータス。レスポンスを受信できなかった場合はNone。
+            headers: レスポンスヘッダー
+            is_connection_error (bool): 通信エラー(接続失敗・タイムアウト)の場合はTrue
+
+        """
+        with self._cond:
+            self._in_flight -= 1
+            self._request_count += 1
+
+            now = time.monotonic()
+            self._completed_at_deque.append(now)
+            self._trim_completed(now)
+
+            retry_after = None
+            if headers != None:
+                retry_after = parse_retry_after(headers.get('Retry-After'))
+                # X-RateLimit-Delayは流量制限により遅延させられた秒数
+                rate_limit_delay = _to_float(headers.get('X-RateLimit-Delay'))
+                rate_limit_remaining = _to_float(headers.get('X-RateLimit-Remaining'))
+            else:
+                rate_limit_delay = None
+                rate_limit_remaining = None
+
+            if is_connection_error or status in throttled_status_list or (rate_limit_remaining != None and rate_limit_remaining <= 0):
+                # 乗算的減少
+                self._throttled_count += 1
+                self._window = max(float(self.min_window), self._window / 2)
+                logger.warning("request throttled. status=(%s), window=(%s), retry_after=(%s)", status, self._window, retry_after)
+            elif rate_limit_delay != None and rate_limit_delay > 0:
+                # 遅延が発生している場合は増加させない
+                pass
+            elif status != None and status < 400:
+                # 加算的増加
+                self._window = min(float(self.max_window), self._window + 1 / self._window)
+
+            if retry_after != None:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+            self._cond.notify_all()
+
+    def get_retry_delay(self, attempt :int, headers=None) -> float:
+        """
+
+        再試行までの待機秒数を取得する。
+        Retry-Afterが指定された場合はその秒数、それ以外はジッター付きの指数バックオフとする。
+
+        Args:
+            attempt (int): 再試行回数(0始まり)
+            headers: レスポンスヘッダー
+
+        Returns:
+            float: 待機秒数
+
+        """
+        with self._cond:
+            self._retry_count += 1
+
+        if headers != None:
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+            if retry_after != None:
+                return min(retry_after, self.backoff_max)
+
+        # フルジッター
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get_throughput(self) -> float:
+        """
+
+        直近のスループット(完了リクエスト数/秒)を取得する。
+
+        Returns:
+            float: スループット
+
+        """
+        with self._cond:
+            self._trim_completed(time.monotonic())
+            return len(self._completed_at_deque) / self.throughput_span
+
+    def get_stats(self) -> dict:
+        """
+
+        スケジューラの状態を取得する。
+
+        Returns:
+            dict: ウィンドウ、実行中件数、スループット、リクエスト件数、スロットリング件数、再試行件数
+
+        """
+        throughput = self.get_throughput()
+        with self._cond:
+            return {
+                'window': self._window,
+                'in_flight': self._in_flight,
+                'throughput': throughput,
+                'request_count': self._request_count,
+                'throttled_count': self._throttled_count,
+                'retry_count': self._retry_count
+            }
+
+    def _get_wait_sec(self) -> float:
+        wait_sec = self._paused_until - time.monotonic()
+        if wait_sec > 0:
+            return wait_sec
+        if self._in_flight < int(self._window):
+            return 0
+        # 送信枠が返却されるまで待機する(非同期版はポーリング間隔)
+        return 0.05
+
+    def _trim_completed(self, now :float):
+        while len(self._completed_at_deque) != 0 and now - self._completed_at_deque[0] > self.throughput_span:
+            self._completed_at_deque.popleft()
+
+
+def parse_retry_after(value :str) -> float:
+    """
+
+    Retry-Afterヘッダーの値(秒数またはHTTP日付)を秒数に変換する。
+
+    Args:
+        value (str): Retry-Afterヘッダーの値
+
+    Returns:
+        float: 秒数。未指定または不正な場合はNone。
+
+    """
+    if value == None:
+        return None
+
+    seconds = _to_float(value)
+    if seconds != None:
+        return max(0.0, seconds)
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def _to_float(value) -> float:
+    if value == None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
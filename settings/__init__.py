@@ -1,29 +1,41 @@
 
 import json
+import threading
 from logging import config
 
 
 class AppSettingsUtil():
 
-    def __init__(self):
-        setting_file=open('settings_app.json', 'r')
-        self.settings_data = json.load(setting_file)
+    def __init__(self, file_path='settings_app.json'):
+        with open(file_path, 'r') as setting_file:
+            self.settings_data = json.load(setting_file)
 
 
 class LoggerSettingsUtil():
 
-    def __init__(self):
-        setting_file=open('settings_logger.json', 'r')
-        self.settings_data = json.load(setting_file)
+    def __init__(self, file_path='settings_logger.json'):
+        with open(file_path, 'r') as setting_file:
+            self.settings_data = json.load(setting_file)
         config.dictConfig(self.settings_data)
 
-_settings_app_util = AppSettingsUtil()
+# 設定ファイルは初回参照時に読み込む
+_settings_app_util = None
 
-_settings_logger_util = LoggerSettingsUtil()
+_settings_logger_util = None
+
+_lock = threading.Lock()
 
 
 def get_settings_app_data():
+    global _settings_app_util
+    with _lock:
+        if _settings_app_util == None:
+            _settings_app_util = AppSettingsUtil()
     return _settings_app_util.settings_data
 
 def get_settings_logger_data():
-    return _settings_logger_util.settings_data
\ No newline at end of file
+    global _settings_logger_util
+    with _lock:
+        if _settings_logger_util == None:
+            _settings_logger_util = LoggerSettingsUtil()
+    return _settings_logger_util.settings_data
@@ -0,0 +1,50 @@
+import threading
+import context
+import mock_server
+
+
+class MockServerThread():
+    """
+
+    テスト用にモックサーバーを同一プロセスのスレッドで起動する。
+
+    """
+
+    def __init__(self, data :mock_server.MockData=None, max_page_size :int=1000):
+        if data == None:
+            data = mock_server.MockData()
+        self.server = mock_server.MockServer(data, max_page_size=max_page_size)
+        self.url_core = self.server.get_url_core()
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def get_count(self, endpoint :str=None) -> int:
+        stats = self.server.get_stats()
+        if endpoint != None:
+            return stats.get(endpoint, {}).get('count', 0)
+        return sum(endpoint_stats['count'] for endpoint_stats in stats.values())
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def create_context(url_core :str, **ads_dict) -> context.Context:
+    """
+
+    モックサーバーへ接続するコンテキストを作成する。キャッシュ類は指定しない限り無効とする。
+
+    """
+    ads = {
+        'url_core': url_core,
+        'organization': 'organization',
+        'project': 'project',
+        'id': 'user',
+        'pw': 'password',
+        'api_version': '7.1',
+        'http_cache_max_entries': 0,
+        'repo_cache_path': None,
+        'change_cache_path': None
+    }
+    ads.update(ads_dict)
+    return context.Context({'ads': ads})
@@ -0,0 +1,80 @@
+import asyncio
+import gc
+import unittest
+import warnings
+import context
+import git_repo
+import mock_server
+import support
+
+
+class AsyncSessionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=2))
+        cls.repo_id = list(cls.mock.server.data.repo_dict.keys())[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def test_session_closed_per_loop(self):
+        ctx = support.create_context(self.mock.url_core)
+
+        with warnings.catch_warnings(record=True) as warning_list:
+            warnings.simplefilter('always')
+            with context.use(ctx):
+                # close()を呼び出さずにイベントループを複数回終了する
+                pr_list = [asyncio.run(git_repo.get_pr_async(self.repo_id, pr_id)) for pr_id in [1, 2]]
+            ctx.close()
+            gc.collect()
+
+        unclosed_list = [str(w.message) for w in warning_list if issubclass(w.category, ResourceWarning)]
+        self.assertEqual(unclosed_list, [])
+        self.assertEqual([pr.pr_id for pr in pr_list], [1, 2])
+
+    def test_close(self):
+        ctx = support.create_context(self.mock.url_core)
+
+        async def run():
+            pr = await git_repo.get_pr_async(self.repo_id, 1)
+            await ctx.aclient.close()
+            # 閉じた後も同じイベントループで再度生成する
+            try:
+                return pr, await git_repo.get_pr_async(self.repo_id, 2, 'master')
+            finally:
+                await ctx.aclient.close()
+
+        with context.use(ctx):
+            pr, other_pr = asyncio.run(run())
+        ctx.close()
+
+        self.assertEqual(pr.pr_id, 1)
+        self.assertEqual(other_pr.pr_id, 2)
+
+    def test_get_pr_async_target_branch(self):
+        ctx = support.create_context(self.mock.url_core)
+
+        async def run():
+            return [
+                await git_repo.get_pr_async(self.repo_id, 1),
+                await git_repo.get_pr_async(self.repo_id, 1, 'master'),
+                await git_repo.get_pr_async(self.repo_id, 1, 'develop')
+            ]
+
+        with context.use(ctx):
+            pr_list = asyncio.run(run())
+            sync_pr_list = [
+                git_repo.get_pr(self.repo_id, 1),
+                git_repo.get_pr(self.repo_id, 1, 'master'),
+                git_repo.get_pr(self.repo_id, 1, 'develop')
+            ]
+        ctx.close()
+
+        self.assertEqual([pr != None for pr in pr_list], [True, True, False])
+        self.assertEqual([pr != None for pr in pr_list], [pr != None for pr in sync_pr_list])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import context
+import mock_server
+import support
+import work_item
+
+
+class AttachmentTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        data = mock_server.MockData(repos=1, prs=1)
+        cls.content = bytes(range(256)) * 40
+        data.attachment_dict['file1'] = cls.content
+        cls.mock = support.MockServerThread(data)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.ctx = support.create_context(self.mock.url_core, attachment_dir=self.temp_dir.name)
+        self.part_file_path = os.path.join(self.temp_dir.name, 'file1.xlsx.part')
+        self.mock.server.reset_stats()
+
+    def tearDown(self):
+        self.ctx.close()
+        self.temp_dir.cleanup()
+
+    def _get_attachment(self) -> bytes:
+        with context.use(self.ctx):
+            file_path = work_item.get_attachement('file1')
+        with open(file_path, 'rb') as saved_file:
+            return saved_file.read()
+
+    def _write_part(self, content :bytes):
+        with open(self.part_file_path, 'wb') as part_file:
+            part_file.write(content)
+
+    def _get_status_dict(self) -> dict:
+        return self.mock.server.get_stats()['attachments']['status']
+
+    def test_download(self):
+        self.assertEqual(self._get_attachment(), self.content)
+        self.assertEqual(self._get_status_dict(), {'200': 1})
+
+        # 保存済みの場合は取得しない
+        self.assertEqual(self._get_attachment(), self.content)
+        self.assertEqual(self.mock.get_count('attachments'), 1)
+
+    def test_resume(self):
+        self._write_part(self.content[:1000])
+
+        self.assertEqual(self._get_attachment(), self.content)
+        self.assertEqual(self._get_status_dict(), {'206': 1})
+
+    def test_part_complete(self):
+        # 途中ファイルが取得済み(添付ファイルと同じサイズ)の場合は416を完了とし、再取得しない
+        self._write_part(self.content)
+
+        self.assertEqual(self._get_attachment(), self.content)
+        self.assertEqual(self._get_status_dict(), {'416': 1})
+        self.assertFalse(os.path.exists(self.part_file_path))
+
+    def test_part_oversized(self):
+        # 途中ファイルが添付ファイルより大きい場合は先頭から取得する
+        self._write_part(self.content + b'extra')
+
+        self.assertEqual(self._get_attachment(), self.content)
+        self.assertEqual(self._get_status_dict(), {'416': 1, '200': 1})
+
+    def test_concurrent_download(self):
+        # 同じ添付ファイルの並行したダウンロードは1回とし、終了後はロックを破棄する
+        with ThreadPoolExecutor(max_workers=8, initializer=context.set_context, initargs=(self.ctx,)) as executor:
+            file_path_list = list(executor.map(lambda _: work_item.get_attachement('file1'), range(8)))
+
+        self.assertEqual(len(set(file_path_list)), 1)
+        self.assertEqual(self.mock.get_count('attachments'), 1)
+        self.assertEqual(self.ctx.get_resource('attachment_lock_dict', dict), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
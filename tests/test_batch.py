@@ -0,0 +1,66 @@
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+import batch
+import context
+import mock_server
+import support
+
+
+class BatchOutputTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=2, prs=5, linked_prs=4))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.temp_dir.name, 'work_items.txt')
+        with open(self.input_path, 'w') as input_file:
+            input_file.write('1\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_stdout_is_json_lines(self):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        func_logger = logging.getLogger('func')
+        level = func_logger.level
+
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            # settings_logger.jsonのconsoleHandlerと同様に、標準出力へ出力するハンドラを設定する
+            handler = logging.StreamHandler(sys.stdout)
+            func_logger.addHandler(handler)
+            func_logger.setLevel(logging.INFO)
+            try:
+                with context.use(support.create_context(self.mock.url_core)):
+                    exit_code = batch.main([self.input_path, '--branch', 'master'])
+            finally:
+                func_logger.removeHandler(handler)
+                func_logger.setLevel(level)
+
+        line_list = stdout.getvalue().splitlines()
+        self.assertEqual(len(line_list), 1)
+        result_list = [json.loads(line) for line in line_list]
+        self.assertEqual(result_list[0]['work_item_id'], 1)
+        self.assertEqual(result_list[0]['errors'], {})
+        self.assertIn('check_merged', result_list[0])
+        self.assertIn('changed_by_pr', result_list[0])
+        self.assertEqual(exit_code, 1)
+
+        # ログは標準エラー出力へ出力する
+        self.assertNotEqual(stderr.getvalue(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
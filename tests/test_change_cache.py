@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import change_cache
+
+
+class ChangeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, 'change_cache.db')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _get_total_size(self) -> int:
+        conn = sqlite3.connect(self.file_path)
+        try:
+            return conn.execute('SELECT COALESCE(SUM(size), 0) FROM commit_changes').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_instances_share_file(self):
+        # 同じファイルを共有する2つのインスタンス(別プロセスと同様)
+        cache_a = change_cache.ChangeCache(self.file_path, max_bytes=1000)
+        cache_b = change_cache.ChangeCache(self.file_path, max_bytes=1000)
+        path_dict = {'/file%02d' % no: 'edit' for no in range(4)}
+        try:
+            for commit_no in range(20):
+                cache = cache_a if commit_no % 2 == 0 else cache_b
+                cache.put('repo', 'commit%02d' % commit_no, path_dict)
+                # 他のインスタンスの保存分を含めて上限を超過しない
+                self.assertLessEqual(self._get_total_size(), 1000)
+
+            # 参照日時の古いものから削除する
+            self.assertEqual(cache_b.get('repo', 'commit00'), None)
+            self.assertEqual(cache_b.get('repo', 'commit18'), path_dict)
+            self.assertEqual(cache_a.get('repo', 'commit19'), path_dict)
+        finally:
+            cache_a.close()
+            cache_b.close()
+
+    def test_evict_batches(self):
+        # 1回の読み込み件数を超えるエントリを削除する
+        cache = change_cache.ChangeCache(self.file_path, max_bytes=10000)
+        try:
+            for commit_no in range(change_cache.evict_batch_size * 3):
+                cache.put('repo', 'commit%03d' % commit_no, {})
+            cache.max_bytes = 100
+            cache.put('repo', 'last', {'/file': 'add'})
+
+            self.assertLessEqual(self._get_total_size(), 90)
+            self.assertEqual(cache.get('repo', 'last'), {'/file': 'add'})
+        finally:
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
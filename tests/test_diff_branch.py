@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+import context
+import git_repo
+import mock_server
+import support
+
+
+class DiffBranchPagingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # サーバーの1ページの最大件数(1000件)を超える変更を持つブランチ差分
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=1, diff_changes=2500), max_page_size=1000)
+        cls.repo_id = list(cls.mock.server.data.repo_dict.keys())[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def test_default_page_size(self):
+        ctx = support.create_context(self.mock.url_core)
+        self.mock.server.reset_stats()
+
+        with context.use(ctx):
+            path_dict = git_repo.get_pr_path_dict_by_diff_branch(self.repo_id, 'feature/1', 'master')
+        ctx.close()
+
+        self.assertEqual(len(path_dict), 2500)
+        # allChangesIncludedで終了し、空のページは要求しない
+        self.assertEqual(self.mock.get_count('diffs'), 3)
+
+    def test_page_size_over_server_cap(self):
+        # サーバーの最大件数を実際より大きく設定した場合も、件数で判定しないため切り詰められない
+        ctx = support.create_context(self.mock.url_core, page_size={'diffs': 5000}, max_page_size=5000)
+
+        with context.use(ctx):
+            path_dict = git_repo.get_pr_path_dict_by_diff_branch(self.repo_id, 'feature/1', 'master')
+        ctx.close()
+
+        self.assertEqual(len(path_dict), 2500)
+
+    def test_page_size_over_server_cap_async(self):
+        ctx = support.create_context(self.mock.url_core, page_size={'diffs': 5000}, max_page_size=5000)
+        self.mock.server.reset_stats()
+
+        async def run():
+            try:
+                return await git_repo.get_pr_path_dict_by_diff_branch_async(self.repo_id, 'feature/1', 'master')
+            finally:
+                await ctx.aclient.close()
+
+        with context.use(ctx):
+            path_dict = asyncio.run(run())
+        ctx.close()
+
+        self.assertEqual(len(path_dict), 2500)
+        self.assertEqual(self.mock.get_count('diffs'), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
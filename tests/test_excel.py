@@ -0,0 +1,70 @@
+import itertools
+import os
+import tempfile
+import unittest
+import excel
+
+
+class ExcelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_csv(self, line_list :list) -> str:
+        file_path = os.path.join(self.temp_dir.name, 'repo.csv')
+        with open(file_path, 'w', encoding='utf-8-sig', newline='') as csv_file:
+            csv_file.write('\r\n'.join(line_list) + '\r\n')
+        return file_path
+
+    def _write_xlsx(self, sheet_row_list_dict :dict) -> str:
+        import openpyxl
+
+        file_path = os.path.join(self.temp_dir.name, 'repo.xlsx')
+        wb = openpyxl.Workbook(write_only=True)
+        for sheet_name, row_list in sheet_row_list_dict.items():
+            ws = wb.create_sheet(sheet_name)
+            ws.append(['repository_id', 'pull_request_id'])
+            for row in row_list:
+                ws.append(row)
+        wb.save(file_path)
+        return file_path
+
+    def test_csv(self):
+        # 1列目が空の行で終了し、PRIDは数値とする
+        file_path = self._write_csv(['repository_id,pull_request_id', 'repo-a,1', 'repo-b,2', 'repo-a,3', ',', 'repo-c,4'])
+
+        self.assertEqual(list(excel.iter_repo_pr(file_path)), [('repo-a', 1), ('repo-b', 2), ('repo-a', 3)])
+        self.assertEqual(excel.get_repo_dict(file_path), {'repo-a': [1, 3], 'repo-b': [2]})
+
+    def test_xlsx_sheet_name(self):
+        file_path = self._write_xlsx({
+            'Sheet1': [['repo-a', 1]],
+            'links': [['repo-b', 2], ['repo-b', 3], [None, None], ['repo-c', 4]]
+        })
+
+        self.assertEqual(excel.get_repo_dict(file_path), {'repo-a': [1]})
+        self.assertEqual(excel.get_repo_dict(file_path, 'links'), {'repo-b': [2, 3]})
+
+    def test_xlsx_without_row_cap(self):
+        # 旧実装の上限(10000行)を超える行を読み込む
+        row_count = 10005
+        file_path = self._write_xlsx({'Sheet1': [['repo-%d' % (row_no % 3), row_no] for row_no in range(row_count)]})
+
+        repo_dict = excel.get_repo_dict(file_path)
+        self.assertEqual(sum(len(pr_id_list) for pr_id_list in repo_dict.values()), row_count)
+        self.assertEqual(repo_dict['repo-1'][-1], 10003)
+
+    def test_streaming(self):
+        # 1行ずつ返却し、読み込みを途中で終了できる
+        file_path = self._write_xlsx({'Sheet1': [['repo-a', row_no] for row_no in range(100)]})
+
+        row_iter = excel.iter_repo_pr(file_path)
+        self.assertEqual(list(itertools.islice(row_iter, 2)), [('repo-a', 0), ('repo-a', 1)])
+        row_iter.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
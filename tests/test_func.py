@@ -0,0 +1,34 @@
+import logging
+import socket
+import unittest
+from requests.exceptions import ConnectionError
+import context
+import func
+import support
+
+
+class FuncRequestErrorTest(unittest.TestCase):
+
+    def setUp(self):
+        # 接続できないポート
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        self.ctx = support.create_context('http://127.0.0.1:%d/' % port, max_retries=0)
+
+    def tearDown(self):
+        self.ctx.close()
+
+    def test_connection_error(self):
+        # 応答のない例外(接続エラー等)はそのまま送出する
+        logging.disable(logging.CRITICAL)
+        try:
+            with context.use(self.ctx):
+                with self.assertRaises(ConnectionError):
+                    func.get_pr_dict(1, 'master')
+        finally:
+            logging.disable(logging.NOTSET)
+
+
+if __name__ == '__main__':
+    unittest.main()
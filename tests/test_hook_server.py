@@ -0,0 +1,182 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.parse
+import urllib.request
+import hook_server
+import mock_server
+import support
+
+
+def _pr_event(event_type :str, repo_id :str, pr_id :int, status :str, branch_name :str='release/1.0') -> dict:
+    # サービスフックのペイロード(リソースの詳細はAll)
+    return {
+        'eventType': event_type,
+        'resource': {
+            'repository': {'id': repo_id, 'name': 'repo0'},
+            'pullRequestId': pr_id,
+            'status': status,
+            'sourceRefName': 'refs/heads/feature/%d' % pr_id,
+            'targetRefName': 'refs/heads/' + branch_name
+        }
+    }
+
+
+class HookServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # WorkItem(ID:1)にPR5～8(PR5はactive、それ以外はcompleted)をリンクする
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=8, linked_prs=4, branch_name='release/1.0'))
+        cls.repo_id = list(cls.mock.server.data.repo_dict.keys())[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def setUp(self):
+        self.ctx = support.create_context(self.mock.url_core)
+        self.server = hook_server.HookServer(self.ctx)
+        self.url = self.server.get_url()
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.ctx.close()
+
+    def _post(self, body) -> tuple:
+        data = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+        req = urllib.request.Request(self.url + 'hooks', data=data, method='POST', headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=10) as res:
+                return res.status, json.loads(res.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def _check_merged(self, branch_name :str='release/1.0') -> dict:
+        query = urllib.parse.urlencode({'work_item_id': 1, 'branch': branch_name})
+        with urllib.request.urlopen(self.url + 'check-merged?' + query, timeout=10) as res:
+            return json.loads(res.read())
+
+    def test_cold_start_and_hook_consistent(self):
+        # 起動直後(REST APIで取得)も階層を含むブランチ名で照会できる
+        result = self._check_merged()
+        self.assertEqual(sorted(result['repos'][0]['merged']), [6, 7, 8])
+        self.assertEqual(result['repos'][0]['not_merged'], [5])
+
+        # REST APIと同じ状態のイベントでは結果は変わらない
+        status, res_data = self._post(_pr_event('git.pullrequest.updated', self.repo_id, 6, 'completed'))
+        self.assertEqual(status, 200)
+        self.assertTrue(res_data['handled'])
+        self.assertEqual(self._check_merged(), result)
+
+        status, res_data = self._post(_pr_event('git.pullrequest.merged', self.repo_id, 5, 'completed'))
+        self.assertEqual(status, 200)
+        result = self._check_merged()
+        self.assertTrue(result['is_all_merged'])
+        self.assertEqual(sorted(result['repos'][0]['merged']), [5, 6, 7, 8])
+
+    def test_pr_created_other_branch(self):
+        self._check_merged()
+        status, res_data = self._post(_pr_event('git.pullrequest.created', self.repo_id, 5, 'active', 'release/2.0'))
+        self.assertEqual(status, 200)
+
+        result = self._check_merged()
+        self.assertTrue(result['is_all_merged'])
+        self.assertEqual(sorted(result['repos'][0]['merged']), [6, 7, 8])
+
+    def test_work_item_event(self):
+        status, res_data = self._post({'eventType': 'workitem.updated', 'resource': {'id': 10, 'workItemId': 1}})
+        self.assertEqual(status, 200)
+        self.assertEqual(res_data, {'eventType': 'workitem.updated', 'handled': True})
+
+    def test_other_event(self):
+        status, res_data = self._post({'eventType': 'build.complete', 'resource': []})
+        self.assertEqual(status, 200)
+        self.assertFalse(res_data['handled'])
+
+    def test_invalid_payload(self):
+        pr_event = _pr_event('git.pullrequest.updated', self.repo_id, 5, 'completed')
+        del pr_event['resource']['repository']
+
+        for body in [
+            b'{',
+            [pr_event],
+            pr_event,
+            {'eventType': 'git.pullrequest.updated', 'resource': [1]},
+            {'eventType': 'workitem.updated', 'resource': {}},
+            {'eventType': 'workitem.updated', 'resource': {'id': 'a'}}
+        ]:
+            status, res_data = self._post(body)
+            self.assertEqual(status, 400, body)
+            self.assertIn('message', res_data)
+
+        # 不正なペイロードの後も応答する
+        self.assertEqual(self._check_merged()['repos'][0]['not_merged'], [5])
+
+
+class HookServerNotFoundTest(unittest.TestCase):
+
+    def setUp(self):
+        # WorkItem(ID:1)にリンクしたPR5～8のうち、PR8は取得できない(404)
+        data = mock_server.MockData(repos=1, prs=8, linked_prs=4, branch_name='release/1.0')
+        del data.pr_dict[8]
+        self.mock = support.MockServerThread(data)
+        self.repo_id = list(data.repo_dict.keys())[0]
+        self.ctx = support.create_context(self.mock.url_core)
+        self.server = hook_server.HookServer(self.ctx)
+        self.url = self.server.get_url()
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.ctx.close()
+        self.mock.close()
+
+    def _get(self, path :str) -> tuple:
+        query = urllib.parse.urlencode({'work_item_id': 1, 'branch': 'release/1.0'})
+        with urllib.request.urlopen(self.url + path + '?' + query, timeout=10) as res:
+            return res.status, res.headers, json.loads(res.read())
+
+    def test_check_merged(self):
+        # 取得できないPRは未検出とし、他のPRで応答する
+        status, headers, result = self._get('check-merged')
+        self.assertEqual(status, 200)
+        self.assertEqual(sorted(result['repos'][0]['merged']), [6, 7])
+        self.assertEqual(result['repos'][0]['not_merged'], [5])
+        self.assertEqual(result['not_found'], [8])
+
+        # 未検出のPRは再取得しない
+        pr_count = self.mock.get_count('pullrequests')
+        self._get('check-merged')
+        self.assertEqual(self.mock.get_count('pullrequests'), pr_count)
+
+        # PRのイベントを受信した場合は未検出を解除する
+        self.server.state.handle_event(_pr_event('git.pullrequest.created', self.repo_id, 8, 'completed'))
+        self.server.state.handle_event(_pr_event('git.pullrequest.merged', self.repo_id, 5, 'completed'))
+        status, headers, result = self._get('check-merged')
+        self.assertEqual(sorted(result['repos'][0]['merged']), [5, 6, 7, 8])
+        self.assertEqual(result['not_found'], [])
+        self.assertTrue(result['is_all_merged'])
+
+    def test_all_merged_with_not_found(self):
+        # 未検出のPRがある場合はマージ済みとしない
+        self.server.state.handle_event(_pr_event('git.pullrequest.merged', self.repo_id, 5, 'completed'))
+        status, headers, result = self._get('check-merged')
+        self.assertEqual(result['repos'][0]['not_merged'], [])
+        self.assertFalse(result['is_all_merged'])
+
+    def test_changed_files(self):
+        status, headers, result = self._get('changed-files')
+        self.assertEqual(status, 200)
+        self.assertEqual(list(result.keys()), ['repo0'])
+        self.assertEqual(headers['X-Not-Found-Pr-Ids'], '8')
+
+
+if __name__ == '__main__':
+    unittest.main()
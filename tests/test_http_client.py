@@ -0,0 +1,262 @@
+import asyncio
+import contextlib
+import json
+import threading
+import unittest
+import unittest.mock
+import requests
+from requests.adapters import HTTPAdapter
+import aio_client
+import context
+import git_repo
+import http_cache
+import http_client
+import mock_server
+import scheduler
+import support
+import work_item
+
+
+class RaisingAdapter(HTTPAdapter):
+
+    def __init__(self, error :Exception):
+        super().__init__()
+        self.error = error
+        self.count = 0
+
+    def send(self, request, **kwargs):
+        self.count += 1
+        raise self.error
+
+
+class RaisingTransport():
+
+    def __init__(self, error :Exception):
+        self.error = error
+
+    @contextlib.asynccontextmanager
+    async def request(self, session, method, url, params=None, **kwargs):
+        raise self.error
+        yield
+
+
+class ScriptedAdapter(HTTPAdapter):
+    # 指定したHTTPステータス・JSONのレスポンスを順に返却する
+
+    def __init__(self, response_list :list):
+        super().__init__()
+        self.response_list = list(response_list)
+        self.request_list = []
+
+    def send(self, request, **kwargs):
+        self.request_list.append(request)
+        status, body = self.response_list.pop(0)
+        res = requests.Response()
+        res.request = request
+        res.url = request.url
+        res.status_code = status
+        res._content = json.dumps(body).encode('utf-8') if body != None else b''
+        return res
+
+
+class ScriptedTransport():
+    # 指定したHTTPステータス・JSONのレスポンスを順に返却する(非同期)
+
+    def __init__(self, response_list :list):
+        self.response_list = list(response_list)
+        self.headers_list = []
+
+    @contextlib.asynccontextmanager
+    async def request(self, session, method, url, params=None, **kwargs):
+        import aiohttp
+        import multidict
+        import yarl
+
+        self.headers_list.append(kwargs.get('headers') or {})
+        status, body = self.response_list.pop(0)
+        res = unittest.mock.Mock()
+        res.status = status
+        res.headers = multidict.CIMultiDictProxy(multidict.CIMultiDict())
+        res.request_info = aiohttp.RequestInfo(yarl.URL(url), method, res.headers, yarl.URL(url))
+        res.history = ()
+        res.read = unittest.mock.AsyncMock(return_value=json.dumps(body).encode('utf-8') if body != None else b'')
+        res.json = unittest.mock.AsyncMock(return_value=body)
+        yield res
+
+
+class HttpClientReleaseTest(unittest.TestCase):
+
+    def create_client(self, error :Exception, pool_size :int=3) -> http_client.HttpClient:
+        return http_client.HttpClient('user', 'password', '7.1', pool_size=pool_size, max_retries=0, adapter=RaisingAdapter(error))
+
+    def request_all(self, client :http_client.HttpClient, count :int, error_type):
+        # 送信枠が漏れた場合は待機し続けるため、スレッドで実行してタイムアウトで検出する
+        error_list = []
+
+        def run():
+            for _ in range(count):
+                try:
+                    client.get('http://127.0.0.1:1/')
+                except error_type as e:
+                    error_list.append(e)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive(), 'request blocked by leaked scheduler slot')
+        self.assertEqual(len(error_list), count)
+
+    def test_release_on_other_errors(self):
+        for error in [requests.exceptions.InvalidURL('invalid'), requests.exceptions.ChunkedEncodingError('broken'), ValueError('unexpected')]:
+            with self.subTest(error=type(error).__name__):
+                client = self.create_client(error)
+                self.request_all(client, 5, type(error))
+
+                stats = client.scheduler.get_stats()
+                self.assertEqual(stats['in_flight'], 0)
+                # スロットリング・通信エラー以外ではウィンドウを減少させない
+                self.assertEqual(stats['window'], 3)
+                self.assertEqual(stats['throttled_count'], 0)
+
+    def test_connection_error_decreases_window(self):
+        client = self.create_client(requests.ConnectionError('refused'), pool_size=4)
+        self.request_all(client, 1, requests.ConnectionError)
+
+        stats = client.scheduler.get_stats()
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['window'], 2)
+
+    def test_hooks_called_on_other_errors(self):
+        call_list = []
+        client = http_client.HttpClient('user', 'password', '7.1', max_retries=0, adapter=RaisingAdapter(requests.exceptions.InvalidURL('invalid')), hooks=[lambda *args: call_list.append(args)])
+        with self.assertRaises(requests.exceptions.InvalidURL):
+            client.get('http://127.0.0.1:1/')
+        self.assertEqual(len(call_list), 1)
+        self.assertEqual(call_list[0][2], None)
+
+
+class AsyncHttpClientReleaseTest(unittest.TestCase):
+
+    def test_release_on_other_errors(self):
+        request_scheduler = scheduler.RequestScheduler(max_window=3)
+
+        async def run():
+            client = aio_client.AsyncHttpClient('user', 'password', '7.1', request_scheduler=request_scheduler, max_retries=0, transport=RaisingTransport(ValueError('unexpected')))
+            try:
+                for _ in range(5):
+                    with self.assertRaises(ValueError):
+                        await asyncio.wait_for(client.get_json('http://127.0.0.1:1/'), 10)
+            finally:
+                await client.close()
+
+        asyncio.run(run())
+
+        stats = request_scheduler.get_stats()
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['window'], 3)
+
+    def test_connection_error_decreases_window(self):
+        import aiohttp
+
+        request_scheduler = scheduler.RequestScheduler(max_window=4)
+
+        async def run():
+            client = aio_client.AsyncHttpClient('user', 'password', '7.1', request_scheduler=request_scheduler, max_retries=0, transport=RaisingTransport(aiohttp.ClientConnectionError('refused')))
+            try:
+                with self.assertRaises(aiohttp.ClientConnectionError):
+                    await client.get_json('http://127.0.0.1:1/')
+            finally:
+                await client.close()
+
+        asyncio.run(run())
+
+        stats = request_scheduler.get_stats()
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['window'], 2)
+
+
+class HttpClientPoolTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=2))
+        cls.repo_id = list(cls.mock.server.data.repo_dict.keys())[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def setUp(self):
+        self.mock.server.reset_stats()
+
+    def test_session_reused(self):
+        # WorkItem・GitRepoのリクエストは同じクライアントのKeep-Alive接続で送信する
+        ctx = support.create_context(self.mock.url_core)
+        with context.use(ctx):
+            client = context.get_client()
+            work_item.get_snapshot(1)
+            git_repo.get_repo_name(self.repo_id)
+            git_repo.get_pr(self.repo_id, 1)
+            git_repo.get_pr(self.repo_id, 2)
+            self.assertIs(context.get_client(), client)
+        ctx.close()
+
+        self.assertEqual(self.mock.get_count(), 4)
+        self.assertEqual(self.mock.server.get_connection_count(), 1)
+
+
+class HttpCacheRevalidateTest(unittest.TestCase):
+
+    def test_revalidate(self):
+        mock = support.MockServerThread(mock_server.MockData(repos=1, prs=1))
+        try:
+            ctx = support.create_context(mock.url_core, http_cache_max_entries=100, work_item_cache_ttl=0)
+            with context.use(ctx):
+                snapshot_list = [work_item.get_snapshot(1) for _ in range(2)]
+                cache_stats = context.get_client().cache.get_stats()
+            ctx.close()
+            status_dict = mock.server.get_stats()['workitem']['status']
+        finally:
+            mock.close()
+
+        # 2回目は304で、保持したJSONを返却する
+        self.assertEqual(status_dict, {'200': 1, '304': 1})
+        self.assertEqual(cache_stats['hit_count'], 1)
+        self.assertEqual(snapshot_list[1].rev, snapshot_list[0].rev)
+
+    def test_not_modified_without_entry(self):
+        # 検証子を送信していない304は、再検証を要求して再取得する
+        adapter = ScriptedAdapter([(304, None), (200, {'value': 1})])
+        client = http_client.HttpClient('user', 'password', '7.1', max_retries=0, cache=http_cache.HttpCache(), adapter=adapter)
+
+        self.assertEqual(client.get_json('http://127.0.0.1:1/'), {'value': 1})
+        self.assertNotIn('Cache-Control', adapter.request_list[0].headers)
+        self.assertEqual(adapter.request_list[1].headers['Cache-Control'], 'no-cache')
+
+    def test_not_modified_without_entry_repeated(self):
+        adapter = ScriptedAdapter([(304, None), (304, None)])
+        client = http_client.HttpClient('user', 'password', '7.1', max_retries=0, cache=http_cache.HttpCache(), adapter=adapter)
+
+        with self.assertRaises(requests.HTTPError):
+            client.get_json('http://127.0.0.1:1/')
+
+    def test_not_modified_without_entry_async(self):
+        import aiohttp
+
+        transport = ScriptedTransport([(304, None), (200, {'value': 1}), (304, None), (304, None)])
+
+        async def run():
+            client = aio_client.AsyncHttpClient('user', 'password', '7.1', max_retries=0, cache=http_cache.HttpCache(), transport=transport)
+            try:
+                self.assertEqual(await client.get_json('http://127.0.0.1:1/a'), {'value': 1})
+                with self.assertRaises(aiohttp.ClientResponseError):
+                    await client.get_json('http://127.0.0.1:1/b')
+            finally:
+                await client.close()
+
+        asyncio.run(run())
+        self.assertEqual([headers.get('Cache-Control') for headers in transport.headers_list], [None, 'no-cache', None, 'no-cache'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+# 設定ファイルを読み込まずにインポートできるモジュール
+module_name_list = [
+    'aio_client', 'batch', 'benchmark', 'change_cache', 'context', 'excel', 'func', 'git_mirror', 'git_models', 'git_repo',
+    'hook_server', 'http_cache', 'http_client', 'json_stream', 'merge_check', 'metrics', 'mock_server', 'pr_index',
+    'repo_cache', 'repo_link', 'scheduler', 'transport', 'work_item', 'work_item_models'
+    ]
+
+script = '''
+import logging
+import sys
+for module_name in sys.argv[1:]:
+    __import__(module_name)
+
+# 設定ファイル・ログ設定・Excelの読み込みは初回利用時まで行わない
+assert logging.getLogger().handlers == [], logging.getLogger().handlers
+assert 'openpyxl' not in sys.modules
+
+import context
+import mock_server
+import support
+import work_item
+
+mock = support.MockServerThread(mock_server.MockData(repos=1, prs=1))
+try:
+    with context.use(support.create_context(mock.url_core)):
+        work_item.get_snapshot(1)
+finally:
+    mock.close()
+
+try:
+    context.get_default_context()
+except FileNotFoundError:
+    print('settings not found')
+'''
+
+
+class ImportTest(unittest.TestCase):
+
+    def test_import_without_settings(self):
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join([package_dir, os.path.join(package_dir, 'tests')])
+
+        # 設定ファイルのないディレクトリで実行する
+        with tempfile.TemporaryDirectory() as temp_dir:
+            result = subprocess.run(
+                [sys.executable, '-c', script] + module_name_list,
+                cwd=temp_dir,
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=60
+                )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        # 既定のコンテキストの利用時に設定ファイルを読み込む
+        self.assertEqual(result.stdout.strip(), 'settings not found')
+
+
+if __name__ == '__main__':
+    unittest.main()
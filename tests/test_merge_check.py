@@ -0,0 +1,105 @@
+import os
+import subprocess
+import tempfile
+import unittest
+import context
+import merge_check
+import mock_server
+import support
+
+
+class MirrorMergeCheckTest(unittest.TestCase):
+    """
+
+    ローカルのリポジトリを取得元とするミラーでのマージ状況のチェック。
+    WorkItem(ID:1)にはPR1～5をリンクし、各PRの最終マージコミットを以下とする。
+    PR1(active):未マージのブランチのコミット、PR2(completed):マージコミット、
+    PR3(completed):メッセージを編集したスカッシュコミット、PR4(completed):ミラーに存在しないコミット、
+    PR5(completed):他のブランチ(release)で完了したコミット
+
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.temp_dir.name, 'source', 'repo0')
+        os.makedirs(self.source_path)
+
+        self._git('init', '--quiet', '--initial-branch=master')
+        self._commit('base.txt', 'base')
+
+        self._git('checkout', '--quiet', '-b', 'feature/1')
+        unmerged_commit = self._commit('unmerged.txt', 'unmerged')
+
+        self._git('checkout', '--quiet', '-b', 'feature/2', 'master')
+        self._commit('merged.txt', 'merged')
+        self._git('checkout', '--quiet', 'master')
+        self._git('merge', '--quiet', '--no-ff', '-m', 'Merged PR 2: merged', 'feature/2')
+        merge_commit = self._git('rev-parse', 'HEAD')
+
+        squash_commit = self._commit('squash.txt', 'edited squash message')
+
+        self._git('checkout', '--quiet', '-b', 'release', 'master')
+        release_commit = self._commit('release.txt', 'Merged PR 5: release')
+        self._git('checkout', '--quiet', 'master')
+
+        data = mock_server.MockData(repos=1, prs=5, linked_prs=5)
+        for pr_id, status, commit in [
+            (1, 'active', unmerged_commit),
+            (2, 'completed', merge_commit),
+            (3, 'completed', squash_commit),
+            (4, 'completed', '0123456789abcdef0123456789abcdef01234567'),
+            (5, 'completed', release_commit)
+        ]:
+            data.pr_dict[pr_id]['status'] = status
+            data.pr_dict[pr_id]['lastMergeCommit'] = {'commitId': commit}
+        self.mock = support.MockServerThread(data)
+
+    def tearDown(self):
+        self.mock.close()
+        self.temp_dir.cleanup()
+
+    def _git(self, *arg_list) -> str:
+        env = dict(os.environ)
+        env.update({
+            'GIT_AUTHOR_NAME': 'test',
+            'GIT_AUTHOR_EMAIL': 'test@example.com',
+            'GIT_COMMITTER_NAME': 'test',
+            'GIT_COMMITTER_EMAIL': 'test@example.com'
+        })
+        result = subprocess.run(['git'] + list(arg_list), cwd=self.source_path, env=env, capture_output=True, check=True)
+        return result.stdout.decode('utf-8').strip()
+
+    def _commit(self, file_name :str, message :str) -> str:
+        with open(os.path.join(self.source_path, file_name), 'w') as f:
+            f.write(message)
+        self._git('add', file_name)
+        self._git('commit', '--quiet', '-m', message)
+        return self._git('rev-parse', 'HEAD')
+
+    def _check(self, **ads_dict) -> merge_check.MergeResult:
+        ctx = support.create_context(self.mock.url_core, **ads_dict)
+        with context.use(ctx):
+            result = merge_check.MergeChecker().check(1, 'master')
+        ctx.close()
+        return result
+
+    def test_mirror(self):
+        result = self._check(
+            git_mirror_dir=os.path.join(self.temp_dir.name, 'mirror'),
+            git_mirror_url=os.path.join(self.temp_dir.name, 'source', '{repo_name}')
+            )
+
+        self.assertEqual(result.repo_result_list[0].merged_pr_id_list, [2, 3, 4])
+        self.assertEqual(result.repo_result_list[0].not_merged_pr_id_list, [1, 5])
+        self.assertFalse(result.is_all_merged)
+
+    def test_rest(self):
+        # ミラーを利用しない場合はREST APIの状態(completed)で判定する
+        result = self._check()
+
+        self.assertEqual(result.repo_result_list[0].merged_pr_id_list, [2, 3, 4, 5])
+        self.assertEqual(result.repo_result_list[0].not_merged_pr_id_list, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import context
+import git_repo
+import metrics
+import mock_server
+import support
+import work_item
+
+
+class RequestMetricsTest(unittest.TestCase):
+
+    def test_get_endpoint(self):
+        base = 'https://dev.azure.com/organization/project/_apis/'
+        self.assertEqual(metrics.get_endpoint(base + 'wit/workitems/1'), 'workitem')
+        self.assertEqual(metrics.get_endpoint(base + 'wit/attachments/file1'), 'attachments')
+        self.assertEqual(metrics.get_endpoint(base + 'git/repositories'), 'repositories')
+        self.assertEqual(metrics.get_endpoint(base + 'git/repositories/repo'), 'repositories')
+        self.assertEqual(metrics.get_endpoint(base + 'git/repositories/repo/pullrequests'), 'pullrequests')
+        self.assertEqual(metrics.get_endpoint(base + 'git/repositories/repo/pullrequests/1'), 'pullrequests')
+        self.assertEqual(metrics.get_endpoint(base + 'git/repositories/repo/pullrequests/1/commits'), 'commits')
+        self.assertEqual(metrics.get_endpoint(base + 'git/repositories/repo/pullrequests/1/iterations/2/changes'), 'iterations')
+        self.assertEqual(metrics.get_endpoint(base + 'git/repositories/repo/commits/abc/changes'), 'changes')
+        self.assertEqual(metrics.get_endpoint(base + 'git/repositories/repo/diffs/commits'), 'diffs')
+        self.assertEqual(metrics.get_endpoint(base + 'projects'), 'other')
+
+    def test_counters(self):
+        request_metrics = metrics.RequestMetrics(trace=True)
+        url = 'https://dev.azure.com/organization/project/_apis/wit/workitems/1'
+        request_metrics('get', url, 200, 100, 1000.0, 0.004)
+        request_metrics('GET', url, 304, 0, 1000.1, 0.03)
+        request_metrics('GET', url, None, 0, 1000.2, 20)
+        request_metrics('PATCH', url, 200, 50, 1000.3, 0.2)
+
+        summary = request_metrics.get_summary()
+        self.assertEqual(list(summary.keys()), ['GET workitem', 'PATCH workitem'])
+        self.assertEqual(summary['GET workitem']['count'], 3)
+        self.assertEqual(summary['GET workitem']['bytes'], 100)
+        self.assertEqual(summary['GET workitem']['status'], {'200': 1, '304': 1, 'error': 1})
+        self.assertEqual(summary['GET workitem']['latency']['max'], 20)
+        self.assertEqual(summary['GET workitem']['latency']['p50'], 0.05)
+        self.assertEqual(summary['GET workitem']['latency']['p95'], 20)
+
+        prometheus_line_list = request_metrics.to_prometheus().splitlines()
+        self.assertIn('ads_http_requests_total{endpoint="workitem",method="GET",status="error"} 1', prometheus_line_list)
+        self.assertIn('ads_http_response_bytes_total{endpoint="workitem",method="PATCH"} 50', prometheus_line_list)
+        self.assertIn('ads_http_request_duration_seconds_bucket{endpoint="workitem",method="GET",le="0.005"} 1', prometheus_line_list)
+        self.assertIn('ads_http_request_duration_seconds_bucket{endpoint="workitem",method="GET",le="10"} 2', prometheus_line_list)
+        self.assertIn('ads_http_request_duration_seconds_bucket{endpoint="workitem",method="GET",le="+Inf"} 3', prometheus_line_list)
+        self.assertIn('ads_http_request_duration_seconds_count{endpoint="workitem",method="GET"} 3', prometheus_line_list)
+
+        trace_event_list = request_metrics.get_trace()['traceEvents']
+        self.assertEqual(len(trace_event_list), 4)
+        self.assertEqual(trace_event_list[0]['name'], 'GET workitem')
+        self.assertEqual(trace_event_list[0]['ts'], 1000000000)
+
+        request_metrics.clear()
+        self.assertEqual(request_metrics.get_summary(), {})
+
+
+class ContextMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=3, linked_prs=3))
+        self.repo_id = list(self.mock.server.data.repo_dict.keys())[0]
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.mock.close()
+        self.temp_dir.cleanup()
+
+    def test_export(self):
+        # 同期・非同期のクライアントのリクエストを計測し、設定されたパスへ出力する
+        prometheus_path = os.path.join(self.temp_dir.name, 'metrics.prom')
+        summary_path = os.path.join(self.temp_dir.name, 'metrics.json')
+        trace_path = os.path.join(self.temp_dir.name, 'trace.json')
+        ctx = support.create_context(
+            self.mock.url_core,
+            metrics_prometheus_path=prometheus_path,
+            metrics_summary_path=summary_path,
+            metrics_trace_path=trace_path
+            )
+
+        async def get_pr_list_async() -> list:
+            try:
+                return [await git_repo.get_pr_async(self.repo_id, pr_id) for pr_id in [1, 2]]
+            finally:
+                await context.get_async_client().close()
+
+        with context.use(ctx):
+            work_item.get_snapshot(1)
+            git_repo.get_pr_dict(self.repo_id, 'master', 'all')
+            asyncio.run(get_pr_list_async())
+            ctx.export_metrics()
+        ctx.close()
+
+        with open(summary_path, 'r') as summary_file:
+            summary = json.load(summary_file)
+        self.assertEqual(summary['GET workitem']['count'], self.mock.get_count('workitem'))
+        self.assertEqual(summary['GET pullrequests']['count'], self.mock.get_count('pullrequests'))
+        self.assertEqual(summary['GET pullrequests']['count'], 3)
+        self.assertEqual(summary['GET pullrequests']['status'], {'200': 3})
+
+        with open(prometheus_path, 'r') as prometheus_file:
+            self.assertIn('ads_http_requests_total{endpoint="pullrequests",method="GET",status="200"} 3', prometheus_file.read().splitlines())
+
+        with open(trace_path, 'r') as trace_file:
+            self.assertEqual(len(json.load(trace_file)['traceEvents']), self.mock.get_count())
+
+
+if __name__ == '__main__':
+    unittest.main()
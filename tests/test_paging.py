@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+import context
+import git_repo
+import mock_server
+import support
+
+
+class PageSizeCapTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # サーバーの1ページの最大件数(1000件)を超えるPRを持つリポジトリ
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=2500), max_page_size=1000)
+        cls.repo_id = list(cls.mock.server.data.repo_dict.keys())[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def test_page_size_over_server_cap(self):
+        ctx = support.create_context(self.mock.url_core, page_size={'pullrequests': 5000})
+        self.assertEqual(ctx.get_page_size('pullrequests'), 1000)
+
+        with context.use(ctx):
+            pr_list = list(git_repo.iter_pr(self.repo_id, 'master', 'all'))
+            # ページサイズを明示した場合もサーバーの最大件数を上限とする
+            explicit_pr_list = list(git_repo.iter_pr(self.repo_id, 'master', 'all', page_size=5000))
+        ctx.close()
+
+        self.assertEqual(len(pr_list), 2500)
+        self.assertEqual(len(set(pr.pr_id for pr in pr_list)), 2500)
+        self.assertEqual(len(explicit_pr_list), 2500)
+
+    def test_page_size_over_server_cap_async(self):
+        ctx = support.create_context(self.mock.url_core, page_size={'pullrequests': 5000})
+
+        async def run():
+            try:
+                return [pr async for pr in git_repo.iter_pr_async(self.repo_id, 'master', 'all')]
+            finally:
+                await ctx.aclient.close()
+
+        with context.use(ctx):
+            pr_list = asyncio.run(run())
+        ctx.close()
+
+        self.assertEqual(len(pr_list), 2500)
+
+    def test_page_size_within_server_cap(self):
+        ctx = support.create_context(self.mock.url_core, page_size={'pullrequests': 1000})
+        self.mock.server.reset_stats()
+
+        with context.use(ctx):
+            pr_list = list(git_repo.iter_pr(self.repo_id, 'master', 'all'))
+        ctx.close()
+
+        self.assertEqual(len(pr_list), 2500)
+        # 最終ページ(ページサイズ未満)で終了し、空のページは要求しない
+        self.assertEqual(self.mock.get_count('pullrequests'), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
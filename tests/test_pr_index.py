@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import context
+import git_repo
+import mock_server
+import support
+
+
+class PrIndexBranchNameTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # ターゲットブランチ名が階層を含むPR
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=30, branch_name='release/1.0'))
+        cls.repo_id = list(cls.mock.server.data.repo_dict.keys())[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _get_pr_result(self, **ads_dict) -> tuple:
+        ctx = support.create_context(self.mock.url_core, **ads_dict)
+        with context.use(ctx):
+            pr_dict = git_repo.get_pr_dict(self.repo_id, 'release/1.0', 'all')
+            pr_id_list = git_repo.get_pr_id_list(self.repo_id, 'release/1.0', 'completed')
+        ctx.close()
+        return {pr_id: (pr.status, pr.source_branch, pr.target_branch) for pr_id, pr in pr_dict.items()}, sorted(pr_id_list)
+
+    def test_index_matches_rest(self):
+        rest_pr_dict, rest_pr_id_list = self._get_pr_result()
+        index_pr_dict, index_pr_id_list = self._get_pr_result(
+            pr_index_path=os.path.join(self.temp_dir.name, 'pr_index.db'),
+            pr_index_sync_interval=0
+            )
+
+        self.assertEqual(len(rest_pr_dict), 30)
+        self.assertEqual(index_pr_dict, rest_pr_dict)
+        self.assertEqual(index_pr_id_list, rest_pr_id_list)
+        self.assertEqual(rest_pr_dict[1], ('active', 'feature/1', 'release/1.0'))
+
+    def test_get_pr_target_branch(self):
+        ctx = support.create_context(self.mock.url_core)
+        with context.use(ctx):
+            pr = git_repo.get_pr(self.repo_id, 1, 'release/1.0')
+        ctx.close()
+
+        self.assertEqual(pr.target_branch, 'release/1.0')
+
+
+class PrIndexSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=4))
+        self.repo_id = list(self.mock.server.data.repo_dict.keys())[0]
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.mock.close()
+        self.temp_dir.cleanup()
+
+    def _sync_twice(self, api_version :str) -> tuple:
+        ctx = support.create_context(
+            self.mock.url_core,
+            api_version=api_version,
+            pr_index_path=os.path.join(self.temp_dir.name, 'pr_index.db'),
+            pr_index_sync_interval=0
+            )
+        with context.use(ctx):
+            before = git_repo.get_pr_id_list(self.repo_id, 'master', 'active')
+            # 作成・完了を伴わない変更(再アクティブ化)
+            self.mock.server.data.pr_dict[2]['status'] = 'active'
+            after = git_repo.get_pr_id_list(self.repo_id, 'master', 'active')
+        ctx.close()
+        return before, after
+
+    def test_full_sync_before_api_version_7_1(self):
+        # 差分の検索条件に対応しないapi-versionでは、同期毎に全件を取得する
+        before, after = self._sync_twice('6.0')
+
+        self.assertEqual(before, [1])
+        self.assertEqual(sorted(after), [1, 2])
+
+    def test_delta_sync(self):
+        # 差分同期では作成・完了を伴わない変更は全件同期まで反映されない
+        before, after = self._sync_twice('7.1-preview.1')
+
+        self.assertEqual(before, [1])
+        self.assertEqual(after, [1])
+
+
+class PrIndexLastMergeCommitTest(unittest.TestCase):
+
+    def setUp(self):
+        data = mock_server.MockData(repos=1, prs=2)
+        data.pr_dict[2]['lastMergeCommit'] = {'commitId': 'a' * 40}
+        self.mock = support.MockServerThread(data)
+        self.repo_id = list(data.repo_dict.keys())[0]
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.temp_dir.name, 'pr_index.db')
+
+    def tearDown(self):
+        self.mock.close()
+        self.temp_dir.cleanup()
+
+    def _get_pr_dict(self) -> dict:
+        ctx = support.create_context(self.mock.url_core, pr_index_path=self.index_path)
+        with context.use(ctx):
+            pr_dict = git_repo.get_pr_dict(self.repo_id, 'master', 'all')
+        ctx.close()
+        return pr_dict
+
+    def test_last_merge_commit(self):
+        pr_dict = self._get_pr_dict()
+
+        self.assertEqual(pr_dict[2].last_merge_commit, 'a' * 40)
+        self.assertEqual(pr_dict[1].last_merge_commit, None)
+
+    def test_migrate(self):
+        # 最終マージコミットの列がない旧形式のファイル(同期済み)
+        conn = sqlite3.connect(self.index_path)
+        conn.execute(
+            'CREATE TABLE pull_requests (repo_id TEXT NOT NULL, repo_name TEXT, pr_id INTEGER NOT NULL, status TEXT NOT NULL,'
+            ' source_branch TEXT NOT NULL, target_branch TEXT NOT NULL, PRIMARY KEY (repo_id, pr_id))'
+            )
+        conn.execute('CREATE TABLE sync_state (repo_id TEXT NOT NULL PRIMARY KEY, synced_at REAL NOT NULL, full_synced_at REAL NOT NULL)')
+        conn.execute('INSERT INTO pull_requests VALUES (?, NULL, 2, ?, ?, ?)', (self.repo_id, 'completed', 'feature/2', 'master'))
+        conn.execute('INSERT INTO sync_state VALUES (?, ?, ?)', (self.repo_id, 4102444800, 4102444800))
+        conn.commit()
+        conn.close()
+
+        # 移行後の初回は全件同期とし、最終マージコミットを取得する
+        pr_dict = self._get_pr_dict()
+
+        self.assertEqual(sorted(pr_dict.keys()), [1, 2])
+        self.assertEqual(pr_dict[2].last_merge_commit, 'a' * 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+import context
+import func
+import mock_server
+import support
+
+
+class PrLookupTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # 1リポジトリ40件のPRのうち、WorkItem(ID:1)に4件をリンクする
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=40, linked_prs=4))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.mock.server.reset_stats()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _get_pr_request_count_list(self, count :int=1, **ads_dict) -> list:
+        # get_pr_dictをcount回呼び出し、各回のPRのリクエスト数を返す
+        ctx = support.create_context(self.mock.url_core, **ads_dict)
+        request_count_list = []
+        with context.use(ctx):
+            for _ in range(count):
+                self.mock.server.reset_stats()
+                pr_dict = func.get_pr_dict(1, 'master')
+                self.assertEqual(sorted(pr_dict.keys()), [37, 38, 39, 40])
+                request_count_list.append(self.mock.get_count('pullrequests'))
+        ctx.close()
+        return request_count_list
+
+    def test_direct_lookup(self):
+        # 4件 <= 推定ページ数1 × 4 のため個別に取得する
+        self.assertEqual(self._get_pr_request_count_list(pr_count_estimate=100, pr_direct_lookup_ratio=4), [4])
+
+    def test_list_lookup(self):
+        # 4件 > 推定ページ数1 × 3 のため一覧を取得する
+        self.assertEqual(self._get_pr_request_count_list(pr_count_estimate=100, pr_direct_lookup_ratio=3), [1])
+
+    def test_pr_count_after_list(self):
+        # 一覧取得後は判明した件数(40件、ページ数4)で判定し、4件 <= 4 × 3 のため個別に取得する
+        request_count_list = self._get_pr_request_count_list(
+            count=2,
+            pr_count_estimate=10,
+            pr_direct_lookup_ratio=3,
+            page_size={'pullrequests': 10}
+            )
+        self.assertEqual(request_count_list, [5, 4])
+
+    def test_pr_index(self):
+        # PRインデックスを利用する場合は個別に取得しない
+        request_count_list = self._get_pr_request_count_list(
+            count=2,
+            pr_count_estimate=100,
+            pr_direct_lookup_ratio=4,
+            pr_index_path=os.path.join(self.temp_dir.name, 'pr_index.db')
+            )
+        self.assertEqual(request_count_list, [1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
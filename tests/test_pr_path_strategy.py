@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+import context
+import git_repo
+import mock_server
+import support
+
+
+class PrPathStrategyTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # PR毎に5コミット、コミット毎に20変更(コミット間で一部のパスが重複する)
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=3, commits=5, changes=20))
+        cls.repo_id = list(cls.mock.server.data.repo_dict.keys())[0]
+        cls.repo_pr_id_list = [(cls.repo_id, pr_id) for pr_id in [1, 2, 3]]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def _get_path_dict_list(self, strategy :str) -> list:
+        ctx = support.create_context(self.mock.url_core)
+        self.mock.server.reset_stats()
+        with context.use(ctx):
+            path_dict_list = git_repo.get_pr_path_dict_list(self.repo_pr_id_list, strategy=strategy)
+        ctx.close()
+        return path_dict_list
+
+    def test_iterations_equivalent_to_commits(self):
+        commits_path_dict_list = self._get_path_dict_list('commits')
+        iterations_path_dict_list = self._get_path_dict_list('iterations')
+
+        self.assertEqual(len(iterations_path_dict_list), 3)
+        for commits_path_dict, iterations_path_dict in zip(commits_path_dict_list, iterations_path_dict_list):
+            # 変更種類はPR全体の正味の変更種類となるため、パスのみを比較する
+            self.assertEqual(len(iterations_path_dict), 24)
+            self.assertEqual(sorted(iterations_path_dict.keys()), sorted(commits_path_dict.keys()))
+
+    def test_iterations_request_count(self):
+        self._get_path_dict_list('commits')
+        # PR毎にコミット一覧1回・コミット毎の変更5回
+        self.assertEqual(self.mock.get_count(), 3 * 6)
+        self.assertEqual(self.mock.get_count('changes'), 3 * 5)
+
+        self._get_path_dict_list('iterations')
+        # PR毎にイテレーション一覧1回・差分1回
+        self.assertEqual(self.mock.get_count(), 3 * 2)
+        self.assertEqual(self.mock.get_count('iterations'), 3 * 2)
+
+    def test_iterations_async(self):
+        ctx = support.create_context(self.mock.url_core)
+
+        async def run():
+            try:
+                return await git_repo.get_pr_path_dict_by_pr_async(self.repo_id, 1, strategy='iterations')
+            finally:
+                await ctx.aclient.close()
+
+        with context.use(ctx):
+            path_dict = asyncio.run(run())
+            sync_path_dict = git_repo.get_pr_path_dict_by_pr(self.repo_id, 1, strategy='iterations')
+        ctx.close()
+
+        self.assertEqual(path_dict, sync_path_dict)
+
+    def test_unknown_strategy(self):
+        ctx = support.create_context(self.mock.url_core)
+        with context.use(ctx):
+            with self.assertRaises(ValueError):
+                git_repo.get_pr_path_dict_list(self.repo_pr_id_list, strategy='unknown')
+        ctx.close()
+
+
+class PrPathOrderTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=1, prs=3, commits=5, changes=3))
+        cls.repo_id = list(cls.mock.server.data.repo_dict.keys())[0]
+        cls.repo_pr_id_list = [(cls.repo_id, pr_id) for pr_id in [3, 1, 2]]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def _get_path_dict_list(self, max_workers :int) -> list:
+        ctx = support.create_context(self.mock.url_core)
+        with context.use(ctx):
+            path_dict_list = git_repo.get_pr_path_dict_list(self.repo_pr_id_list, max_workers=max_workers, strategy='commits')
+        ctx.close()
+        return path_dict_list
+
+    def test_order_preserved(self):
+        sequential_path_dict_list = self._get_path_dict_list(1)
+
+        # 後のコミットほど先に取得が完了するよう待機する
+        get_commit_path_dict = git_repo.get_commit_path_dict
+        lock = threading.Lock()
+        running_count_list = [0, 0]
+
+        def delayed_get_commit_path_dict(repo_id :str, commit_id :str) -> dict:
+            with lock:
+                running_count_list[0] += 1
+                running_count_list[1] = max(running_count_list)
+            time.sleep((5 - int(commit_id[8:], 16)) * 0.02)
+            try:
+                return get_commit_path_dict(repo_id, commit_id)
+            finally:
+                with lock:
+                    running_count_list[0] -= 1
+
+        with mock.patch.object(git_repo, 'get_commit_path_dict', delayed_get_commit_path_dict):
+            concurrent_path_dict_list = self._get_path_dict_list(8)
+
+        self.assertGreater(running_count_list[1], 1)
+        # 引数の順序で、PR内はコミット順に重複パスを後勝ちで更新する
+        self.assertEqual(concurrent_path_dict_list, sequential_path_dict_list)
+        self.assertEqual(list(concurrent_path_dict_list[0].items())[:3], [('/src/pr3/file0.py', 'add'), ('/src/pr3/file1.py', 'edit'), ('/src/pr3/file2.py', 'edit')])
+        self.assertEqual([sorted(path_dict)[0] for path_dict in concurrent_path_dict_list], ['/src/pr3/file0.py', '/src/pr1/file0.py', '/src/pr2/file0.py'])
+
+
+if __name__ == '__main__':
+    unittest.main()
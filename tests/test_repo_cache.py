@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import unittest
+import context
+import git_repo
+import mock_server
+import repo_cache
+import support
+
+
+class RepoCacheScopeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, 'repo_cache.json')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_scopes_share_file(self):
+        load_count_dict = {'a': 0, 'b': 0}
+
+        def create_loader(scope :str, id_name_dict :dict):
+            def loader():
+                load_count_dict[scope] += 1
+                return id_name_dict
+            return loader
+
+        cache_a = repo_cache.RepoCache(create_loader('a', {'id-1': 'repo-a'}), self.file_path, scope='a')
+        cache_b = repo_cache.RepoCache(create_loader('b', {'id-1': 'repo-b'}), self.file_path, scope='b')
+        self.assertEqual(cache_a.get_name('id-1'), 'repo-a')
+        self.assertEqual(cache_b.get_name('id-1'), 'repo-b')
+
+        with open(self.file_path, 'r') as cache_file:
+            self.assertEqual(sorted(json.load(cache_file).keys()), ['a', 'b'])
+
+        # ファイルより読み込んだ各スコープのキャッシュは再取得しない
+        self.assertEqual(repo_cache.RepoCache(create_loader('a', {}), self.file_path, scope='a').get_name('id-1'), 'repo-a')
+        self.assertEqual(repo_cache.RepoCache(create_loader('b', {}), self.file_path, scope='b').get_id('REPO-B'), 'id-1')
+        self.assertEqual(load_count_dict, {'a': 1, 'b': 1})
+
+        # 破棄は自スコープのみ
+        cache_a.clear()
+        with open(self.file_path, 'r') as cache_file:
+            self.assertEqual(list(json.load(cache_file).keys()), ['b'])
+        cache_b.clear()
+        self.assertFalse(os.path.exists(self.file_path))
+
+    def test_legacy_file_ignored(self):
+        with open(self.file_path, 'w') as cache_file:
+            json.dump({'fetched_at': 0, 'repos': {'id-1': 'legacy'}}, cache_file)
+
+        cache = repo_cache.RepoCache(lambda: {'id-1': 'repo'}, self.file_path, scope='a')
+        self.assertEqual(cache.get_name('id-1'), 'repo')
+        with open(self.file_path, 'r') as cache_file:
+            self.assertEqual(list(json.load(cache_file).keys()), ['a'])
+
+    def test_contexts_share_file(self):
+        # 同じリポジトリIDで名前の異なる2つのサーバー(組織)
+        mock_a = support.MockServerThread(mock_server.MockData(repos=1, prs=1))
+        data_b = mock_server.MockData(repos=1, prs=1)
+        repo_id = list(data_b.repo_dict.keys())[0]
+        data_b.repo_dict[repo_id] = 'other0'
+        mock_b = support.MockServerThread(data_b)
+        try:
+            name_list = []
+            for mock in [mock_a, mock_b, mock_a, mock_b]:
+                ctx = support.create_context(mock.url_core, repo_cache_path=self.file_path)
+                with context.use(ctx):
+                    name_list.append(git_repo.get_repo_name(repo_id))
+                ctx.close()
+            request_count = mock_a.get_count('repositories') + mock_b.get_count('repositories')
+        finally:
+            mock_a.close()
+            mock_b.close()
+
+        self.assertEqual(name_list, ['repo0', 'other0', 'repo0', 'other0'])
+        # 2回目以降はファイルのキャッシュを利用する
+        self.assertEqual(request_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+import context
+import mock_server
+import repo_link
+import support
+
+
+class RepoLinkTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # PRのソースブランチは階層を含む(feature/{PRID})
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=2, prs=2))
+        cls.repo_id_list = list(cls.mock.server.data.repo_dict.keys())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, 'repo.csv')
+        with open(self.file_path, 'w', encoding='utf-8') as csv_file:
+            csv_file.write('repository_id,pull_request_id\n')
+            csv_file.write(self.repo_id_list[0] + ',1\n')
+            csv_file.write(self.repo_id_list[1] + ',2\n')
+            csv_file.write(self.repo_id_list[0] + ',3\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_link_list_hierarchical_source_branch(self):
+        ctx = support.create_context(self.mock.url_core)
+        with context.use(ctx):
+            link_list = repo_link.read_link_list(self.file_path)
+        ctx.close()
+
+        # 一覧はリポジトリ毎にまとめた順序
+        self.assertEqual(link_list, [
+            (self.repo_id_list[0], 'feature/1'),
+            (self.repo_id_list[0], 'feature/3'),
+            (self.repo_id_list[1], 'feature/2')
+        ])
+
+    def test_link_branch_list_skips_existing(self):
+        # WorkItem(ID:1)は全リポジトリのfeatureブランチのリンクが設定済み
+        link_list = [
+            (self.repo_id_list[0], 'feature'),
+            (self.repo_id_list[0], 'feature/1')
+        ]
+
+        ctx = support.create_context(self.mock.url_core)
+        with context.use(ctx):
+            result_list = repo_link.link_branch_list([1], link_list, dry_run=True)
+        ctx.close()
+
+        self.assertEqual(result_list[0].skipped_list, [(self.repo_id_list[0], 'feature')])
+        self.assertEqual(result_list[0].added_list, [(self.repo_id_list[0], 'feature/1')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import threading
+import unittest
+import requests
+import context
+import git_repo
+import transport
+import support
+
+
+class RecordReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = support.MockServerThread()
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.archive_path = os.path.join(self.work_dir.name, 'transport.db')
+
+    def tearDown(self):
+        self.mock.close()
+        self.work_dir.cleanup()
+
+    def create_context(self, mode :str, **ads_dict) -> context.Context:
+        return support.create_context(self.mock.url_core, transport_mode=mode, transport_archive_path=self.archive_path, **ads_dict)
+
+    def test_replay_without_server(self):
+        repo_id = list(self.mock.server.data.repo_dict.keys())[0]
+
+        ctx = self.create_context('record')
+        with context.use(ctx):
+            recorded = git_repo.get_pr_id_list(repo_id, 'master', 'completed')
+        ctx.close()
+
+        self.mock.server.reset_stats()
+        ctx = self.create_context('replay')
+        with context.use(ctx):
+            replayed = git_repo.get_pr_id_list(repo_id, 'master', 'completed')
+        ctx.close()
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(self.mock.get_count(), 0)
+
+    def test_replay_miss_is_not_request_exception(self):
+        ctx = self.create_context('replay', pool_size=3)
+        error_list = []
+
+        def run():
+            with context.use(ctx):
+                # 送信枠の数を超えて記録なしのリクエストを送信しても待機しない
+                for pr_id in range(1, 6):
+                    try:
+                        git_repo.get_pr(list(self.mock.server.data.repo_dict.keys())[0], pr_id)
+                    except transport.ReplayError as e:
+                        error_list.append(e)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive(), 'replay miss blocked by leaked scheduler slot')
+
+        self.assertEqual(len(error_list), 5)
+        self.assertNotIsInstance(error_list[0], requests.RequestException)
+        self.assertEqual(ctx.scheduler.get_stats()['in_flight'], 0)
+        ctx.close()
+
+    def test_range_request_does_not_overwrite_full_response(self):
+        url = self.mock.url_core + 'organization/project/_apis/wit/workitems/1'
+
+        self.assertNotEqual(
+            transport.make_key('GET', url),
+            transport.make_key('GET', url, range_header='bytes=100-')
+            )
+
+        ctx = self.create_context('record')
+        with context.use(ctx):
+            full = context.get_client().get(url).content
+            context.get_client().get(url, headers={'Range': 'bytes=100-'})
+        ctx.close()
+
+        archive = transport.TransportArchive(self.archive_path)
+        try:
+            self.assertEqual(archive.get(transport.make_key('GET', url, {'api-version': '7.1'}))[2], full)
+            self.assertNotEqual(archive.get(transport.make_key('GET', url, {'api-version': '7.1'}, 'bytes=100-')), None)
+        finally:
+            archive.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import context
+import mock_server
+import support
+import work_item
+
+
+class WorkItemSnapshotTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.mock = support.MockServerThread(mock_server.MockData(repos=2, prs=2, linked_prs=2))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mock.close()
+
+    def setUp(self):
+        self.mock.server.reset_stats()
+
+    def _read_all(self):
+        work_item.get_nowdate(1)
+        work_item.get_pr_id_dict(1)
+        work_item.get_repo_list(1)
+        work_item.get_branch_link_set(1)
+
+    def test_snapshot_shared(self):
+        # 保持秒数以内は、WorkItemを参照する各関数で1回の取得を共有する
+        ctx = support.create_context(self.mock.url_core, work_item_cache_ttl=60)
+        with context.use(ctx):
+            self._read_all()
+            self._read_all()
+        ctx.close()
+
+        self.assertEqual(self.mock.get_count('workitem'), 1)
+
+    def test_snapshot_expired(self):
+        # 保持秒数が0の場合は参照毎に取得する
+        ctx = support.create_context(self.mock.url_core, work_item_cache_ttl=0)
+        with context.use(ctx):
+            self._read_all()
+        ctx.close()
+
+        self.assertEqual(self.mock.get_count('workitem'), 4)
+
+    def test_clear_cache(self):
+        ctx = support.create_context(self.mock.url_core, work_item_cache_ttl=60)
+        with context.use(ctx):
+            work_item.get_pr_id_dict(1)
+            work_item.clear_cache(1)
+            work_item.get_pr_id_dict(1)
+        ctx.close()
+
+        self.assertEqual(self.mock.get_count('workitem'), 2)
+
+    def test_snapshot_per_context(self):
+        # スナップショットはコンテキスト毎に保持する
+        for _ in range(2):
+            ctx = support.create_context(self.mock.url_core, work_item_cache_ttl=60)
+            with context.use(ctx):
+                work_item.get_pr_id_dict(1)
+            ctx.close()
+
+        self.assertEqual(self.mock.get_count('workitem'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import logging
+import unittest
+import context
+import mock_server
+import support
+import work_item
+from work_item_models import WorkItemPatch
+
+
+class WorkItemPatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = mock_server.MockData(repos=1, prs=1)
+        self.mock = support.MockServerThread(self.data)
+        self.ctx = support.create_context(self.mock.url_core)
+
+    def tearDown(self):
+        self.ctx.close()
+        self.mock.close()
+
+    def test_apply_patch(self):
+        patch = WorkItemPatch(1).add_relation('ArtifactLink', 'vstfs:///Git/Ref/a').replace_field('System.Title', 'title')
+        with context.use(self.ctx):
+            snapshot = work_item.apply_patch(patch)
+            # 更新の応答を保持し、再取得しない
+            work_item.get_snapshot(1)
+
+        self.assertEqual(snapshot.rev, 1)
+        self.assertEqual(self.data.patch_dict, {1: [patch.operation_list]})
+        self.assertEqual(self.mock.get_count('workitem'), 1)
+
+    def test_apply_patch_empty(self):
+        with context.use(self.ctx):
+            self.assertEqual(work_item.apply_patch(WorkItemPatch(1)), None)
+        self.assertEqual(self.mock.get_count('workitem'), 0)
+
+    def test_apply_patch_list_merge(self):
+        # 同じWorkItemの更新操作は1回のリクエストにまとめる
+        patch_list = [
+            WorkItemPatch(2).replace_field('System.Title', 'a'),
+            WorkItemPatch(1).add_relation('ArtifactLink', 'vstfs:///Git/Ref/a'),
+            WorkItemPatch(2).add_relation('ArtifactLink', 'vstfs:///Git/Ref/b'),
+            WorkItemPatch(1).add_relation('ArtifactLink', 'vstfs:///Git/Ref/c')
+        ]
+        with context.use(self.ctx):
+            result_list = work_item.apply_patch_list(patch_list)
+
+        self.assertEqual([result['work_item_id'] for result in result_list], [2, 1])
+        self.assertEqual([result['operations'] for result in result_list], [2, 2])
+        self.assertEqual([result['error'] for result in result_list], [None, None])
+        self.assertEqual(self.data.patch_dict, {
+            1: [patch_list[1].operation_list + patch_list[3].operation_list],
+            2: [patch_list[0].operation_list + patch_list[2].operation_list]
+        })
+
+    def test_apply_patch_list_error(self):
+        # 失敗したWorkItemがあっても他のWorkItemは更新する
+        self.data.patch_error_id_set.add(2)
+        patch_list = [WorkItemPatch(work_item_id).replace_field('System.Title', 'a') for work_item_id in [1, 2, 3]]
+        logging.disable(logging.CRITICAL)
+        try:
+            with context.use(self.ctx):
+                result_list = work_item.apply_patch_list(patch_list)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        self.assertEqual([result['work_item_id'] for result in result_list], [1, 2, 3])
+        self.assertEqual([result['rev'] for result in result_list], [1, None, 1])
+        self.assertEqual(result_list[0]['error'], None)
+        self.assertIn('400', result_list[1]['error'])
+        self.assertEqual(result_list[2]['error'], None)
+        self.assertEqual(sorted(self.data.patch_dict.keys()), [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
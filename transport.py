@@ -0,0 +1,296 @@
+import contextlib
+import io
+import json
+import sqlite3
+import threading
+import time
+import urllib.parse
+import zlib
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from logging import getLogger
+logger = getLogger(__name__)
+
+
+# 記録・再生のモード
+transport_mode_list=['record', 'replay']
+
+# 記録しないレスポンスヘッダー
+# (本文は復号済みで記録するため、Content-Encodingは記録せず、Content-Lengthは本文のサイズとする)
+excluded_header_list=['set-cookie', 'content-encoding', 'content-length', 'transfer-encoding', 'connection']
+
+
+class ReplayError(Exception):
+    """
+
+    再生時に、記録に一致するリクエストが存在しない場合の例外。
+    通信の失敗ではなく記録の不足のため、RequestException(レスポンスを持つ前提の例外処理)とは区別する。
+
+    """
+
+
+def make_key(method :str, url :str, params :dict=None, range_header :str=None) -> str:
+    """
+
+    記録のキーを作成する。
+    URLはスキーム・ホストを小文字とし、クエリパラメータはURLのクエリと統合の上で名前順とする。
+    bool値は同期版・非同期版で表記が異なるため小文字とする。
+    範囲指定(Rangeヘッダー)のリクエストは、部分レスポンスが全体のレスポンスを上書きしないよう範囲毎のキーとする。
+
+    Args:
+        method (str): HTTPメソッド
+        url (str): URL
+        params (dict): クエリパラメータ
+        range_header (str): Rangeヘッダーの値
+
+    Returns:
+        str: キー
+
+    """
+    split_url = urllib.parse.urlsplit(url)
+
+    param_list = urllib.parse.parse_qsl(split_url.query, keep_blank_values=True)
+    if params != None:
+        param_list.extend((key, str(value)) for key, value in params.items())
+    param_list = sorted((key, value.lower() if value in ('True', 'False') else value) for key, value in param_list)
+
+    normalized_url = urllib.parse.urlunsplit((
+        split_url.scheme.lower(),
+        split_url.netloc.lower(),
+        split_url.path.rstrip('/'),
+        urllib.parse.urlencode(param_list),
+        ''
+        ))
+    key = method.upper() + ' ' + normalized_url
+    if range_header:
+        key += ' Range:' + range_header.strip()
+    return key
+
+
+class TransportArchive():
+    """
+
+    リクエスト・レスポンスの記録(SQLite)。
+    キー(HTTPメソッド・正規化したURL・クエリパラメータ)毎に最新のレスポンスを保持し、本文はzlibで圧縮する。
+
+    """
+
+    def __init__(self, file_path :str):
+        """
+
+        Args:
+            file_path (str): 記録ファイル(SQLite)のパス
+
+        """
+        self.file_path = file_path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(file_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS exchanges ('
+            ' key TEXT PRIMARY KEY,'
+            ' status INTEGER NOT NULL,'
+            ' headers TEXT NOT NULL,'
+            ' body BLOB NOT NULL,'
+            ' recorded_at REAL NOT NULL)'
+            )
+
+    def get(self, key :str) -> tuple:
+        """
+
+        記録したレスポンスを取得する。
+
+        Args:
+            key (str): キー
+
+        Returns:
+            tuple: (HTTPステータス(int), レスポンスヘッダー(dict), 本文(bytes))。記録が存在しない場合はNone。
+
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, headers, body FROM exchanges WHERE key = ?',
+                (key,)
+                ).fetchone()
+        if row == None:
+            return None
+        return row[0], json.loads(row[1]), zlib.decompress(row[2])
+
+    def put(self, key :str, status :int, headers, body :bytes):
+        """
+
+        レスポンスを記録する。
+        304(Not Modified)は本文を持たないため、記録済みのレスポンスを上書きしない。
+
+        Args:
+            key (str): キー
+            status (int): HTTPステータス
+            headers: レスポンスヘッダー
+            body (bytes): 本文
+
+        """
+        if status == 304:
+            return
+
+        header_dict = {}
+        for name, value in headers.items():
+            if name.lower() not in excluded_header_list:
+                header_dict[name] = value
+        header_dict['Content-Length'] = str(len(body))
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO exchanges (key, status, headers, body, recorded_at) VALUES (?, ?, ?, ?, ?)',
+                (key, status, json.dumps(header_dict), zlib.compress(body), time.time())
+                )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RecordReplayAdapter(HTTPAdapter):
+    """
+
+    requestsのトランスポートアダプタ。
+    recordの場合は通常どおり送信し、レスポンスを記録する。replayの場合は送信せずに記録したレスポンスを返却する。
+
+    """
+
+    def __init__(self, archive :TransportArchive, mode :str, **kwargs):
+        """
+
+        Args:
+            archive (TransportArchive): 記録
+            mode (str): モード(record/replay)
+            kwargs: HTTPAdapterの引数
+
+        """
+        if mode not in transport_mode_list:
+            raise ValueError('unknown transport mode. mode=(' + str(mode) + ')')
+        super().__init__(**kwargs)
+        self.archive = archive
+        self.mode = mode
+
+    def send(self, request :requests.PreparedRequest, **kwargs) -> requests.Response:
+        key = make_key(request.method, request.url, range_header=request.headers.get('Range'))
+
+        if self.mode == 'replay':
+            record = self.archive.get(key)
+            if record == None:
+                raise ReplayError('request is not recorded. key=(' + key + ')')
+            return _to_response(request, *record)
+
+        res = super().send(request, **kwargs)
+        # ストリーミングの場合も本文を読み込んで記録する(以降の読み込みは読み込み済みの本文より行われる)
+        self.archive.put(key, res.status_code, res.headers, res.content)
+        return res
+
+
+def _to_response(request :requests.PreparedRequest, status :int, headers :dict, body :bytes) -> requests.Response:
+    res = requests.Response()
+    res.request = request
+    res.url = request.url
+    res.status_code = status
+    res.reason = ''
+    res.headers = CaseInsensitiveDict(headers)
+    res.encoding = get_encoding_from_headers(res.headers)
+    res.raw = io.BytesIO(body)
+    res._content = body
+    res._content_consumed = True
+    return res
+
+
+class AsyncRecordReplayTransport():
+    """
+
+    非同期HTTPクライアント(aiohttp)向けの記録・再生。仕様は同期版(RecordReplayAdapter)と同じ。
+
+    """
+
+    def __init__(self, archive :TransportArchive, mode :str):
+        """
+
+        Args:
+            archive (TransportArchive): 記録
+            mode (str): モード(record/replay)
+
+        """
+        if mode not in transport_mode_list:
+            raise ValueError('unknown transport mode. mode=(' + str(mode) + ')')
+        self.archive = archive
+        self.mode = mode
+
+    @contextlib.asynccontextmanager
+    async def request(self, session, method :str, url :str, params :dict=None, **kwargs):
+        """
+
+        HttpRequestを送信(または再生)する。aiohttp.ClientSession.requestと同様に、async withでレスポンスを取得する。
+
+        Raises:
+            ReplayError: 再生時に記録が存在しない場合
+
+        """
+        headers = kwargs.get('headers') or {}
+        key = make_key(method, url, params, headers.get('Range'))
+
+        if self.mode == 'replay':
+            record = self.archive.get(key)
+            if record == None:
+                raise ReplayError('request is not recorded. key=(' + key + ')')
+            yield _ArchivedResponse(method, url, *record)
+            return
+
+        async with session.request(method, url, params=params, **kwargs) as res:
+            body = await res.read()
+            self.archive.put(key, res.status, res.headers, body)
+            yield _ArchivedResponse(method, str(res.url), res.status, res.headers, body)
+
+
+class _ArchivedResponse():
+    """
+
+    記録したレスポンス。非同期HTTPクライアントが利用するaiohttp.ClientResponseの属性・メソッドのみを持つ。
+
+    """
+
+    def __init__(self, method :str, url :str, status :int, headers, body :bytes):
+        import multidict
+
+        self.method = method
+        self.url = url
+        self.status = status
+        self.headers = multidict.CIMultiDictProxy(multidict.CIMultiDict(headers))
+        self._body = body
+
+    @property
+    def request_info(self):
+        import aiohttp
+        import yarl
+
+        return aiohttp.RequestInfo(yarl.URL(self.url), self.method, self.headers, yarl.URL(self.url))
+
+    @property
+    def history(self) -> tuple:
+        return ()
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def json(self, content_type=None):
+        return json.loads(self._body)
+
+    def raise_for_status(self):
+        import aiohttp
+
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(
+                self.request_info,
+                self.history,
+                status=self.status,
+                message=str(self.status),
+                headers=self.headers
+                )
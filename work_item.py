@@ -1,27 +1,39 @@
-import requests
 from requests import RequestException
+import requests
 import datetime
 import os
 import json
 import urllib
-import settings
+import context
 import git_repo
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from work_item_models import WorkItem, WorkItemPatch
 from logging import getLogger
 
-settings_data=settings.get_settings_app_data()
-
 logger = getLogger(__name__)
 
-id=settings_data['ads']['id']
-pw=settings_data['ads']['pw']
-organization = settings_data['ads']['organization']
-project=settings_data['ads']['project']
-url_core=settings_data['ads']['url_core']
-url_base=url_core + organization + '/'+ project +'/_apis/wit/'
-api_version=settings_data['ads']['api_version']
-
 work_item_field_date='Microsoft.VSTS.CodeReview.AcceptedDate'
 
+# WorkItemスナップショットキャッシュ(コンテキスト毎、key:work_item_id(int), value:(取得時刻(float), WorkItem))のロック
+_snapshot_cache_lock = threading.Lock()
+
+# 添付ファイルのダウンロード時の書込単位(バイト)
+attachment_chunk_size=1024 * 1024
+
+# 添付ファイル毎のダウンロードのロック辞書(コンテキスト毎、key:保存ファイルパス(str), value:[Lock, 待機・実行中の件数])のロック
+_attachment_lock = threading.Lock()
+
+def _get_url_base() -> str:
+    return context.get_context().get_url_base('wit')
+
+def _get_snapshot_cache() -> dict:
+    return context.get_context().get_resource('work_item_snapshot_cache', dict)
+
+def _get_attachment_lock_dict() -> dict:
+    return context.get_context().get_resource('attachment_lock_dict', dict)
+
 def convert_str_to_datetime(str: str) -> datetime:
     """
 
@@ -42,10 +54,11 @@ def convert_str_to_datetime(str: str) -> datetime:
     return datetime.datetime.fromisoformat(yyyymmddhhmmss + sss + '+00:00')
     
 
-def get_nowdate(work_item_id: int) -> datetime:
+def get_snapshot(work_item_id: int) -> WorkItem:
     """
 
-    日付を取得する。
+    WorkItemのスナップショットを取得する。
+    保持秒数以内に取得済みの場合は、キャッシュしたスナップショットを返却する。
 
     Args:
         work_item_id (int): WorkItemのID
@@ -54,27 +67,103 @@ def get_nowdate(work_item_id: int) -> datetime:
         RequestException: HttpRequestに失敗した場合
 
     Returns:
-        datetime: 取得した日付
+        WorkItem: WorkItemのスナップショット
 
     """
+    snapshot = _get_cached_snapshot(work_item_id)
+    if snapshot != None:
+        return snapshot
+
     params = { 
-        '$expand': 'all',
-        'api-version': api_version
+        '$expand': 'all'
     }
 
-    url = url_base + 'workitems/' +str(work_item_id)
+    url = _get_url_base() + 'workitems/' +str(work_item_id)
 
-    res = requests.get(
-        url,
-        params=params,
-        auth=(id, pw)
-        )
+    res_data = context.get_client().get_json(url, params=params)
 
-    res.raise_for_status()
+    return _put_snapshot(WorkItem(res_data))
 
-    res_data = res.json()
-    
-    return res_data["fields"][work_item_field_date]
+async def get_snapshot_async(work_item_id: int) -> WorkItem:
+    """
+
+    WorkItemのスナップショットを非同期に取得する。
+    キャッシュは同期版(get_snapshot)と共有する。
+
+    Args:
+        work_item_id (int): WorkItemのID
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Returns:
+        WorkItem: WorkItemのスナップショット
+
+    """
+    snapshot = _get_cached_snapshot(work_item_id)
+    if snapshot != None:
+        return snapshot
+
+    params = { 
+        '$expand': 'all'
+    }
+
+    url = _get_url_base() + 'workitems/' +str(work_item_id)
+
+    res_data = await context.get_async_client().get_json(url, params=params)
+
+    return _put_snapshot(WorkItem(res_data))
+
+def _get_cached_snapshot(work_item_id: int) -> WorkItem:
+    with _snapshot_cache_lock:
+        cached = _get_snapshot_cache().get(int(work_item_id))
+    if cached == None:
+        return None
+    fetched_at, snapshot = cached
+    if time.monotonic() - fetched_at >= context.get_context().work_item_cache_ttl:
+        return None
+    return snapshot
+
+def _put_snapshot(snapshot: WorkItem) -> WorkItem:
+    with _snapshot_cache_lock:
+        _get_snapshot_cache()[int(snapshot.work_item_id)] = (time.monotonic(), snapshot)
+    return snapshot
+
+def clear_cache(work_item_id: int=None):
+    """
+
+    WorkItemスナップショットキャッシュを破棄する。
+
+    Args:
+        work_item_id (int): WorkItemのID。Noneの場合は全件破棄する。
+
+    """
+    snapshot_cache = _get_snapshot_cache()
+    with _snapshot_cache_lock:
+        if work_item_id == None:
+            snapshot_cache.clear()
+        else:
+            snapshot_cache.pop(int(work_item_id), None)
+
+
+def get_nowdate(work_item_id: int) -> datetime:
+    """
+
+    日付を取得する。
+
+    Args:
+        work_item_id (int): WorkItemのID
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    Returns:
+        datetime: 取得した日付
+
+    """
+    snapshot = get_snapshot(work_item_id)
+
+    return snapshot.fields[work_item_field_date]
 
 def get_pr_id_dict(work_item_id: int) -> dict:
     """
@@ -91,25 +180,28 @@ def get_pr_id_dict(work_item_id: int) -> dict:
         PRID-リポジトリID辞書(key:pr_id(int), value:repo_id(str))
 
     """
+    return _to_pr_id_dict(get_snapshot(work_item_id))
 
-    params = { 
-        '$expand': 'all',
-        'api-version': api_version
-    }
+async def get_pr_id_dict_async(work_item_id: int) -> dict:
+    """
 
-    url = url_base + 'workitems/' +str(work_item_id)
+    PRリンクよりPR辞書を非同期に取得する。
 
-    res = requests.get(
-        url,
-        params=params,
-        auth=(id, pw)
-        )
+    Args:
+        work_item_id (int): WorkItemのID
 
-    res.raise_for_status()
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
+
+    Returns:
+        PRID-リポジトリID辞書(key:pr_id(int), value:repo_id(str))
+
+    """
+    return _to_pr_id_dict(await get_snapshot_async(work_item_id))
 
-    res_data = res.json()
+def _to_pr_id_dict(snapshot: WorkItem) -> dict:
     pr_dict = {}
-    for relation in res_data["relations"]:
+    for relation in snapshot.relations:
         if relation['rel'] == 'ArtifactLink':
             if relation['attributes']['name'] == 'Pull Request':
                 pr_url = relation['url']
@@ -137,24 +229,28 @@ def get_repo_list(work_item_id: int) -> list:
         list: リポジトリID(str)のリスト
 
     """
-    params = { 
-        '$expand': 'all',
-        'api-version': api_version
-    }
+    return _to_repo_list(get_snapshot(work_item_id))
 
-    url = url_base + 'workitems/' +str(work_item_id)
+async def get_repo_list_async(work_item_id: int) -> list:
+    """
 
-    res = requests.get(
-        url,
-        params=params,
-        auth=(id, pw)
-        )
+    リポジトリリンク（ブランチリンク）よりリポジトリIDリストを非同期に取得する。
 
-    res.raise_for_status()
+    Args:
+        work_item_id (int): WorkItemのID
+
+    Raises:
+        aiohttp.ClientResponseError: HttpRequestに失敗した場合
 
-    res_data = res.json()
+    Returns:
+        list: リポジトリID(str)のリスト
+
+    """
+    return _to_repo_list(await get_snapshot_async(work_item_id))
+
+def _to_repo_list(snapshot: WorkItem) -> list:
     repo_list=[]
-    for relation in res_data["relations"]:
+    for relation in snapshot.relations:
         if relation['rel'] == 'ArtifactLink':
             if relation['attributes']['name'] == 'Branch':
                 repo_url = relation['url']
@@ -165,42 +261,174 @@ def get_repo_list(work_item_id: int) -> list:
 
     return repo_list
 
+def get_branch_link_set(work_item_id: int) -> set:
+    """
+
+    リポジトリリンク（ブランチリンク）より(リポジトリID, ブランチ名)の集合を取得する。
+
+    Args:
+        work_item_id (int): WorkItemのID
+
+    Raises:
+        RequestException: HttpRequestに失敗した場合
+
+    Returns:
+        set: (リポジトリID(str、小文字), ブランチ名(str))の集合
+
+    """
+    return _to_branch_link_set(get_snapshot(work_item_id))
+
+def _to_branch_link_set(snapshot: WorkItem) -> set:
+    branch_link_set=set()
+    for relation in snapshot.relations:
+        if relation['rel'] == 'ArtifactLink':
+            if relation['url'].startswith("vstfs:///Git/Ref/"):
+                ref_url_base_len=len("vstfs:///Git/Ref/")
+                # {プロジェクト}/{リポジトリID}/GB{ブランチ名}(ブランチ名は/を含む場合がある)
+                ref_url_parts = urllib.parse.unquote(relation['url'][ref_url_base_len:]).split('/', 2)
+                if len(ref_url_parts) == 3 and ref_url_parts[2].startswith('GB'):
+                    # リポジトリIDは大文字・小文字を区別しない
+                    branch_link_set.add((ref_url_parts[1].lower(), ref_url_parts[2][len('GB'):]))
+
+    return branch_link_set
+
 def get_attachement(id: str) -> str:
     """
 
     添付ファイルを取得する。
+    添付ファイルIDの内容は不変のため、保存済みの場合はダウンロードしない。
+    ダウンロードはチャンク単位で途中ファイル(.part)へ書き込み、中断した場合はRangeリクエストで続きから再開する。
+    サイズを検証の上、保存ファイルへ置き換える。
+    なお、保存ファイル名は添付ファイルの種類によらず{ファイルID}.xlsxとする(Excelの添付ファイルのみを想定)。
 
     Args:
         id (str): ファイルID
 
     Raises:
         RequestException: HttpRequestに失敗した場合
+        OSError: ダウンロードしたサイズが一致しない場合
 
     Returns:
         str: ファイルパス
 
+    """
+    save_file_name = id + '.xlsx'
+    save_file_path = os.path.join(context.get_context().attachment_dir, save_file_name)
+    if os.path.exists(save_file_path):
+        return save_file_path
+
+    # 同じ添付ファイルのダウンロードは直列化し、待機・実行中のものがなくなった場合はロックを破棄する
+    lock_dict = _get_attachment_lock_dict()
+    with _attachment_lock:
+        lock_entry = lock_dict.setdefault(save_file_path, [threading.Lock(), 0])
+        lock_entry[1] += 1
+
+    try:
+        with lock_entry[0]:
+            # 並行してダウンロードされた場合
+            if not os.path.exists(save_file_path):
+                _download_attachement_file(id, save_file_path)
+    finally:
+        with _attachment_lock:
+            lock_entry[1] -= 1
+            if lock_entry[1] == 0:
+                lock_dict.pop(save_file_path, None)
+
+    return save_file_path
+
+def _download_attachement_file(id: str, save_file_path: str):
+    """
+
+    添付ファイルを途中ファイル経由でダウンロードし、サイズを検証の上で保存ファイルへ置き換える。
+
+    """
+    part_file_path = save_file_path + '.part'
+
+    attempt = 0
+    while True:
+        try:
+            total_size = _download_attachement(id, part_file_path)
+            break
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            # 受信済みの部分より再開する
+            if attempt >= context.get_client().max_retries:
+                raise e
+            attempt += 1
+            logger.warning("attachment download interrupted, resuming. id=(%s), attempt=(%s), error=(%s)", id, attempt, e)
+
+    size = os.path.getsize(part_file_path)
+    if total_size != None and size != total_size:
+        raise OSError("attachment size mismatch. id=(%s), expected=(%s), actual=(%s)" % (id, total_size, size))
+
+    os.replace(part_file_path, save_file_path)
+
+def _download_attachement(id: str, part_file_path: str) -> int:
+    """
+
+    添付ファイルを途中ファイルへダウンロードする。途中ファイルが存在する場合は続きから取得する。
+
+    Returns:
+        int: 添付ファイル全体のサイズ。不明な場合はNone。
+
     """
     params = { 
-        'download' : True,
-        'api-version': api_version
+        'download' : True
     }
 
-    url = url_base + 'attachments/' + id
+    url = _get_url_base() + 'attachments/' + id
+
+    offset = os.path.getsize(part_file_path) if os.path.exists(part_file_path) else 0
 
-    res = requests.get(
+    # サイズを検証するため、圧縮せずに取得する
+    headers = {'Accept-Encoding': 'identity'}
+    if offset > 0:
+        headers['Range'] = 'bytes=%d-' % offset
+
+    res = context.get_client().get(
         url,
         params=params,
-        auth=(id, pw)
+        headers=headers,
+        stream=True
         )
 
-    res.raise_for_status()
-
-    save_file_name = id + '.xlsx'
-    save_file_path = os.path.join('./', save_file_name)
-    with open(save_file_path, 'wb') as save_file:
-        save_file.write(res.content)
-
-    return save_file_path
+    try:
+        if res.status_code == 416:
+            # 途中ファイルが添付ファイルと同じサイズの場合は取得済みとする(Content-Range: bytes */{total})
+            total_size = _to_total_size(res.headers.get('Content-Range'))
+            if total_size != None and total_size == offset:
+                return total_size
+            # 途中ファイルが添付ファイルより大きい場合等は破棄し、先頭から取得する
+            res.close()
+            os.remove(part_file_path)
+            return _download_attachement(id, part_file_path)
+
+        res.raise_for_status()
+
+        if res.status_code == 206:
+            mode = 'ab'
+            total_size = _to_total_size(res.headers.get('Content-Range'))
+        else:
+            # Rangeに対応しない場合は先頭から取得する
+            mode = 'wb'
+            content_length = res.headers.get('Content-Length')
+            total_size = int(content_length) if content_length != None else None
+
+        with open(part_file_path, mode) as part_file:
+            for chunk in res.iter_content(chunk_size=attachment_chunk_size):
+                part_file.write(chunk)
+    finally:
+        res.close()
+
+    return total_size
+
+def _to_total_size(content_range: str) -> int:
+    # Content-Range: bytes {start}-{end}/{total}
+    if content_range == None:
+        return None
+    total = content_range.rsplit('/', 1)[-1]
+    if not total.isdigit():
+        return None
+    return int(total)
 
 def get_file(work_item_id: int, file_name: str) -> str:
     """
@@ -219,25 +447,11 @@ def get_file(work_item_id: int, file_name: str) -> str:
         str: ファイルパス
 
     """
-    params = { 
-        '$expand': 'all',
-        'api-version': api_version
-    }
-
-    url = url_base + 'workitems/' +str(work_item_id)
+    snapshot = get_snapshot(work_item_id)
 
-    res = requests.get(
-        url,
-        params=params,
-        auth=(id, pw)
-        )
-    
-    res.raise_for_status()
-
-    res_data = res.json()
     file_id_newest = None
     file_datetime_newest = datetime.datetime.fromisoformat('1900-01-01T00:00:00.000+00:00')
-    for relation in res_data["relations"]:
+    for relation in snapshot.relations:
         if relation['rel'] == 'AttachedFile':
             file_url = relation['url']
             _file_name = relation['attributes']['name']
@@ -269,118 +483,184 @@ def get(work_item_id: int):
         Json形式のデータ
 
     """
-    params = { 
-        '$expand': 'all',
-        'api-version': api_version
-    }
+    snapshot = get_snapshot(work_item_id)
 
-    url = url_base + 'workitems/' +str(work_item_id)
+    return json.dumps(snapshot.data) 
 
-    res = requests.get(
-        url,
-        params=params,
-        auth=(id, pw)
-        )
+def get_branch_link_url(repo_id: str, branch_name: str) -> str:
+    """
 
-    res.raise_for_status()
+    リポジトリリンク（ブランチリンク）のURLを取得する。
+
+    Args:
+        repo_id (str): リポジトリID
+        branch_name (str): ブランチ名
 
-    res_data = res.json()
+    Returns:
+        str: ブランチリンクのURL(vstfs:///Git/Ref/{プロジェクト}/{リポジトリID}/GB{ブランチ名})
 
-    return json.dumps(res_data) 
+    """
+    url_parts = urllib.parse.quote(context.get_context().project +'/' + repo_id + '/GB' + branch_name)
+    return 'vstfs:///Git/Ref/'+ url_parts
 
-def update_repolink(work_item_id: int, repo_id: str,  repo_name: str, branch_name: str):
+def add_branch_link(patch: WorkItemPatch, repo_id: str, repo_name: str, branch_name: str) -> WorkItemPatch:
     """
 
-    リポジトリリンク（ブランチリンク）を追加する。
+    更新操作にリポジトリリンク（ブランチリンク）の追加を蓄積する。
 
     Args:
-        work_item_id (int): WorkItemのID
+        patch (WorkItemPatch): 更新操作
         repo_id (str): リポジトリID
         repo_name (str): リポジトリ名
         branch_name (str): ブランチ名
 
+    Returns:
+        WorkItemPatch: 更新操作
+
+    """
+    return patch.add_relation(
+        'ArtifactLink',
+        get_branch_link_url(repo_id, branch_name),
+        {
+            'comment': repo_name,
+            'name': 'Branch'
+        }
+        )
+
+def apply_patch(patch: WorkItemPatch) -> WorkItem:
+    """
+
+    蓄積した更新操作を1回のリクエストで送信する。
+    更新後のWorkItemはスナップショットとして保持する。
+
+    Args:
+        patch (WorkItemPatch): 更新操作
+
     Raises:
         RequestException: HttpRequestに失敗した場合
 
+    Returns:
+        WorkItem: 更新後のWorkItemのスナップショット。更新操作が空の場合はNone。
+
     """
+    if patch.is_empty():
+        return None
 
     headers = { 
         'Content-Type': 'application/json-patch+json'
     }
 
     params = { 
-        '$expand': 'all',
-        'api-version': api_version
+        '$expand': 'all'
     }
 
-    url_parts = urllib.parse.quote(project +'/' + repo_id + '/GB' + branch_name)
-    data = { 
-        'op': 'add',
-        'path': '/relations/-',
-        'value': {
-            'rel': 'ArtifactLink',
-            'url': 'vstfs:///Git/Ref/'+ url_parts,
-            'attributes': {
-                'comment': repo_name,
-                'name': 'Branch'
-            }
-        }
-    }
-    url = url_base + 'workitems/' +str(work_item_id)
+    url = _get_url_base() + 'workitems/' +str(patch.work_item_id)
 
-    res = requests.patch(
+    res = context.get_client().patch(
         url,
         headers=headers,
         params=params,
-        json=[data],
-        auth=(id, pw)
+        json=patch.operation_list
         )
 
     res.raise_for_status()
 
+    # 更新の応答は更新後のWorkItem($expand=all)のため、再取得せずに保持する
+    return _put_snapshot(WorkItem(res.json()))
 
+def apply_patch_list(patch_list: list, max_workers: int=None) -> list:
+    """
+
+    複数WorkItemの更新操作を並列に送信する。
+    同じWorkItemの更新操作は1つにまとめ、WorkItem毎に1回のリクエストとする。
+    WorkItem毎の成否を返却し、失敗したWorkItemがあっても他のWorkItemの更新は継続する。
+
+    Args:
+        patch_list (list): 更新操作(WorkItemPatch)のリスト
+        max_workers (int): 最大並列数。Noneの場合は設定値を使用する。
+
+    Returns:
+        list: WorkItem毎の結果(key:work_item_id, operations(操作数), rev(更新後のリビジョン), error(失敗した場合のエラー内容、成功した場合はNone))のリスト。
+              WorkItemの初出の順序とする。
 
-def update_nowdate(work_item_id: int):
     """
+    # WorkItem毎に更新操作をまとめる(初出の順序を維持する)
+    work_item_patch_dict = {}
+    for patch in patch_list:
+        merged_patch = work_item_patch_dict.get(patch.work_item_id)
+        if merged_patch == None:
+            merged_patch = WorkItemPatch(patch.work_item_id)
+            work_item_patch_dict[patch.work_item_id] = merged_patch
+        merged_patch.extend(patch)
+
+    if max_workers == None:
+        max_workers = context.get_context().max_workers
+
+    def apply(merged_patch: WorkItemPatch) -> dict:
+        result = {
+            'work_item_id': merged_patch.work_item_id,
+            'operations': len(merged_patch.operation_list),
+            'rev': None,
+            'error': None
+        }
+        try:
+            snapshot = apply_patch(merged_patch)
+            if snapshot != None:
+                result['rev'] = snapshot.rev
+        except RequestException as e:
+            detail = e.response.text if e.response != None else ''
+            logger.error("patch failed. work_item_id=(%s), error=(%s), detail=(%s)", merged_patch.work_item_id, e, detail)
+            result['error'] = str(e)
+        return result
+
+    # ワーカースレッドへ現在のコンテキストを引き継ぐ
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=context.set_context, initargs=(context.get_context(),)) as executor:
+        return list(executor.map(apply, work_item_patch_dict.values()))
 
-    現在時刻で日付を更新する。
+def update_repolink(work_item_id: int, repo_id: str,  repo_name: str, branch_name: str):
+    """
+
+    リポジトリリンク（ブランチリンク）を追加する。
+    複数のリンクを追加する場合は、add_branch_link・apply_patchで1回のリクエストにまとめること。
 
     Args:
-        arg1 (int): WorkItemのID
-        arg2 (str): リポジトリ名
-        arg3 (str): ブランチ名
+        work_item_id (int): WorkItemのID
+        repo_id (str): リポジトリID
+        repo_name (str): リポジトリ名
+        branch_name (str): ブランチ名
 
     Raises:
         RequestException: HttpRequestに失敗した場合
 
     """
+    apply_patch(add_branch_link(WorkItemPatch(work_item_id), repo_id, repo_name, branch_name))
 
-    headers = { 
-        'Content-Type': 'application/json-patch+json'
-    }
 
-    params = { 
-        '$expand': 'all',
-        'api-version': api_version
-    }
+def update_nowdate(work_item_id: int):
+    """
 
-    dt_now = datetime.datetime.now()
-    data = { 
-        'op': 'replace',
-        'path': '/fields/' + work_item_field_date,
-        'value': dt_now.isoformat(timespec='seconds')
-    }
+    現在時刻で日付を更新する。
 
-    url = url_base + 'workitems/' +str(work_item_id)
+    Args:
+        work_item_id (int): WorkItemのID
 
-    res = requests.patch(
-        url,
-        headers=headers,
-        params=params,
-        json=[data],
-        auth=(id, pw)
-        )
+    Raises:
+        RequestException: HttpRequestに失敗した場合
 
-    res.raise_for_status()
+    """
+    apply_patch(set_nowdate(WorkItemPatch(work_item_id)))
+
+def set_nowdate(patch: WorkItemPatch) -> WorkItemPatch:
+    """
 
+    更新操作に現在時刻での日付の更新を蓄積する。
 
+    Args:
+        patch (WorkItemPatch): 更新操作
+
+    Returns:
+        WorkItemPatch: 更新操作
+
+    """
+    dt_now = datetime.datetime.now()
+    return patch.replace_field(work_item_field_date, dt_now.isoformat(timespec='seconds'))
@@ -0,0 +1,127 @@
+class WorkItem():
+    """
+
+    WorkItemのスナップショット。
+    `GET workitems/{id}?$expand=all` の応答を解析した結果を保持する。
+
+    """
+    work_item_id=None
+    rev=None
+    fields=None
+    relations=None
+    data=None
+
+    def __init__(self, data:dict):
+        self.work_item_id = data['id']
+        self.rev = data.get('rev')
+        self.fields = data.get('fields', {})
+        # リレーションが1件も無いWorkItemは"relations"自体が返却されない
+        self.relations = data.get('relations', [])
+        self.data = data
+
+    def get_relations(self, rel:str, name:str=None) -> list:
+        """
+
+        種類(rel)と名前(attributes.name)が一致するリレーションのリストを取得する。
+
+        Args:
+            rel (str): リレーション種類
+            name (str): リレーション名。Noneの場合は名前で絞り込まない。
+
+        Returns:
+            list: リレーション(dict)のリスト
+
+        """
+        relation_list = []
+        for relation in self.relations:
+            if relation['rel'] != rel:
+                continue
+            if name != None and relation['attributes'].get('name') != name:
+                continue
+            relation_list.append(relation)
+        return relation_list
+
+    @property
+    def attachments(self) -> list:
+        return self.get_relations('AttachedFile')
+
+
+class WorkItemPatch():
+    """
+
+    WorkItemの更新操作(JSON-Patch)。
+    リレーションの追加・フィールドの置換を蓄積し、1回のリクエスト(1リビジョン)で更新する。
+
+    """
+    work_item_id=None
+    operation_list=None
+
+    def __init__(self, work_item_id:int):
+        self.work_item_id = work_item_id
+        self.operation_list = []
+
+    def add_relation(self, rel:str, url:str, attributes:dict=None):
+        """
+
+        リレーションを追加する操作を蓄積する。
+
+        Args:
+            rel (str): リレーション種類
+            url (str): リレーション先のURL
+            attributes (dict): 属性(comment, name等)
+
+        Returns:
+            WorkItemPatch: 自身
+
+        """
+        value = {
+            'rel': rel,
+            'url': url
+        }
+        if attributes != None:
+            value['attributes'] = attributes
+
+        self.operation_list.append({
+            'op': 'add',
+            'path': '/relations/-',
+            'value': value
+        })
+        return self
+
+    def replace_field(self, field:str, value):
+        """
+
+        フィールドを置換する操作を蓄積する。
+
+        Args:
+            field (str): フィールドの参照名
+            value: 値
+
+        Returns:
+            WorkItemPatch: 自身
+
+        """
+        self.operation_list.append({
+            'op': 'replace',
+            'path': '/fields/' + field,
+            'value': value
+        })
+        return self
+
+    def extend(self, patch):
+        """
+
+        他の更新操作(同じWorkItem)を末尾に追加する。
+
+        Args:
+            patch (WorkItemPatch): 更新操作
+
+        Returns:
+            WorkItemPatch: 自身
+
+        """
+        self.operation_list.extend(patch.operation_list)
+        return self
+
+    def is_empty(self) -> bool:
+        return len(self.operation_list) == 0